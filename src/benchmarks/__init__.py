@@ -0,0 +1,35 @@
+import json
+import platform
+import subprocess  # nosec
+from datetime import datetime
+from typing import Any
+
+from loguru import logger
+
+
+def _get_commit() -> str | None:
+    try:
+        return subprocess.run(  # nosec
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(name: str, results: Any, output: str | None = None) -> dict[str, Any]:
+    """Prints benchmark results and optionally writes them as JSON, so runs from different commits can be compared."""
+    report = {
+        "benchmark": name,
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "commit": _get_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if output is not None:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text)
+        logger.info(f"Benchmark results written to {output}")
+    return report
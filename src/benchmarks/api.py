@@ -0,0 +1,95 @@
+"""Latency and throughput of the API served with a fixture model, and training duration versus dataset size.
+
+- predict: `/v1.0/predict` p50/p95/p99 and requests/sec at several concurrency levels (prediction cache disabled),
+- batch: `/v1.0/predict/batch` latency and listings/sec for several batch sizes,
+- train: seconds to fit every model (in process, the way a training job fits it) for several dataset sizes.
+
+The app from `main.py` is served by uvicorn, or by gunicorn with `--workers` above 1. Compare two reports with
+`python -m benchmarks.compare`.
+
+Run from `src/`: python -m benchmarks.api --output api.json
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import Any
+
+import pandas as pd
+
+from benchmarks import write_results
+from benchmarks.serving_load import (
+    PREDICT_PATH,
+    create_fixture_registry,
+    get_free_port,
+    get_server_commands,
+    listing_payloads,
+    run_load,
+    serve,
+)
+from benchmarks.synthetic_listings import listings_matrix
+from enums import ModelEnum
+from models import FEATURES, TARGET, get_trained_model
+
+BATCH_PATH = "/v1.0/predict/batch"
+CONCURRENCY_LEVELS: tuple[int, ...] = (1, 4, 16, 64)
+BATCH_SIZES: tuple[int, ...] = (1, 10, 100, 1000, 10_000)
+TRAIN_SIZES: tuple[int, ...] = (1000, 10_000, 100_000)
+
+
+def benchmark_predict(url: str, concurrency_levels: list[int], duration: float) -> dict[int, dict[str, float]]:
+    payloads = listing_payloads(1000)
+    return {
+        concurrency: asyncio.run(run_load("GET", url + PREDICT_PATH, payloads, concurrency, duration))
+        for concurrency in concurrency_levels
+    }
+
+
+def benchmark_batch(url: str, batch_sizes: list[int], duration: float) -> dict[int, dict[str, float]]:
+    results = {}
+    for batch_size in batch_sizes:
+        load = asyncio.run(run_load("POST", url + BATCH_PATH, [listing_payloads(batch_size)], 1, duration))
+        results[batch_size] = {**load, "listings_per_second": load["requests_per_second"] * batch_size}
+    return results
+
+
+def benchmark_train(sizes: list[int]) -> dict[int, dict[str, float]]:
+    results: dict[int, dict[str, float]] = {}
+    for rows in sizes:
+        x, y = listings_matrix(rows)
+        data = pd.DataFrame(x, columns=FEATURES).assign(**{TARGET: y})
+        results[rows] = {}
+        for model_type in ModelEnum:
+            start = time.perf_counter()
+            get_trained_model(model_type, data)
+            results[rows][f"{model_type.name}_seconds"] = time.perf_counter() - start
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20_000, help="Number of synthetic listings of the fixture model.")
+    parser.add_argument("--workers", type=int, default=1, help="Number of workers serving the app.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=list(CONCURRENCY_LEVELS))
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=list(BATCH_SIZES))
+    parser.add_argument("--train-sizes", type=int, nargs="+", default=list(TRAIN_SIZES))
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds of load per measurement.")
+    parser.add_argument("--output", default=None, help="Path of the JSON report.")
+    args = parser.parse_args()
+
+    mode = "uvicorn-1-worker" if args.workers == 1 else f"gunicorn-{args.workers}-workers"
+    results: dict[str, Any] = {"cpus": os.cpu_count(), "mode": mode, "fixture_rows": args.rows}
+    with tempfile.TemporaryDirectory() as registry_dir:
+        create_fixture_registry(registry_dir, args.rows)
+        command, env = get_server_commands(port := get_free_port(), args.workers)[mode]
+        with serve(command, {**env, "MODEL_REGISTRY_DIR": registry_dir, "PREDICTION_CACHE_SIZE": "0"}, port) as url:
+            results["predict"] = benchmark_predict(url, args.concurrency, args.duration)
+            results["batch"] = benchmark_batch(url, args.batch_sizes, args.duration)
+    results["train"] = benchmark_train(args.train_sizes)
+
+    write_results("api", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
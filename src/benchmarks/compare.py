@@ -0,0 +1,79 @@
+"""Compares two JSON reports of the same benchmark, e.g. from two commits, and lists metrics which got worse.
+
+Metrics are compared by name: times (`*_ms`, `*_us`, `*_seconds`) should not grow and rates (`*_per_second`,
+`speedup`) should not drop by more than `--threshold`. Exits with 1 if any metric regressed, so it can gate CI.
+
+Run from `src/`: python -m benchmarks.compare before.json after.json --threshold 0.1
+"""
+import argparse
+import json
+import sys
+from typing import Any, Iterator
+
+LOWER_IS_BETTER: tuple[str, ...] = ("_ms", "_us", "_seconds")
+HIGHER_IS_BETTER: tuple[str, ...] = ("_per_second", "speedup")
+
+
+def flatten(results: Any, prefix: str = "") -> Iterator[tuple[str, float]]:
+    """Yields numeric leaves of nested results with their dotted path."""
+    if isinstance(results, dict):
+        for key, value in results.items():
+            yield from flatten(value, f"{prefix}.{key}" if prefix else str(key))
+    elif isinstance(results, (int, float)) and not isinstance(results, bool):
+        yield prefix, float(results)
+
+
+def _get_direction(path: str) -> int:
+    """1 if a higher value is better, -1 if lower is better, 0 for metrics which are not compared."""
+    name = path.rsplit(".", 1)[-1]
+    if name.endswith(HIGHER_IS_BETTER):
+        return 1
+    return -1 if name.endswith(LOWER_IS_BETTER) else 0
+
+
+def compare(before: dict[str, Any], after: dict[str, Any], threshold: float) -> list[dict[str, Any]]:
+    """Returns the relative change of every metric present in both reports."""
+    before_metrics = dict(flatten(before["results"]))
+    changes = []
+    for path, value in flatten(after["results"]):
+        direction = _get_direction(path)
+        if direction == 0 or not before_metrics.get(path):
+            continue
+        change = value / before_metrics[path] - 1
+        changes.append(
+            {
+                "metric": path,
+                "before": before_metrics[path],
+                "after": value,
+                "change": change,
+                "regression": change * direction < -threshold,
+            }
+        )
+    return changes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("before", help="Report of the baseline.")
+    parser.add_argument("after", help="Report to compare with the baseline.")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Tolerated relative change (0.1: 10%%).")
+    args = parser.parse_args()
+
+    with open(args.before, encoding="utf-8") as f:
+        before = json.load(f)
+    with open(args.after, encoding="utf-8") as f:
+        after = json.load(f)
+    if before["benchmark"] != after["benchmark"]:
+        sys.exit(f"Cannot compare {before['benchmark']} with {after['benchmark']}")
+
+    changes = compare(before, after, args.threshold)
+    print(f"{before['benchmark']}: {before['commit']} -> {after['commit']}")
+    for change in changes:
+        values = f"{change['before']:>12.4g} {change['after']:>12.4g} {change['change']:>+8.1%}"
+        print(f"{change['metric']:<50} {values}{' REGRESSION' if change['regression'] else ''}")
+    if any(change["regression"] for change in changes):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Microbenchmark of RandomForestRegressor.predict against its FlatForest export for single rows and small batches.
+
+Run from `src/`: python -m benchmarks.flat_forest --rows 20000 --output flat_forest.json
+"""
+import argparse
+import time
+from typing import Any, Callable
+
+import numpy as np
+
+from benchmarks import write_results
+from benchmarks.synthetic_listings import listings_matrix
+from enums import ModelEnum
+from models.flat_forest import FlatForest
+
+BATCH_SIZES: tuple[int, ...] = (1, 10, 100, 1000)
+
+
+def _time_per_call(predict: Callable[[np.ndarray], Any], x: np.ndarray, min_seconds: float) -> float:
+    predict(x)  # warm-up
+    calls, start = 0, time.perf_counter()
+    while (elapsed := time.perf_counter() - start) < min_seconds:
+        predict(x)
+        calls += 1
+    return elapsed / calls
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20_000, help="Number of synthetic listings to train on.")
+    parser.add_argument("--seconds", type=float, default=1.0, help="Minimal time measured per batch size.")
+    parser.add_argument("--output", default=None, help="Path of the JSON report.")
+    args = parser.parse_args()
+
+    x, y = listings_matrix(args.rows)
+    forest = ModelEnum.RANDOM_FOREST.create().fit(x, y)
+
+    start = time.perf_counter()
+    flat_forest = FlatForest.from_forest(forest)
+    results: dict[str, Any] = {
+        "rows": args.rows,
+        "trees": len(flat_forest.roots),
+        "nodes": len(flat_forest.threshold),
+        "compile_seconds": time.perf_counter() - start,
+        "batches": {},
+    }
+    x_test = x[np.random.default_rng(1).permutation(args.rows)]
+    for batch_size in BATCH_SIZES:
+        batch = x_test[:batch_size]
+        sklearn_time = _time_per_call(forest.predict, batch, args.seconds)
+        flat_time = _time_per_call(flat_forest.predict, batch, args.seconds)
+        results["batches"][batch_size] = {
+            "sklearn_us": sklearn_time * 1e6,
+            "flat_us": flat_time * 1e6,
+            "speedup": sklearn_time / flat_time,
+            "bit_identical": bool(np.array_equal(forest.predict(batch), flat_forest.predict(batch))),
+        }
+
+    write_results("flat_forest", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Query latency of the KNN models as the training set grows: index build time, artifact size, load time and
+per-batch query latency percentiles for every neighbor search algorithm.
+
+Run from `src/`: python -m benchmarks.knn_index --sizes 10000 100000 1000000 --output knn_index.json
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import Any
+
+import numpy as np
+
+from benchmarks import write_results
+from benchmarks.synthetic_listings import listings_matrix
+from enums import ModelEnum
+from models.serialization import ArtifactFormat, dump_model, load_model
+
+BATCH_SIZES: tuple[int, ...] = (1, 100, 1000)
+ALGORITHMS: tuple[str, ...] = ("kd_tree", "ball_tree", "brute")
+
+
+def _get_variants() -> dict[str, Any]:
+    variants = {"KNN": ModelEnum.KNN.create()}  # unscaled, sklearn picks the algorithm
+    for algorithm in ALGORITHMS:
+        variants[f"SCALED_KNN-{algorithm}"] = ModelEnum.SCALED_KNN.create().set_params(knn__algorithm=algorithm)
+    return variants
+
+
+def _query_latency(model: Any, x: np.ndarray, batch_size: int, queries: int) -> dict[str, float]:
+    rng = np.random.default_rng(batch_size)
+    latencies = []
+    for _ in range(queries):
+        batch = x[rng.integers(0, len(x), batch_size)]
+        start = time.perf_counter()
+        model.predict(batch)
+        latencies.append(time.perf_counter() - start)
+    p50, p95 = np.percentile(latencies, [50, 95])
+    return {"p50_ms": p50 * 1e3, "p95_ms": p95 * 1e3, "rows_per_second": batch_size / float(np.mean(latencies))}
+
+
+def benchmark_model(model: Any, x: np.ndarray, y: np.ndarray, queries: int) -> dict[str, Any]:
+    start = time.perf_counter()
+    model.fit(x, y)
+    result: dict[str, Any] = {"build_seconds": time.perf_counter() - start}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, ArtifactFormat.JOBLIB.file_name)
+        dump_model(model, path, ArtifactFormat.JOBLIB)
+        result["artifact_mb"] = os.path.getsize(path) / 1024**2
+        start = time.perf_counter()
+        model = load_model(path, ArtifactFormat.JOBLIB, mmap=True)
+        result["load_seconds"] = time.perf_counter() - start
+
+        result["batches"] = {
+            batch_size: _query_latency(model, x, batch_size, max(queries // batch_size, 5))
+            for batch_size in BATCH_SIZES
+        }
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="Training rows.")
+    parser.add_argument("--queries", type=int, default=200, help="Number of single row queries per size.")
+    parser.add_argument("--output", default=None, help="Path of the JSON report.")
+    args = parser.parse_args()
+
+    results: dict[str, Any] = {}
+    for rows in args.sizes:
+        x, y = listings_matrix(rows)
+        results[rows] = {name: benchmark_model(model, x, y, args.queries) for name, model in _get_variants().items()}
+
+    write_results("knn_index", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
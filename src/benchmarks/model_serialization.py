@@ -0,0 +1,98 @@
+"""Compares model artifact formats: file size, dump time, load time and memory of a process loading the model.
+
+Every load runs in a fresh process. Memory is reported as the growth of private (anonymous) and file-backed resident
+memory after loading the model and predicting a batch; file-backed pages of a memory-mapped artifact live in the page
+cache and are shared by all processes loading the same file. The artifact is in the page cache (warm load).
+
+Run from `src/`: python -m benchmarks.model_serialization --rows 20000 --output serialization.json
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+import numpy as np
+
+from benchmarks import write_results
+from benchmarks.synthetic_listings import listings_matrix
+from enums import ModelEnum
+from models.flat_forest import compile_model
+from models.serialization import ArtifactFormat, dump_model, load_model
+
+FORMATS: dict[str, tuple[ArtifactFormat, str]] = {
+    "pickle": (ArtifactFormat.PICKLE, "0"),
+    "joblib": (ArtifactFormat.JOBLIB, "0"),
+    "joblib-zlib3": (ArtifactFormat.JOBLIB, "zlib:3"),
+    "joblib-lzma3": (ArtifactFormat.JOBLIB, "lzma:3"),
+}
+
+
+def _get_memory() -> dict[str, float]:
+    """Resident memory in MB, split into private and file-backed pages (Linux only)."""
+    with open("/proc/self/status", encoding="utf-8") as f:
+        fields = dict(line.split(":", 1) for line in f)
+    return {key: int(fields[key].split()[0]) / 1024 for key in ("RssAnon", "RssFile")}
+
+
+def _measure_load(path: str, artifact_format: ArtifactFormat, mmap: bool, x: np.ndarray) -> dict[str, float]:
+    before = _get_memory()
+    start = time.perf_counter()
+    model = load_model(path, artifact_format, mmap)
+    load_time = time.perf_counter() - start
+    start = time.perf_counter()
+    model.predict(x)
+    predict_time = time.perf_counter() - start
+    after = _get_memory()
+    return {
+        "load_seconds": load_time,
+        "first_predict_seconds": predict_time,
+        "rss_anon_mb": after["RssAnon"] - before["RssAnon"],
+        "rss_file_mb": after["RssFile"] - before["RssFile"],
+    }
+
+
+def benchmark_format(model: Any, name: str, x: np.ndarray, repeats: int) -> dict[str, Any]:
+    artifact_format, compression = FORMATS[name]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, artifact_format.file_name)
+        start = time.perf_counter()
+        dump_model(model, path, artifact_format, compression)
+        dump_time = time.perf_counter() - start
+
+        loads = []
+        for _ in range(repeats):
+            with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                mmap = artifact_format is ArtifactFormat.JOBLIB and compression == "0"
+                loads.append(executor.submit(_measure_load, path, artifact_format, mmap, x).result())
+
+        return {
+            "size_mb": os.path.getsize(path) / 1024**2,
+            "dump_seconds": dump_time,
+            **{key: min(load[key] for load in loads) for key in loads[0]},
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20_000, help="Number of synthetic listings to train on.")
+    parser.add_argument("--repeats", type=int, default=3, help="Number of loads per format (best one is reported).")
+    parser.add_argument("--output", default=None, help="Path of the JSON report.")
+    args = parser.parse_args()
+
+    x, y = listings_matrix(args.rows)
+
+    results: dict[str, Any] = {"rows": args.rows}
+    for model_type in ModelEnum:
+        model = model_type.create().fit(x, y)
+        results[model_type.name] = {name: benchmark_format(model, name, x[:1000], args.repeats) for name in FORMATS}
+        if (flat_forest := compile_model(model)) is not None:  # flat export of the forest, memory-mapped
+            results[model_type.name]["flat-joblib"] = benchmark_format(flat_forest, "joblib", x[:100], args.repeats)
+
+    write_results("model_serialization", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
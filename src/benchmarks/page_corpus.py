@@ -0,0 +1,133 @@
+"""Recorded listing pages and a local stand-in HTTP server replaying them, so scrapers can be exercised offline."""
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterator, Type
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from scraper import CrawlTarget, Scraper
+from scraper.ogloszenia_trojmiasto import OgloszeniaTrojmiasto
+from scraper.tyszkiewicz import Tyszkiewicz
+
+SCRAPERS: dict[str, Type[Scraper]] = {
+    Tyszkiewicz.__name__: Tyszkiewicz,
+    OgloszeniaTrojmiasto.__name__: OgloszeniaTrojmiasto,
+}
+
+
+def request_key(url: str, params: dict[str, str]) -> str:
+    """Identifies a page by the path of its url and its sorted query parameters (the host is ignored)."""
+    return f"{urlsplit(url).path}?{urlencode(sorted(params.items()))}"
+
+
+@dataclass(frozen=True)
+class RecordedPage:
+    scraper: str
+    url: str
+    params: dict[str, str]
+    file: str  # relative to the corpus directory
+    sha256: str
+    recorded_at: str
+
+
+class PageCorpus:
+    """Directory of recorded pages: `<scraper>/<sha256>.html` files listed in `manifest.json` with their request."""
+
+    MANIFEST_FILE = "manifest.json"
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self.pages: list[RecordedPage] = []
+        manifest_path = os.path.join(directory, self.MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding="utf-8") as f:
+                self.pages = [RecordedPage(**page) for page in json.load(f)]
+
+    def add(self, scraper: Type[Scraper], url: str, params: dict[str, str], html_text: str) -> RecordedPage:
+        data = html_text.encode("utf-8")
+        sha256 = hashlib.sha256(data).hexdigest()
+        file = os.path.join(scraper.__name__, f"{sha256}.html")
+        os.makedirs(os.path.join(self.directory, scraper.__name__), exist_ok=True)
+        with open(os.path.join(self.directory, file), "wb") as f:
+            f.write(data)
+
+        page = RecordedPage(scraper.__name__, url, params, file, sha256, datetime.now(timezone.utc).isoformat())
+        key = request_key(url, params)
+        self.pages = [recorded for recorded in self.pages if request_key(recorded.url, recorded.params) != key]
+        self.pages.append(page)
+        return page
+
+    def save(self) -> None:
+        with open(os.path.join(self.directory, self.MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump([dataclasses.asdict(page) for page in self.pages], f, indent=2)
+
+    def read(self, page: RecordedPage) -> str:
+        with open(os.path.join(self.directory, page.file), encoding="utf-8") as f:
+            return f.read()
+
+    def get_targets(self, server_url: str) -> list[tuple[Type[Scraper], CrawlTarget]]:
+        """Crawl targets of all scrapers pointed at `server_url`, limited to their recorded pages."""
+        recorded = {request_key(page.url, page.params) for page in self.pages}
+        targets = []
+        for scraper in SCRAPERS.values():
+            for target in scraper.get_crawl_targets():
+                pages = 0
+                while pages < target.max_pages and request_key(target.url, target.get_params(pages + 1)) in recorded:
+                    pages += 1
+                if pages:
+                    url = server_url + urlsplit(target.url).path
+                    targets.append((scraper, dataclasses.replace(target, url=url, max_pages=pages)))
+        return targets
+
+
+def _create_handler(pages: dict[str, bytes]) -> Type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # pylint: disable=invalid-name
+            url = urlsplit(self.path)
+            body = pages.get(request_key(url.path, dict(parse_qsl(url.query))))
+            if body is None:
+                self.send_error(404)
+                return
+            etag = f'"{hashlib.sha256(body).hexdigest()}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+    return Handler
+
+
+@contextmanager
+def serve_corpus(corpus: PageCorpus, port: int = 0) -> Iterator[str]:
+    """Serves the recorded pages on a local port (by path and query, like the original hosts) and yields its url.
+
+    Pages are served with an ETag and a request with the current one in If-None-Match gets 304 Not Modified. The
+    port is random by default; serving again on the same one keeps the urls, e.g. to recrawl with a page cache.
+    """
+    pages = {request_key(page.url, page.params): corpus.read(page).encode("utf-8") for page in corpus.pages}
+    server = ThreadingHTTPServer(("127.0.0.1", port), _create_handler(pages))
+    thread = threading.Thread(target=server.serve_forever, name="page-corpus-server", daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,60 @@
+"""Compares pages/sec of `Scraper.process_html` (BeautifulSoup) with the lxml XPath fast path.
+
+Run from `src/`: python -m benchmarks.scraper_parsing --pages 50 --output parsing.json
+"""
+import argparse
+import time
+from typing import Callable, Type
+
+from loguru import logger
+
+from benchmarks import write_results
+from benchmarks.synthetic_pages import ogloszenia_trojmiasto_page, tyszkiewicz_page
+from scraper import Scraper
+from scraper.engine import ParserBackend, parse_page
+from scraper.ogloszenia_trojmiasto import OgloszeniaTrojmiasto
+from scraper.tyszkiewicz import Tyszkiewicz
+
+PAGES: dict[Type[Scraper], Callable[[int, int], str]] = {
+    Tyszkiewicz: tyszkiewicz_page,
+    OgloszeniaTrojmiasto: ogloszenia_trojmiasto_page,
+}
+
+
+def benchmark_backend(scraper: Type[Scraper], pages: list[str], backend: ParserBackend) -> tuple[dict, list]:
+    start = time.perf_counter()
+    offers = [parse_page(scraper, page, backend) for page in pages]
+    elapsed = time.perf_counter() - start
+    n_offers = sum(len(page_offers) for page_offers in offers)
+    return {
+        "seconds": elapsed,
+        "pages_per_second": len(pages) / elapsed,
+        "offers_per_second": n_offers / elapsed,
+    }, offers
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=50, help="Number of synthetic pages per scraper.")
+    parser.add_argument("--offers", type=int, default=30, help="Number of offers per page.")
+    parser.add_argument("--output", default=None, help="Path of the JSON report.")
+    args = parser.parse_args()
+
+    logger.remove()  # scrapers log every missing field, which would dominate the measurement
+    results = {}
+    for scraper, make_page in PAGES.items():
+        pages = [make_page(args.offers, seed) for seed in range(args.pages)]
+        bs4_result, bs4_offers = benchmark_backend(scraper, pages, ParserBackend.BS4)
+        lxml_result, lxml_offers = benchmark_backend(scraper, pages, ParserBackend.LXML)
+        results[scraper.__name__] = {
+            "bs4": bs4_result,
+            "lxml": lxml_result,
+            "speedup": bs4_result["seconds"] / lxml_result["seconds"],
+            "same_offers": bs4_offers == lxml_offers,
+        }
+
+    write_results("scraper_parsing", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
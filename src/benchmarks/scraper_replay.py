@@ -0,0 +1,188 @@
+"""Offline scraper benchmark: records listing pages to a local corpus and replays them through the crawler.
+
+`record` fetches the first pages of every crawl target (or generates synthetic ones with `--synthetic`) into the
+corpus. `replay` serves the corpus from a local stand-in HTTP server and crawls it with `CrawlerEngine`, parsing
+inline with every parser backend, each in a fresh process, and reports pages/sec, offers/sec and peak memory. It
+then crawls the corpus twice with one page cache, to compare the requests, downloaded bytes and parsed pages of a
+recrawl of unchanged pages (conditional requests answered with 304 Not Modified) with a full crawl. It also profiles
+`Scraper.process_html` per extractor: times are inclusive, so an extractor calling other extractors includes their
+time, and `html_parsing_seconds` is the time spent building the BeautifulSoup tree.
+
+Run from `src/`:
+    python -m benchmarks.scraper_replay record --pages 3
+    python -m benchmarks.scraper_replay replay --output scraper_replay.json
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import resource
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterator, Callable, Type
+
+from loguru import logger
+
+from benchmarks import write_results
+from benchmarks.page_corpus import SCRAPERS, PageCorpus, serve_corpus
+from benchmarks.scraper_parsing import PAGES
+from scraper import Scraper
+from scraper.engine import CrawlerEngine, HostLimits, ParserBackend, parse_page
+from scraper.page_cache import PageCache
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "fixtures", "pages")
+REPLAY_LIMITS = HostLimits(concurrency=8, requests_per_second=1e6, burst=10**6)  # the stand-in server is not limited
+
+
+def record(corpus: PageCorpus, pages: int, delay: float) -> None:
+    for scraper in SCRAPERS.values():
+        for target in scraper.get_crawl_targets():
+            for page in range(1, min(pages, target.max_pages) + 1):
+                params = target.get_params(page)
+                try:
+                    html_text = Scraper.get_html(target.url, params=params)
+                except Exception as exception:
+                    logger.error(f"Error fetching {target.url}, params: {params}. Error: {exception}")
+                    break
+                corpus.add(scraper, target.url, params, html_text)
+                if not parse_page(scraper, html_text):
+                    break  # recorded the last page, which has no offers
+                time.sleep(delay)
+    corpus.save()
+
+
+def record_synthetic(corpus: PageCorpus, pages: int, offers: int) -> None:
+    for scraper in SCRAPERS.values():
+        for i, target in enumerate(scraper.get_crawl_targets()):
+            for page in range(1, pages + 1):
+                corpus.add(scraper, target.url, target.get_params(page), PAGES[scraper](offers, i * pages + page))
+    corpus.save()
+
+
+def _get_peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+
+
+async def _count(offers: AsyncIterator[dict]) -> int:
+    count = 0
+    async for _ in offers:
+        count += 1
+    return count
+
+
+def _replay(corpus_dir: str, server_url: str, backend: ParserBackend) -> dict[str, float]:
+    logger.remove()  # scrapers log every missing field, which would dominate the measurement
+    targets = PageCorpus(corpus_dir).get_targets(server_url)
+    engine = CrawlerEngine(REPLAY_LIMITS, parse_workers=0, parser_backend=backend)
+    rss_before = _get_peak_rss_mb()
+    start = time.perf_counter()
+    n_offers = asyncio.run(_count(engine.crawl_targets(targets)))
+    elapsed = time.perf_counter() - start
+    pages = sum(target.max_pages for _, target in targets)
+    return {
+        "pages": pages,
+        "offers": n_offers,
+        "seconds": elapsed,
+        "pages_per_second": pages / elapsed,
+        "offers_per_second": n_offers / elapsed,
+        "peak_rss_mb": _get_peak_rss_mb(),
+        "peak_rss_growth_mb": _get_peak_rss_mb() - rss_before,
+    }
+
+
+def replay(corpus: PageCorpus, backend: ParserBackend) -> dict[str, float]:
+    """Crawls the corpus from a local server in a fresh process, so its peak memory is the replay's own."""
+    with serve_corpus(corpus) as server_url:
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            return executor.submit(_replay, corpus.directory, server_url, backend).result()
+
+
+def replay_incremental(corpus: PageCorpus) -> dict[str, dict[str, float]]:
+    """Crawls the corpus twice with one page cache: the first crawl fills it, the second recrawls unchanged pages."""
+    page_cache = PageCache()
+    results = {}
+    with serve_corpus(corpus) as server_url:
+        targets = corpus.get_targets(server_url)
+        for crawl in ("full", "recrawl"):
+            engine = CrawlerEngine(REPLAY_LIMITS, parse_workers=0, page_cache=page_cache)
+            start = time.perf_counter()
+            n_offers = asyncio.run(_count(engine.crawl_targets(targets)))
+            results[crawl] = {"offers": n_offers, "seconds": time.perf_counter() - start, **engine.stats}
+    return results
+
+
+def _timed(func: Callable, name: str, timings: dict[str, float]) -> Callable:
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings[name] += time.perf_counter() - start
+
+    return wrapper
+
+
+def profile_extractors(scraper: Type[Scraper], pages: list[str]) -> dict[str, Any]:
+    """Parses the pages with `process_html` while timing `get_offers`, `process_tag` and every `_extract_*`."""
+    names = [name for name in vars(scraper) if name.startswith("_extract") or name in ("get_offers", "process_tag")]
+    originals = {name: vars(scraper)[name] for name in names}
+    timings: dict[str, float] = defaultdict(float)
+    for name, original in originals.items():
+        setattr(scraper, name, staticmethod(_timed(original.__func__, name, timings)))
+    try:
+        start = time.perf_counter()
+        for page in pages:
+            parse_page(scraper, page, ParserBackend.BS4)
+        elapsed = time.perf_counter() - start
+    finally:
+        for name, original in originals.items():
+            setattr(scraper, name, original)
+
+    return {
+        "pages": len(pages),
+        "seconds": elapsed,
+        "pages_per_second": len(pages) / elapsed,
+        "html_parsing_seconds": elapsed - timings["get_offers"] - timings["process_tag"],
+        "extractor_seconds": {name: timings[name] for name in names},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Directory of the recorded pages.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record_parser = commands.add_parser("record", help="Record pages into the corpus.")
+    record_parser.add_argument("--pages", type=int, default=3, help="Number of pages per crawl target.")
+    record_parser.add_argument("--delay", type=float, default=1.0, help="Seconds between requests.")
+    record_parser.add_argument("--synthetic", action="store_true", help="Generate pages instead of fetching them.")
+    record_parser.add_argument("--offers", type=int, default=30, help="Number of offers per synthetic page.")
+    replay_parser = commands.add_parser("replay", help="Replay the corpus and report parsing performance.")
+    replay_parser.add_argument("--output", default=None, help="Path of the JSON report.")
+    args = parser.parse_args()
+
+    corpus = PageCorpus(args.corpus)
+    if args.command == "record":
+        if args.synthetic:
+            record_synthetic(corpus, args.pages, args.offers)
+        else:
+            record(corpus, args.pages, args.delay)
+        logger.info(f"Corpus {args.corpus} holds {len(corpus.pages)} pages")
+        return
+
+    if not corpus.pages:
+        parser.error(f"No pages recorded in {args.corpus}. Run the record command first.")
+    results: dict[str, Any] = {"corpus_pages": len(corpus.pages)}
+    results["replay"] = {backend.value: replay(corpus, backend) for backend in ParserBackend}
+    logger.remove()
+    results["incremental"] = replay_incremental(corpus)
+    results["extractors"] = {
+        name: profile_extractors(scraper, [corpus.read(page) for page in corpus.pages if page.scraper == name])
+        for name, scraper in SCRAPERS.items()
+    }
+
+    write_results("scraper_replay", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Load test of `/v1.0/predict` served like `python main.py` (one uvicorn worker with reload and debug logs), by a
+single uvicorn worker and by gunicorn with several preloaded workers (see `gunicorn.conf.py`).
+
+Every mode serves the same fixture model (a random forest trained on synthetic listings) with the prediction cache
+disabled, so every request evaluates the model. The load generator runs in this process, so on a small machine it
+competes with the server for CPU: compare modes on a machine with more cores than workers.
+
+Run from `src/`: python -m benchmarks.serving_load --workers 4 --concurrency 32 --output serving_load.json
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess  # nosec
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+import aiohttp
+import numpy as np
+import requests
+
+from benchmarks import write_results
+from benchmarks.synthetic_listings import listings_matrix
+from enums import ModelEnum
+from models.registry import ModelRegistry
+from models.serialization import ArtifactFormat
+
+PREDICT_PATH = "/v1.0/predict"
+
+
+def create_fixture_registry(directory: str, rows: int) -> str:
+    """Registers and activates a random forest trained on synthetic listings, returns its version."""
+    x, y = listings_matrix(rows)
+    registry = ModelRegistry(directory, ArtifactFormat.JOBLIB)
+    model = ModelEnum.RANDOM_FOREST.create().fit(x, y)
+    version = registry.register(model, {"model_used": ModelEnum.RANDOM_FOREST.name, "source": "fixture"})["version"]
+    registry.activate(version)
+    return version
+
+
+def get_free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def serve(command: list[str], env: dict[str, str], port: int, timeout: float = 60) -> Iterator[str]:
+    """Runs the app with `command` from `src/` and yields its base url once it responds."""
+    src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    # server logs go to stderr, so that stdout only holds the report
+    with subprocess.Popen(command, cwd=src_dir, env={**os.environ, **env}, stdout=sys.stderr) as process:  # nosec
+        url = f"http://127.0.0.1:{port}"
+        try:
+            deadline = time.monotonic() + timeout
+            while True:
+                try:
+                    requests.get(f"{url}/openapi.json", timeout=1).raise_for_status()
+                    break
+                except requests.RequestException:
+                    if process.poll() is not None or time.monotonic() > deadline:
+                        raise RuntimeError(f"Server {command} did not start") from None
+                    time.sleep(0.2)
+            yield url
+        finally:
+            process.terminate()
+            process.wait(timeout)
+
+
+def get_server_commands(port: int, workers: int) -> dict[str, tuple[list[str], dict[str, str]]]:
+    uvicorn = [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)]
+    return {
+        "uvicorn-dev": ([*uvicorn, "--log-level", "debug", "--reload"], {}),
+        "uvicorn-1-worker": ([*uvicorn, "--log-level", "warning", "--no-access-log"], {}),
+        f"gunicorn-{workers}-workers": (
+            [sys.executable, "-m", "gunicorn", "main:app", "--bind", f"127.0.0.1:{port}"],
+            {"WEB_CONCURRENCY": str(workers), "LOG_LEVEL": "warning", "ACCESS_LOG": ""},
+        ),
+    }
+
+
+async def _send(session: aiohttp.ClientSession, method: str, url: str, **kwargs: Any) -> float:
+    start = time.perf_counter()
+    async with session.request(method, url, **kwargs) as response:
+        await response.read()
+        response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def run_load(method: str, url: str, payloads: list[Any], concurrency: int, duration: float) -> dict[str, float]:
+    """Sends requests with `payloads` in a loop from `concurrency` clients for `duration` seconds."""
+    latencies: list[float] = []
+    errors = 0
+
+    async def client(offset: int, deadline: float) -> None:
+        nonlocal errors
+        i = offset
+        while time.perf_counter() < deadline:
+            try:
+                latencies.append(await _send(session, method, url, json=payloads[i % len(payloads)]))
+            except aiohttp.ClientError:
+                errors += 1
+            i += concurrency
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await asyncio.gather(*(client(i, time.perf_counter() + 1) for i in range(concurrency)))  # warm-up
+        latencies.clear()
+        start = time.perf_counter()
+        await asyncio.gather(*(client(i, start + duration) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    p50, p95, p99 = np.percentile(latencies or [np.nan], [50, 95, 99])
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_second": len(latencies) / elapsed,
+        "p50_ms": float(p50) * 1e3,
+        "p95_ms": float(p95) * 1e3,
+        "p99_ms": float(p99) * 1e3,
+    }
+
+
+def listing_payloads(count: int) -> list[dict[str, Any]]:
+    x, _ = listings_matrix(count, seed=1)
+    return [
+        {"area": float(area), "rooms": int(rooms), "floor": int(floor), "year": int(year)}
+        for area, rooms, floor, year in x
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20_000, help="Number of synthetic listings of the fixture model.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Number of gunicorn workers.")
+    parser.add_argument("--concurrency", type=int, default=32, help="Number of concurrent clients.")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load per mode.")
+    parser.add_argument("--output", default=None, help="Path of the JSON report.")
+    args = parser.parse_args()
+
+    payloads = listing_payloads(1000)
+    results: dict[str, Any] = {"cpus": os.cpu_count(), "concurrency": args.concurrency, "modes": {}}
+    with tempfile.TemporaryDirectory() as registry_dir:
+        create_fixture_registry(registry_dir, args.rows)
+        env = {"MODEL_REGISTRY_DIR": registry_dir, "PREDICTION_CACHE_SIZE": "0"}
+        for mode, (command, mode_env) in get_server_commands(port := get_free_port(), args.workers).items():
+            with serve(command, {**env, **mode_env}, port) as url:
+                load = run_load("GET", url + PREDICT_PATH, payloads, args.concurrency, args.duration)
+                results["modes"][mode] = asyncio.run(load)
+
+    baseline = results["modes"]["uvicorn-dev"]["requests_per_second"]
+    results["speedup"] = {mode: load["requests_per_second"] / baseline for mode, load in results["modes"].items()}
+    write_results("serving_load", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
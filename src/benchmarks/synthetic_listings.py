@@ -0,0 +1,16 @@
+import numpy as np
+
+
+def listings_matrix(rows: int, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """Synthetic (area, rooms, floor, year) features and full prices roughly shaped like scraped listings."""
+    rng = np.random.default_rng(seed)
+    x = np.column_stack(
+        [
+            rng.uniform(20, 150, rows),
+            rng.integers(1, 6, rows),
+            rng.integers(0, 15, rows),
+            rng.integers(1900, 2024, rows),
+        ]
+    )
+    y = x[:, 0] * 10_000 + rng.normal(0, 50_000, rows)
+    return x, y
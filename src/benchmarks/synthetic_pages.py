@@ -0,0 +1,76 @@
+import random
+
+_BOILERPLATE_HEAD = "".join(
+    [
+        "<html><head><title>Oferty</title><script>",
+        "var tracking = {};" * 200,
+        "</script></head><body><nav>",
+        *(f'<a class="nav__link" href="/kategoria/{i}">Kategoria {i}</a>' for i in range(150)),
+        "</nav><main>",
+    ]
+)
+_BOILERPLATE_TAIL = "</main><footer>" + "<p>Informacje prawne i kontakt</p>" * 50 + "</footer></body></html>"
+
+
+def _floor(rng: random.Random) -> int | None:
+    floor = rng.randint(0, 10)
+    return floor or None  # None stands for "parter" (ground floor)
+
+
+def tyszkiewicz_page(n_offers: int = 20, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    offers = []
+    for _ in range(n_offers):
+        floor = _floor(rng)
+        offers.append(
+            '<div class="offer__box bi wow fadeInUp promote-">'
+            f'<h2 class="offer__box--name"><a href="oferta,{rng.randint(1, 10**7)}">Mieszkanie w Gdańsku</a></h2>'
+            f'<div class="offer__box--number">NR: TY{rng.randint(10**5, 10**6)} 2023-09-{rng.randint(10, 30)}</div>'
+            '<div class="offer__box--prices">'
+            f'<div class="offer__box--price">{rng.randint(200, 2000)} {rng.randint(100, 999)},00 zł</div>'
+            f'<div class="offer__box--pricePer">{rng.randint(5, 20)} {rng.randint(100, 999)},50 zł m'
+            '<sup class="sup">2</sup></div>'
+            "</div>"
+            '<div class="offer__box--basic bi d-c-b">'
+            f'<div class="offer__box--basicOne bi">{rng.randint(20, 150)}.{rng.randint(10, 99)}m'
+            '<sup class="sup">2</sup></div>'
+            f'<div class="offer__box--basicOne bi">{rng.randint(1, 6)} pokoje</div>'
+            f'<div class="offer__box--basicOne bi">{f"{floor} piętro" if floor else "parter"}</div>'
+            f'<div class="offer__box--basicOne bi">{rng.randint(1900, 2023)} r</div>'
+            "</div></div>"
+        )
+    return _BOILERPLATE_HEAD + "".join(offers) + _BOILERPLATE_TAIL
+
+
+def _icon(name: str, value: str) -> str:
+    return (
+        f'<li class="list__item__details__icons__element details--icons--element--{name}">'
+        f'<p class="list__item__details__icons__element__desc">{value}</p></li>'
+    )
+
+
+def ogloszenia_trojmiasto_page(n_offers: int = 30, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    offers = []
+    for _ in range(n_offers):
+        _id = rng.randint(10**7, 10**8)
+        floor = _floor(rng)
+        offers.append(
+            "".join(
+                [
+                    f'<div class="list__item list--item--withPrice" data-id="{_id}" id="ogl-{_id}">'
+                    '<div class="list__item__picture"><div class="list__item__picture__price">'
+                    f"<p>{rng.randint(200, 2000)} {rng.randint(100, 999)} zł</p></div></div>"
+                    '<div class="list__item__content">'
+                    f'<a class="list__item__content__title__name link" href="/ogl{_id}.html">Mieszkanie {_id}</a>'
+                    '<p class="list__item__content__subtitle">Gdańsk, Grunwaldzka 1</p>'
+                    '<ul class="list__item__details__icons">',
+                    _icon("powierzchnia", f" {rng.randint(20, 150)} m2 "),
+                    _icon("l_pokoi", f" {rng.randint(1, 6)} "),
+                    _icon("pietro", f" {floor or 'parter'} "),
+                    _icon("rok_budowy", f" {rng.randint(1900, 2023)} "),
+                    "</ul></div></div>",
+                ]
+            )
+        )
+    return _BOILERPLATE_HEAD + "".join(offers) + _BOILERPLATE_TAIL
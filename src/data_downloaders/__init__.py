@@ -1,13 +1,36 @@
 import asyncio
 import json
 import os
+from typing import AsyncIterator, Callable, Final, Iterator, TypeVar
 
+import pandas as pd
+import pyarrow as pa
 from azure.storage.blob.aio import ContainerClient
 
+from data_downloaders.blob_cache import BlobCache
+from dataset import CRAWL_COLUMN, LISTING_SCHEMA, normalize_listings, read_listings
+from dataset.deduplication import Deduplicator
+from monitoring import BLOB_DOWNLOAD_BYTES, span
+
 CONTAINER_URL = os.getenv("CONTAINER_URL")
 if CONTAINER_URL is None:
     raise ValueError("CONTAINER_URL env variable not set. Import after loading .env file")
 
+RAW_EXTENSIONS: Final[tuple[str, ...]] = (".json", ".ndjson")
+PARQUET_PREFIX: Final[str] = "parquet/"
+
+DOWNLOAD_CONCURRENCY: Final[int] = int(os.getenv("BLOB_DOWNLOAD_CONCURRENCY", "8"))
+DOWNLOAD_CHUNK_SIZE: Final[int] = 4 * 1024 * 1024
+DEDUPLICATION_SPILL_DIR: Final[str | None] = os.getenv("DEDUPLICATION_SPILL_DIR")  # unset: deduplicate in memory
+DEDUPLICATION_PARTITIONS: Final[int] = int(os.getenv("DEDUPLICATION_PARTITIONS", "16"))
+
+T = TypeVar("T")
+
+blob_cache = BlobCache(
+    os.getenv("BLOB_CACHE_DIR", "./blob_cache"),
+    int(os.getenv("BLOB_CACHE_MAX_BYTES", str(5 * 1024**3))),
+)
+
 
 async def get_blobs_names() -> list[str]:
     async with ContainerClient.from_container_url(CONTAINER_URL) as container_client:
@@ -17,30 +40,176 @@ async def get_blobs_names() -> list[str]:
     return result
 
 
-async def download_blob(blob_name: str, _container_client: ContainerClient | None = None) -> str:
-    container_client = _container_client or ContainerClient.from_container_url(CONTAINER_URL)
-    async with container_client.get_blob_client(blob_name) as blob_client:
-        blob_data = await blob_client.download_blob(encoding="utf-8")
-    data = await blob_data.readall()
-    if _container_client is None:
-        await container_client.close()
-    return data
+async def get_blobs_etags() -> dict[str, str]:
+    async with ContainerClient.from_container_url(CONTAINER_URL) as container_client:
+        return {blob.name: blob.etag async for blob in container_client.list_blobs()}
 
 
-async def download_all_blobs() -> list[str]:
-    blobs_names = await get_blobs_names()
-    async with ContainerClient.from_container_url(CONTAINER_URL) as container_client:
-        blobs_data = await asyncio.gather(*(download_blob(blob_name, container_client) for blob_name in blobs_names))
-    return blobs_data
+def is_raw_blob(blob_name: str) -> bool:
+    return not blob_name.startswith(PARQUET_PREFIX) and blob_name.endswith(RAW_EXTENSIONS)
+
+
+def get_parquet_blob_name(blob_name: str) -> str:
+    return f"{PARQUET_PREFIX}{os.path.splitext(blob_name)[0]}.parquet"
+
+
+def _get_container_client() -> ContainerClient:
+    # blobs are downloaded in DOWNLOAD_CHUNK_SIZE chunks and written to disk as they arrive
+    return ContainerClient.from_container_url(
+        CONTAINER_URL, max_single_get_size=DOWNLOAD_CHUNK_SIZE, max_chunk_get_size=DOWNLOAD_CHUNK_SIZE
+    )
+
+
+async def download_blob_cached(blob_name: str, etag: str, container_client: ContainerClient) -> str:
+    """Returns path of the local copy of the blob.
+
+    Crawl blobs are immutable once written, so a blob is only downloaded if its ETag is not in the local cache.
+    """
+    path = blob_cache.get(blob_name, etag)
+    if path is not None:
+        return path
+
+    temp_path = blob_cache.get_temp_path(blob_name)
+    size = 0
+    try:
+        async with container_client.get_blob_client(blob_name) as blob_client:
+            downloader = await blob_client.download_blob()
+            with open(temp_path, "wb") as f:
+                async for chunk in downloader.chunks():
+                    f.write(chunk)
+                    size += len(chunk)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    BLOB_DOWNLOAD_BYTES.observe(size)
+    return blob_cache.commit(blob_name, downloader.properties.etag, temp_path)
+
+
+async def _iter_blobs(
+    blobs_names: Callable[[list[str]], list[str]], decode: Callable[[str, str], T], concurrency: int
+) -> AsyncIterator[tuple[str, T]]:
+    """Downloads at most `concurrency` blobs at once and decodes each one (in a thread) as soon as it arrives.
+
+    Yields (blob name, decoded blob) in completion order.
+    """
+    blobs_etags = await get_blobs_etags()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with _get_container_client() as container_client:
+
+        async def load(blob_name: str) -> tuple[str, T]:
+            async with semaphore:
+                path = await download_blob_cached(blob_name, blobs_etags[blob_name], container_client)
+            return blob_name, await asyncio.to_thread(decode, blob_name, path)
+
+        with blob_cache.reading():
+            tasks = [asyncio.create_task(load(blob_name)) for blob_name in blobs_names(list(blobs_etags))]
+            try:
+                for next_loaded in asyncio.as_completed(tasks):
+                    yield await next_loaded
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    blob_cache.prune(set(blobs_etags))  # also persists access times used for LRU eviction
+
+
+def read_blob_records(blob_name: str, path: str) -> Iterator[dict]:
+    with open(path, encoding="utf-8") as f:
+        if blob_name.endswith(".ndjson"):  # streamed crawls, one offer per line
+            yield from (json.loads(line) for line in f if line.strip())
+        else:
+            yield from json.load(f)
+
+
+def get_crawl_name(blob_name: str) -> str:
+    return os.path.splitext(blob_name.removeprefix(PARQUET_PREFIX))[0]
+
+
+def _get_dataset_blobs(blobs_names: list[str]) -> list[str]:
+    """Picks one blob per crawl, preferring its Parquet version."""
+    crawls: dict[str, str] = {}
+    for blob_name in sorted(blobs_names, key=lambda name: name.startswith(PARQUET_PREFIX)):
+        if (blob_name.startswith(PARQUET_PREFIX) and blob_name.endswith(".parquet")) or is_raw_blob(blob_name):
+            crawls[get_crawl_name(blob_name)] = blob_name
+    return list(crawls.values())
+
+
+def _load_table(blob_name: str, path: str, columns: list[str] | None) -> pa.Table:
+    if blob_name.startswith(PARQUET_PREFIX):
+        with span("dataset.read_parquet"):
+            return read_listings(pa.memory_map(path), columns)
+    with span("dataset.read_raw"):
+        table = normalize_listings(read_blob_records(blob_name, path))
+    return table.select(columns) if columns is not None else table
+
+
+def download_dataset(
+    columns: list[str] | None = None, concurrency: int = DOWNLOAD_CONCURRENCY, newer_than: str | None = None
+) -> AsyncIterator[tuple[str, pa.Table]]:
+    """Downloads every crawl, or only crawls whose name (its start time) sorts after `newer_than`."""
+
+    def get_blobs(blobs_names: list[str]) -> list[str]:
+        blobs = _get_dataset_blobs(blobs_names)
+        return [name for name in blobs if get_crawl_name(name) > newer_than] if newer_than is not None else blobs
+
+    return _iter_blobs(get_blobs, lambda blob_name, path: _load_table(blob_name, path, columns), concurrency)
+
+
+def download_blobs(
+    blobs_names: list[str], read: Callable[[str, str], T], concurrency: int = DOWNLOAD_CONCURRENCY
+) -> AsyncIterator[tuple[str, T]]:
+    """Downloads the given blobs in chunks into the blob cache and reads each local copy with `read(name, path)`."""
+    selected = set(blobs_names)
+    return _iter_blobs(lambda names: [name for name in names if name in selected], read, concurrency)
+
+
+def get_dataset_etags() -> dict[str, str]:
+    """ETags of the blobs making up the dataset (one per crawl), which change whenever the dataset does."""
+    blobs_etags = asyncio.run(get_blobs_etags())
+    return {blob_name: blobs_etags[blob_name] for blob_name in sorted(_get_dataset_blobs(list(blobs_etags)))}
+
+
+async def _sync_blob_cache() -> int:
+    return len(
+        [
+            blob_name
+            async for blob_name, _ in _iter_blobs(_get_dataset_blobs, lambda _, path: path, DOWNLOAD_CONCURRENCY)
+        ]
+    )
+
+
+def sync_blob_cache() -> dict[str, str]:
+    """Downloads dataset blobs missing from the local blob cache, so training loads them from disk.
+
+    Returns ETags of the dataset blobs.
+    """
+    asyncio.run(_sync_blob_cache())
+    return get_dataset_etags()
+
 
+async def _deduplicate_dataset(
+    columns: list[str] | None, newer_than: str | None, crawl_column: str | None
+) -> pa.Table | None:
+    deduplicator = Deduplicator(DEDUPLICATION_SPILL_DIR, DEDUPLICATION_PARTITIONS)
+    async for blob_name, table in download_dataset(columns, newer_than=newer_than):
+        with span("dataset.deduplicate"):
+            deduplicator.add(get_crawl_name(blob_name), table)
+    with span("dataset.finish_deduplication"):
+        return deduplicator.finish(crawl_column)
 
-def remove_duplicates(data: list[dict]) -> list[dict]:
-    results = {item["id"]: item for item in data}.values()
-    return list(results)
 
+def get_dataset_from_all_blobs(columns: list[str] | None = None, newer_than: str | None = None) -> pd.DataFrame:
+    """Loads only `columns` of every crawl (Parquet where converted), keeping the newest offer for each id.
 
-def get_data_from_all_blobs() -> list[dict]:
-    blobs_data = asyncio.run(download_all_blobs())
-    data_in_json = [json.loads(blob_data) for blob_data in blobs_data]
-    flatten_data = [item for sublist in data_in_json for item in sublist]
-    return remove_duplicates(flatten_data)
+    Crawls are deduplicated as they arrive; `columns` must contain `id` (and `date` to prefer newest listings).
+    With `CRAWL_COLUMN` in `columns`, every offer has the name of its crawl, the newest of which is the data
+    watermark to load only crawls `newer_than` it next time.
+    """
+    crawl_column = CRAWL_COLUMN if columns is not None and CRAWL_COLUMN in columns else None
+    blob_columns = [column for column in columns if column != CRAWL_COLUMN] if columns is not None else None
+    table = asyncio.run(_deduplicate_dataset(blob_columns, newer_than, crawl_column))
+    if table is None:
+        return pd.DataFrame(columns=columns or LISTING_SCHEMA.names)
+    return table.select(columns).to_pandas() if columns is not None else table.to_pandas()
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Iterator
+
+from loguru import logger
+
+
+@dataclass
+class _CacheEntry:
+    etag: str
+    file_name: str
+    size: int
+    last_access: float
+
+
+class BlobCache:
+    """Local on-disk copy of crawl blobs keyed by blob name and ETag.
+
+    `manifest.json` maps every cached blob to its ETag, file and last access time. When the cached files exceed
+    `max_bytes`, least recently used blobs are evicted at the end of a sync.
+
+    The cache may be shared by several processes (API workers). The manifest is reread and rewritten while holding an
+    flock on `manifest.lock`, and files are only read while holding a shared flock on `reading.lock` (see `reading`),
+    so blobs are removed only when no process is reading the cache.
+    """
+
+    MANIFEST: str = "manifest.json"
+    LOCK_FILE: str = "manifest.lock"
+    READING_LOCK_FILE: str = "reading.lock"
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._entries = self._load_manifest()
+
+    @property
+    def _manifest_path(self) -> str:
+        return os.path.join(self.directory, self.MANIFEST)
+
+    def _load_manifest(self) -> dict[str, _CacheEntry]:
+        try:
+            with open(self._manifest_path, encoding="utf-8") as f:
+                return {name: _CacheEntry(**entry) for name, entry in json.load(f).items()}
+        except FileNotFoundError:
+            return {}
+        except (ValueError, TypeError) as ex:
+            logger.warning(f"Corrupted blob cache manifest, starting with an empty cache: {ex}")
+            return {}
+
+    def _save_manifest(self) -> None:
+        tmp_path = f"{self._manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({name: asdict(entry) for name, entry in self._entries.items()}, f)
+        os.replace(tmp_path, self._manifest_path)
+
+    @contextmanager
+    def _locked_manifest(self) -> Iterator[dict[str, _CacheEntry]]:
+        """Entries of the manifest, reread and then saved while no other thread or process changes them."""
+        with self._lock, open(self._get_path(self.LOCK_FILE), "w", encoding="utf-8") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)  # released when the file is closed
+            self._entries = self._load_manifest()
+            yield self._entries
+            self._save_manifest()
+
+    @contextmanager
+    def reading(self) -> Iterator[None]:
+        """Keeps every process from removing cached files while the block reads them."""
+        with open(self._get_path(self.READING_LOCK_FILE), "w", encoding="utf-8") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_SH)
+            yield
+
+    @property
+    def size(self) -> int:
+        return sum(entry.size for entry in self._entries.values())
+
+    def _get_path(self, file_name: str) -> str:
+        return os.path.join(self.directory, file_name)
+
+    def get(self, blob_name: str, etag: str) -> str | None:
+        """Returns path of the cached blob or None if it is not cached with the given ETag."""
+        with self._locked_manifest() as entries:
+            entry = entries.get(blob_name)
+            if entry is None or entry.etag != etag:
+                return None
+            if not os.path.exists(path := self._get_path(entry.file_name)):
+                del entries[blob_name]
+                return None
+
+            entry.last_access = time.time()
+            return path
+
+    def get_temp_path(self, blob_name: str) -> str:
+        """Path to stream a blob into before it is committed to the cache."""
+        return self._get_path(f"{hashlib.sha256(blob_name.encode()).hexdigest()}.{uuid.uuid4().hex}.tmp")
+
+    def commit(self, blob_name: str, etag: str, temp_path: str) -> str:
+        file_name = hashlib.sha256(blob_name.encode()).hexdigest()
+        with self._locked_manifest() as entries:
+            os.replace(temp_path, self._get_path(file_name))
+            entries[blob_name] = _CacheEntry(etag, file_name, os.path.getsize(self._get_path(file_name)), time.time())
+        return self._get_path(file_name)
+
+    def prune(self, existing_blobs: set[str]) -> None:
+        """Removes blobs which no longer exist in the container and evicts blobs over the size cap.
+
+        Called after a sync has finished reading the cached files. Nothing is removed while any process is still
+        reading the cache; the next sync prunes it then.
+        """
+        with open(self._get_path(self.READING_LOCK_FILE), "w", encoding="utf-8") as reading_lock:
+            try:
+                fcntl.flock(reading_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                logger.info("Blob cache is being read, pruning it after the next sync")
+                return
+            with self._locked_manifest() as entries:
+                for blob_name in set(entries) - existing_blobs:
+                    self._remove(blob_name)
+                self._evict()
+
+    def _evict(self) -> None:
+        size = self.size
+        for blob_name, entry in sorted(self._entries.items(), key=lambda item: item[1].last_access):
+            if size <= self.max_bytes:
+                break
+            size -= entry.size
+            logger.info(f"Evicting {blob_name} from blob cache")
+            self._remove(blob_name)
+
+    def _remove(self, blob_name: str) -> None:
+        entry = self._entries.pop(blob_name)
+        try:
+            os.remove(self._get_path(entry.file_name))
+        except FileNotFoundError:
+            pass
@@ -1,46 +1,168 @@
+from __future__ import annotations
+
+import base64
+import hashlib
 import json
 import os
+import tempfile
 import uuid
 from datetime import datetime
-from typing import Iterator
+from types import TracebackType
+from typing import Any, Iterable, Iterator
 
-from azure.storage.blob import ContainerClient
+from azure.storage.blob import BlobBlock, BlobClient, ContainerClient
 from loguru import logger
 
+from data_downloaders import get_parquet_blob_name
+from dataset import ListingsWriter
+from scraper.engine import CrawlerEngine
 from scraper.ogloszenia_trojmiasto import OgloszeniaTrojmiasto
+from scraper.page_cache import PageCache
 from scraper.tyszkiewicz import Tyszkiewicz
 
 CONTAINER_URL = os.getenv("CONTAINER_URL")
 if CONTAINER_URL is None:
     raise ValueError("CONTAINER_URL env variable not set. Import after loading .env file")
+PAGE_CACHE_PATH = os.getenv("PAGE_CACHE_PATH", "./page_cache.json")  # "" disables conditional, incremental crawls
+
 
+def load_page_cache() -> PageCache | None:
+    return PageCache(PAGE_CACHE_PATH) if PAGE_CACHE_PATH else None
 
-def collect_data() -> Iterator[dict]:
+
+def collect_data(page_cache: PageCache | None = None) -> Iterator[dict]:
+    """Crawls all scrapers. With a `page_cache`, only offers on pages changed since the cached crawl are found."""
     scrapers = [
         Tyszkiewicz,
         OgloszeniaTrojmiasto,
     ]
 
-    for scraper in scrapers:
-        yield from scraper.run_crawler()
+    yield from CrawlerEngine(page_cache=page_cache).run(scrapers)
+
+
+def get_blob_name(extension: str) -> str:
+    current_date = datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
+    uid = uuid.uuid4()
+    return f"{current_date}-{uid}.{extension}"
+
+
+class BlockBlobWriter:  # pylint: disable=too-many-instance-attributes
+    """Streams offers into a block blob as compact NDJSON while they are being scraped.
+
+    Offers are buffered up to `block_size` bytes and staged as a block. The staged blocks are committed every
+    `commit_every` blocks and on close (also after an error), so memory stays flat and a crawl which dies midway
+    still leaves everything scraped so far in the blob. No blob is created until an offer is written.
+    """
+
+    def __init__(self, blob_client: BlobClient, block_size: int = 4 * 1024 * 1024, commit_every: int = 4) -> None:
+        self.blob_client = blob_client
+        self.block_size = block_size
+        self.commit_every = commit_every
+        self.offers_written = 0
+        self._buffer: list[bytes] = []
+        self._buffered_bytes = 0
+        self._blocks: list[BlobBlock] = []
+        self._committed_blocks = 0
+
+    def write(self, offer: dict) -> None:
+        line = (json.dumps(offer, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        self._buffer.append(line)
+        self._buffered_bytes += len(line)
+        self.offers_written += 1
+        if self._buffered_bytes >= self.block_size:
+            self._stage_block()
+
+    def _stage_block(self) -> None:
+        if not self._buffer:
+            return
 
+        block_id = base64.b64encode(f"{len(self._blocks):010d}".encode()).decode()
+        self.blob_client.stage_block(block_id, b"".join(self._buffer))  # type: ignore[type-var]
+        self._blocks.append(BlobBlock(block_id))
+        self._buffer.clear()
+        self._buffered_bytes = 0
+        if len(self._blocks) % self.commit_every == 0:
+            self.commit()
 
-def convert_data_to_json(data: Iterator[dict]) -> str:
-    return json.dumps(list(data), indent=2)
+    def commit(self) -> None:
+        if self._committed_blocks == len(self._blocks):
+            return
+        self.blob_client.commit_block_list(self._blocks)
+        self._committed_blocks = len(self._blocks)
+        logger.info(f"Committed {len(self._blocks)} blocks to blob {self.blob_client.blob_name}")
 
+    def close(self) -> None:
+        self._stage_block()
+        self.commit()
 
-def upload_data_to_blob(data: str) -> None:
+    def __enter__(self) -> BlockBlobWriter:
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        if exc is not None:
+            logger.error(
+                f"Crawl failed after {self.offers_written} offers, keeping them in {self.blob_client.blob_name}"
+            )
+        self.close()
+
+
+def upload_data(offers: Iterable[dict]) -> str | None:
+    """Streams offers into a new crawl blob and into its Parquet version, uploaded once the crawl blob is complete.
+
+    The Parquet file is written to a local temporary file batch by batch, so memory stays flat for any crawl size.
+    Returns the name of the blob, or None when there were no offers, so no blob was created.
+    """
     container_client = ContainerClient.from_container_url(CONTAINER_URL)
-    current_date = datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
-    uid = uuid.uuid4()
-    blob_name = f"{current_date}-{uid}.json"
-    blob_client = container_client.get_blob_client(blob_name)
+    blob_name = get_blob_name("ndjson")
     logger.info(f"Uploading data to blob {blob_name}...")
-    blob_client.upload_blob(data)
-    logger.success(f"Successfully uploaded data to blob {blob_name}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        parquet_path = os.path.join(tmp_dir, "listings.parquet")
+        with ListingsWriter(parquet_path) as listings_writer:
+            with BlockBlobWriter(container_client.get_blob_client(blob_name)) as writer:
+                for offer in offers:
+                    writer.write(offer)
+                    listings_writer.write(offer)
+
+        if writer.offers_written == 0:
+            logger.info(f"No offers to upload, blob {blob_name} was not created")
+            return None
+        logger.success(f"Successfully uploaded {writer.offers_written} offers to blob {blob_name}")
+        parquet_blob_name = get_parquet_blob_name(blob_name)
+        with open(parquet_path, "rb") as f:
+            container_client.upload_blob(parquet_blob_name, f, overwrite=True)
+    logger.success(f"Converted {blob_name} ({listings_writer.rows} offers) to {parquet_blob_name}")
+    return blob_name
+
+
+def collect_and_upload_data() -> str | None:
+    page_cache = load_page_cache()
+    blob_name = upload_data(collect_data(page_cache))
+    if page_cache is not None:
+        page_cache.save()  # only once the offers are uploaded, so a failed upload does not make them known
+    return blob_name
+
+
+def collect_data_to_file(path: str, page_cache: PageCache | None = None) -> dict[str, Any]:
+    """Crawls into a local NDJSON file. Returns the number of offers and their digest.
+
+    Offers arrive in completion order, so the digest is a sum of hashes of the offers, which is the same for two
+    crawls finding the same offers in any order.
+    """
+    offers, digest = 0, 0
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for offer in collect_data(page_cache):
+            line = json.dumps(offer, ensure_ascii=False, separators=(",", ":"))
+            f.write(line + "\n")
+            offers += 1
+            digest = (digest + int.from_bytes(hashlib.sha256(line.encode("utf-8")).digest(), "big")) % 2**256
+    os.replace(tmp_path, path)
+    logger.success(f"Collected {offers} offers to {path}")
+    return {"offers": offers, "sha256": f"{digest:064x}"}
 
 
-def collect_and_upload_data() -> None:
-    data = collect_data()
-    json_data = convert_data_to_json(data)
-    upload_data_to_blob(json_data)
+def read_data_file(path: str) -> Iterator[dict]:
+    with open(path, encoding="utf-8") as f:
+        yield from (json.loads(line) for line in f if line.strip())
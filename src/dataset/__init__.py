@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from types import TracebackType
+from typing import Any, BinaryIO, Final, Iterable
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+LISTING_SCHEMA: Final[pa.Schema] = pa.schema(
+    [
+        ("id", pa.string()),
+        ("date", pa.date32()),
+        ("full_price", pa.float64()),
+        ("area", pa.float32()),
+        ("rooms", pa.int16()),
+        ("floor", pa.int16()),
+        ("year", pa.int16()),
+        ("category", pa.dictionary(pa.int8(), pa.string())),
+        ("source", pa.dictionary(pa.int8(), pa.string())),
+        ("address", pa.string()),
+    ]
+)
+CRAWL_COLUMN: Final[str] = "crawl"  # not stored, added on load: name of the crawl an offer comes from
+COMPRESSION: Final[str] = "zstd"
+BATCH_SIZE: Final[int] = 50_000
+
+
+def _to_number(values: list[Any], field: pa.Field) -> pa.Array:
+    numbers = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(dtype=np.float64)
+    if pa.types.is_integer(field.type):
+        info = np.iinfo(field.type.to_pandas_dtype())
+        invalid = np.isnan(numbers) | (numbers % 1 != 0) | (numbers < info.min) | (numbers > info.max)
+        return pa.array(np.where(invalid, 0, numbers).astype(info.dtype), type=field.type, mask=invalid)
+    return pa.array(numbers, type=field.type, from_pandas=True)
+
+
+def _to_column(values: list[Any], field: pa.Field) -> pa.Array:
+    if pa.types.is_date(field.type):
+        dates = pd.to_datetime(pd.Series(values, dtype=object), format="%Y-%m-%d", errors="coerce")
+        return pa.array(dates.dt.date, type=field.type, from_pandas=True)
+    if pa.types.is_dictionary(field.type):
+        return pa.array(values, type=pa.string()).dictionary_encode().cast(field.type)
+    if pa.types.is_string(field.type):
+        return pa.array(values, type=field.type)
+    return _to_number(values, field)
+
+
+def normalize_listings(records: Iterable[dict]) -> pa.Table:
+    """Turns scraped offers (dicts of strings) into a typed table; values which can't be parsed become nulls."""
+    records = list(records)
+    return pa.Table.from_arrays(
+        [_to_column([record.get(field.name) for record in records], field) for field in LISTING_SCHEMA],
+        schema=LISTING_SCHEMA,
+    )
+
+
+class ListingsWriter:
+    """Writes offers to a compressed Parquet file as they arrive, one row group per `batch_size` offers.
+
+    Only the current batch is kept in memory, so a crawl can be converted while it is being streamed.
+    """
+
+    def __init__(self, sink: str | BinaryIO, batch_size: int = BATCH_SIZE) -> None:
+        self.batch_size = batch_size
+        self.rows = 0
+        self._batch: list[dict] = []
+        self._writer = pq.ParquetWriter(sink, LISTING_SCHEMA, compression=COMPRESSION)
+
+    def write(self, record: dict) -> None:
+        self._batch.append(record)
+        if len(self._batch) >= self.batch_size:
+            self._write_batch()
+
+    def _write_batch(self) -> None:
+        if not self._batch:
+            return
+        table = normalize_listings(self._batch)
+        self._writer.write_table(table)
+        self.rows += table.num_rows
+        self._batch = []
+
+    def close(self) -> None:
+        self._write_batch()
+        self._writer.close()
+
+    def __enter__(self) -> ListingsWriter:
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        self.close()
+
+
+def write_listings(records: Iterable[dict], sink: str | BinaryIO, batch_size: int = BATCH_SIZE) -> int:
+    """Writes offers to a compressed Parquet file, one row group per `batch_size` offers. Returns number of rows."""
+    with ListingsWriter(sink, batch_size) as writer:
+        for record in records:
+            writer.write(record)
+    return writer.rows
+
+
+def read_listings(source: str | BinaryIO | pa.NativeFile, columns: list[str] | None = None) -> pa.Table:
+    return pq.read_table(source, columns=columns)
@@ -0,0 +1,79 @@
+"""One-off converter of crawl blobs (JSON / NDJSON) into compressed Parquet blobs stored under `parquet/`.
+
+Run from `src/`: python -m dataset.convert [--overwrite]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+
+from dotenv.main import load_dotenv
+from loguru import logger
+
+load_dotenv()
+load_dotenv("../.env")
+# pylint: disable=wrong-import-position
+from azure.storage.blob.aio import ContainerClient  # noqa: E402
+
+from data_downloaders import (  # noqa: E402
+    CONTAINER_URL,
+    download_blobs,
+    get_blobs_names,
+    get_parquet_blob_name,
+    is_raw_blob,
+    read_blob_records,
+)
+from dataset import write_listings  # noqa: E402
+
+
+def write_parquet(blob_name: str, path: str) -> tuple[str, int]:
+    """Converts the local copy of a raw blob offer by offer into a temporary Parquet file. Returns its path and rows."""
+    fd, parquet_path = tempfile.mkstemp(suffix=".parquet")
+    os.close(fd)
+    try:
+        return parquet_path, write_listings(read_blob_records(blob_name, path), parquet_path)
+    except BaseException:
+        os.remove(parquet_path)
+        raise
+
+
+async def convert_blob(blob_name: str, parquet_path: str, rows: int, container_client: ContainerClient) -> str:
+    parquet_blob_name = get_parquet_blob_name(blob_name)
+    try:
+        with open(parquet_path, "rb") as f:
+            await container_client.upload_blob(parquet_blob_name, f, overwrite=True)
+    finally:
+        os.remove(parquet_path)
+    logger.success(f"Converted {blob_name} ({rows} offers) to {parquet_blob_name}")
+    return parquet_blob_name
+
+
+async def convert_blobs(blobs_names: list[str] | None = None, overwrite: bool = False) -> list[str]:
+    """Converts given (default: all) raw blobs, skipping those already converted unless `overwrite` is set."""
+    existing_blobs = set(await get_blobs_names())
+    if blobs_names is None:
+        blobs_names = [blob_name for blob_name in sorted(existing_blobs) if is_raw_blob(blob_name)]
+    if not overwrite:
+        blobs_names = [name for name in blobs_names if get_parquet_blob_name(name) not in existing_blobs]
+
+    if not blobs_names:
+        return []
+
+    # blobs are downloaded in chunks through the blob cache and converted from disk, never held in memory whole
+    async with ContainerClient.from_container_url(CONTAINER_URL) as container_client:
+        return [
+            await convert_blob(blob_name, parquet_path, rows, container_client)
+            async for blob_name, (parquet_path, rows) in download_blobs(blobs_names, write_parquet)
+        ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--overwrite", action="store_true", help="Convert again blobs which already have Parquet.")
+    args = parser.parse_args()
+    converted = asyncio.run(convert_blobs(overwrite=args.overwrite))
+    logger.info(f"Converted {len(converted)} blobs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+from typing import Final, Iterator
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from dataset import COMPRESSION
+
+_CRAWL: Final[str] = "_crawl"
+
+
+class Deduplicator:  # pylint: disable=too-many-instance-attributes
+    """Keeps the newest offer for every id while crawls are added one by one, in any order.
+
+    Offers are ordered by `date` (if present) and then by crawl name, so the newest listing date wins and ties go to
+    the newest crawl. Tables stay in Arrow columns; only `id`, `date` and the crawl number are moved to pandas to
+    find rows to keep. Added crawls are buffered and compacted once they outgrow the already deduplicated rows.
+
+    With `spill_dir`, crawls are instead hash-partitioned by id into Parquet files and every partition is
+    deduplicated separately in `finish`, so peak memory is about one partition rather than the whole history.
+    """
+
+    def __init__(self, spill_dir: str | None = None, partitions: int = 16, compact_rows: int = 1_000_000) -> None:
+        self.spill_dir = tempfile.mkdtemp(dir=spill_dir) if spill_dir is not None else None
+        self.partitions = partitions
+        self.compact_rows = compact_rows
+        self._crawls: list[str] = []
+        self._deduplicated: pa.Table | None = None
+        self._buffer: list[pa.Table] = []
+        self._buffered_rows = 0
+        self._spilled_files = 0
+
+    def add(self, crawl: str, table: pa.Table) -> None:
+        table = table.filter(table["id"].is_valid())  # offers without id can't be deduplicated
+        self._crawls.append(crawl)
+        table = table.append_column(_CRAWL, pa.array(np.full(table.num_rows, len(self._crawls) - 1, dtype=np.int32)))
+
+        if self.spill_dir is not None:
+            self._spill(self.spill_dir, table)
+            return
+
+        self._buffer.append(table)
+        self._buffered_rows += table.num_rows
+        current_rows = self._deduplicated.num_rows if self._deduplicated is not None else 0
+        if self._buffered_rows >= max(self.compact_rows, current_rows):
+            self._compact()
+
+    def _crawl_ranks(self) -> np.ndarray:
+        ranks = np.empty(len(self._crawls), dtype=np.int32)
+        ranks[np.argsort(self._crawls, kind="stable")] = np.arange(len(self._crawls), dtype=np.int32)
+        return ranks
+
+    def _deduplicate(self, tables: list[pa.Table]) -> pa.Table:
+        table = pa.concat_tables(tables, promote_options="permissive")
+        keys = pd.DataFrame({"id": table["id"].to_numpy(), "rank": self._crawl_ranks()[table[_CRAWL].to_numpy()]})
+        sort_by = ["rank"]
+        if "date" in table.column_names:
+            keys["date"] = pd.to_datetime(table["date"].to_pandas())
+            sort_by = ["date", "rank"]
+
+        keys = keys.sort_values(sort_by, na_position="first", kind="stable")
+        keep = np.sort(keys.drop_duplicates("id", keep="last").index.to_numpy())
+        return table.take(keep)
+
+    def _compact(self) -> None:
+        tables = ([self._deduplicated] if self._deduplicated is not None else []) + self._buffer
+        if tables:
+            self._deduplicated = self._deduplicate(tables)
+        self._buffer = []
+        self._buffered_rows = 0
+
+    def _spill(self, spill_dir: str, table: pa.Table) -> None:
+        partition_of_rows = pd.util.hash_array(table["id"].to_numpy(zero_copy_only=False)) % self.partitions
+        for partition in range(self.partitions):
+            rows = np.flatnonzero(partition_of_rows == partition)
+            if len(rows) == 0:
+                continue
+            directory = os.path.join(spill_dir, str(partition))
+            os.makedirs(directory, exist_ok=True)
+            pq.write_table(
+                table.take(rows), os.path.join(directory, f"{self._spilled_files}.parquet"), compression=COMPRESSION
+            )
+            self._spilled_files += 1
+
+    def _iter_partitions(self, spill_dir: str) -> Iterator[pa.Table]:
+        for partition in range(self.partitions):
+            directory = os.path.join(spill_dir, str(partition))
+            if os.path.isdir(directory):
+                files = sorted(os.listdir(directory))
+                yield self._deduplicate([pq.read_table(os.path.join(directory, file)) for file in files])
+
+    def finish(self, crawl_column: str | None = None) -> pa.Table | None:
+        """Returns deduplicated offers or None if nothing was added.
+
+        With `crawl_column`, every offer keeps the name of the crawl it was taken from in that column.
+        """
+        if self.spill_dir is not None:
+            try:
+                tables = list(self._iter_partitions(self.spill_dir))
+            finally:
+                shutil.rmtree(self.spill_dir, ignore_errors=True)
+            result = pa.concat_tables(tables, promote_options="permissive") if tables else None
+        else:
+            self._compact()
+            result = self._deduplicated
+
+        if result is None:
+            return None
+        if crawl_column is not None:
+            names = pa.array(self._crawls).take(result[_CRAWL])
+            result = result.append_column(crawl_column, names)
+        return result.drop_columns([_CRAWL])
@@ -1,15 +1,23 @@
 from __future__ import annotations
 
 from enum import Enum
+from typing import Any
 
-from models.knn import k_neighbors_regressor
+from sklearn.base import clone
+
+from models.knn import k_neighbors_regressor, scaled_k_neighbors_regressor
 from models.random_forest import random_forest_regressor
 
 
 class ModelEnum(Enum):
     KNN = k_neighbors_regressor
+    SCALED_KNN = scaled_k_neighbors_regressor
     RANDOM_FOREST = random_forest_regressor
 
+    def create(self) -> Any:
+        """Returns a new unfitted estimator with the hyperparameters of the member's prototype."""
+        return clone(self.value)
+
     @staticmethod
     def get_default() -> ModelEnum:
         return ModelEnum.RANDOM_FOREST
@@ -0,0 +1,39 @@
+"""Production serving: `gunicorn main:app` (run from `src/`) reads this file.
+
+The app and its active model are loaded once in the master and the workers are forked from it, so they share the
+model's memory (copy-on-write) instead of each loading its own copy. Every worker runs an uvicorn event loop and
+evaluates models in its thread pool (THREADPOOL_SIZE threads). Use `python main.py` for development with reload.
+
+Every process writes its metrics to PROMETHEUS_MULTIPROC_DIR (a new temporary directory unless set, a set one must be
+empty on start), so `/metrics` served by any worker reports those of all of them.
+"""
+# pylint: disable=invalid-name
+import os
+import tempfile
+from typing import Any
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"  # nosec
+workers = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+reload = False
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("WORKER_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+loglevel = os.getenv("LOG_LEVEL", "info")
+accesslog = os.getenv("ACCESS_LOG", "-") or None  # empty disables the access log
+if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:  # set before the app (and prometheus_client) is imported
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="prometheus_")
+
+
+def when_ready(server: Any) -> None:  # pylint: disable=unused-argument
+    # called in the master after the app was imported (preload_app) and before the workers are forked
+    from main import preload_model  # pylint: disable=import-outside-toplevel
+
+    preload_model()
+
+
+def child_exit(server: Any, worker: Any) -> None:  # pylint: disable=unused-argument
+    from prometheus_client import multiprocess  # pylint: disable=import-outside-toplevel
+
+    multiprocess.mark_process_dead(worker.pid)
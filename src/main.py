@@ -1,59 +1,200 @@
 # pylint: disable=wrong-import-position
 
-from typing import Any
-
-import pickle  # nosec
+import json
+import os
+from functools import partial
+from typing import Any, Iterable
 
 from dotenv.main import load_dotenv
 
 load_dotenv()
 load_dotenv("../.env")
-from fastapi import FastAPI, HTTPException, APIRouter, Query
-from fastapi.responses import JSONResponse
+from anyio import to_thread
+from fastapi import FastAPI, HTTPException, APIRouter, Body, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 import uvicorn
 import pandas as pd
+from loguru import logger
 
-from data_loaders import collect_and_upload_data
-from data_downloaders import get_data_from_all_blobs
-from models import get_trained_model
+from data_loaders import (
+    PAGE_CACHE_PATH,
+    collect_and_upload_data,
+    collect_data_to_file,
+    load_page_cache,
+    read_data_file,
+    upload_data,
+)
+from data_downloaders import get_dataset_etags, get_dataset_from_all_blobs, sync_blob_cache
+from dataset import CRAWL_COLUMN
+from models import FEATURES, TARGET
+from models.preprocessing import InvalidFeaturesError
+from models.registry import ModelRegistry
+from models.serialization import ArtifactFormat
+from models.search import CV_FOLDS, DEFAULT_PARAM_GRIDS, ParamGrids, search_models, validate_param_grids
+from monitoring import PREDICT_SECONDS, render_metrics, span
 from enums import ModelEnum, ModelNameEnum
-from pydantic_models import HouseListing, Train, Prediction
-
-# from fastapi_utilities import repeat_every
-
+from pydantic_models import (
+    HouseListing,
+    TrainingJob,
+    ModelVersions,
+    Prediction,
+    BatchPrediction,
+    PredictionCacheStats,
+    PipelineRuns,
+)
+from scheduler import Pipeline, Stage, schedule
+from serving.batch import (
+    BatchValidationError,
+    NDJSON_CONTENT_TYPE,
+    listings_to_matrix,
+    parse_listings,
+    predict_in_chunks,
+)
+from serving.model_cache import RegistryModelCache
+from serving.prediction_cache import PredictionCache, listing_key
+from training.jobs import JobStatus, TrainingJobManager, plan_training
 
-TWO_DAYS = 172_800  # 2 days (48h) in seconds
-MODEL_PATH = "./models_bin/model.sav"
+MODEL_PATH = "./models_bin/model.sav"  # model pulled with dvc, imported into the registry if it is empty
+MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", "./models_bin/registry")
+MODEL_FORMAT = ArtifactFormat(os.getenv("MODEL_FORMAT", ArtifactFormat.JOBLIB.value))
+MODEL_COMPRESSION = os.getenv("MODEL_COMPRESSION", "0")  # e.g. "zlib:3": ~4x smaller, ~4x slower to load
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "compiled")  # "sklearn" disables the flat forest fast path
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))  # 0 disables the cache
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "3600"))  # seconds
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "40"))  # threads per worker for inference and sync routes
+FULL_REBUILD_EVERY = int(os.getenv("FULL_REBUILD_EVERY", "10"))  # incremental updates before a full refit
+TRAINING_JOBS_DIR = os.getenv("TRAINING_JOBS_DIR", "./training_jobs")  # jobs and training lock shared by all workers
+PIPELINE_DIR = os.getenv("PIPELINE_DIR", "./pipeline")  # state, lock and last crawl of the scheduled pipeline
+PIPELINE_CRON = os.getenv("PIPELINE_CRON")  # e.g. "0 3 */2 * *"; with neither this nor PIPELINE_INTERVAL it's off
+PIPELINE_INTERVAL = float(os.getenv("PIPELINE_INTERVAL", "0"))  # seconds between runs, e.g. 172800 (2 days)
+PIPELINE_MODEL = ModelEnum[os.getenv("PIPELINE_MODEL", ModelEnum.get_default().name)]
+PIPELINE_INCREMENTAL = os.getenv("PIPELINE_INCREMENTAL", "true").lower() == "true"
+MODEL_VERSION_QUERY = Query(default=None, description="Model version to use. Default: the active version.")
 
 app = FastAPI()
 version_1_0 = APIRouter(prefix="/v1.0", tags=["v1.0"])
+model_registry = ModelRegistry(MODEL_REGISTRY_DIR, MODEL_FORMAT, MODEL_COMPRESSION)
+model_cache = RegistryModelCache(model_registry, compiled=INFERENCE_BACKEND == "compiled")
+prediction_cache = PredictionCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL)
+
+
+def load_training_data(newer_than: str | None = None) -> pd.DataFrame:
+    return get_dataset_from_all_blobs(columns=["id", "date", *FEATURES, TARGET, CRAWL_COLUMN], newer_than=newer_than)
+
+
+def save_model(model: Any, metadata: dict[str, Any], training_ids: Iterable[str] | None = None) -> str:
+    version = model_cache.save(model, metadata, training_ids)
+    prediction_cache.clear()
+    return version
+
+
+training_jobs = TrainingJobManager(load_training_data, save_model, TRAINING_JOBS_DIR)
+
+
+def submit_training(model_type: ModelEnum, incremental: bool) -> dict[str, Any]:
+    plan = partial(plan_training, model_registry, model_type.name, load_training_data, incremental, FULL_REBUILD_EVERY)
+    key = f"{model_type.name} incremental" if incremental else model_type.name
+    return training_jobs.submit_plan(model_type.name, plan, key)
+
+
+def crawl_stage(_: dict[str, Any]) -> dict[str, Any]:
+    page_cache = load_page_cache()
+    result = collect_data_to_file(os.path.join(PIPELINE_DIR, "crawl.ndjson"), page_cache)
+    if page_cache is not None:
+        page_cache.save(os.path.join(PIPELINE_DIR, "page_cache.pending.json"))  # replaces the cache after upload
+    return result
+
+
+def promote_page_cache(_: dict[str, Any]) -> None:
+    # after the upload, or when it is skipped because the same offers were uploaded by a previous run
+    pending_page_cache = os.path.join(PIPELINE_DIR, "page_cache.pending.json")
+    if PAGE_CACHE_PATH and os.path.exists(pending_page_cache):
+        os.replace(pending_page_cache, PAGE_CACHE_PATH)
+
+
+def upload_stage(inputs: dict[str, Any]) -> dict[str, Any]:
+    blob = None  # with the page cache, a crawl of pages which did not change finds no offers
+    if inputs["crawl"]["offers"]:
+        blob = upload_data(read_data_file(os.path.join(PIPELINE_DIR, "crawl.ndjson")))
+    promote_page_cache(inputs)
+    return {"blob": blob}
+
+
+def sync_stage(_: dict[str, Any]) -> dict[str, Any]:
+    return {"etags": sync_blob_cache()}
+
+
+def train_stage(_: dict[str, Any]) -> dict[str, Any]:
+    job = training_jobs.wait(submit_training(PIPELINE_MODEL, PIPELINE_INCREMENTAL)["job_id"])
+    if job is None or job["status"] != JobStatus.SUCCEEDED:
+        raise RuntimeError(f"Training failed: {job['error'] if job is not None else 'job not found'}")
+    return {"job_id": job["job_id"], "model_version": job["result"]["model_version"]}
+
+
+# crawl -> upload (skipped for a crawl with the same offers) -> sync -> train (both skipped if no crawl blob changed)
+pipeline = Pipeline(
+    [
+        Stage("crawl", crawl_stage),
+        Stage("upload", upload_stage, depends_on=("crawl",), on_skip=promote_page_cache),
+        Stage("sync", sync_stage, depends_on=("upload",), fingerprint=get_dataset_etags),
+        Stage("train", train_stage, depends_on=("sync",)),
+    ],
+    PIPELINE_DIR,
+)
+
+
+def import_dvc_model() -> None:
+    if model_registry.active_version is None and os.path.exists(MODEL_PATH):
+        model_registry.activate(model_registry.register_file(MODEL_PATH, {"source": MODEL_PATH})["version"])
+
+
+@app.on_event("startup")
+def preload_model() -> None:
+    """Loads the active model before serving. Called in the gunicorn master too, so forked workers share its memory.
+
+    The model pulled with dvc is imported into an empty registry here rather than on import, because processes
+    spawned by the app (parse workers under `python main.py`) import this module again.
+    """
+    import_dvc_model()
+    try:
+        model_cache.get()
+    except FileNotFoundError:
+        logger.warning("No active model to preload")
 
 
-def _save_model(model: Any) -> None:
-    with open(MODEL_PATH, "wb") as f:
-        pickle.dump(model, f)
+@app.on_event("startup")
+async def configure_threadpool() -> None:
+    # sync routes and run_in_threadpool share anyio's default thread limiter of each worker
+    to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
 
 
-def _load_model() -> Any:
-    with open(MODEL_PATH, "rb") as f:
-        return pickle.load(f)  # nosec
+@app.on_event("startup")
+async def schedule_pipeline() -> None:
+    # every worker schedules it, the pipeline lock lets only one of them run it
+    await schedule(partial(pipeline.start, "schedule"), PIPELINE_CRON, PIPELINE_INTERVAL)
+
+
+@app.on_event("shutdown")
+def shutdown_training_jobs() -> None:
+    training_jobs.shutdown()
 
 
-# @version_1_0.on_event("startup") # uncoment to run on every system's start
-# @repeat_every(seconds=TWO_DAYS) # recurrent scraping can be turned on by uncommenting this line
 @version_1_0.post(
     "/run-crawler",
     description="This will scrape housing listings from supported websites "
-    "and save it into Azure Blob Storage in a JSON format.",
+    "and stream it into Azure Blob Storage in a newline-delimited JSON format.",
     status_code=201,
     responses={
+        200: {"description": "No new offers were found, nothing was uploaded."},
         201: {"description": "Successfully scraped and uploaded data to Azure Blob Storage."},
         500: {"description": "Something went wrong."},
     },
 )
 def run_crawler() -> JSONResponse:
     try:
-        collect_and_upload_data()
+        if collect_and_upload_data() is None:
+            return JSONResponse(status_code=200, content={"resp": "No new offers were found, nothing was uploaded."})
         return JSONResponse(
             status_code=201, content={"resp": "Successfully scraped and uploaded data to Azure Blob Storage."}
         )
@@ -61,11 +202,44 @@ def run_crawler() -> JSONResponse:
         raise HTTPException(500, detail=str(ex)) from ex
 
 
+@version_1_0.post(
+    "/pipeline/run",
+    description="Starts a background run of the crawl, upload, sync and train pipeline (also run on the schedule "
+    "set by PIPELINE_CRON or PIPELINE_INTERVAL). Stages whose inputs did not change since their last run are skipped.",
+    status_code=202,
+    responses={
+        202: {"description": "Pipeline run started."},
+        409: {"description": "Pipeline is already running."},
+    },
+)
+def run_pipeline() -> JSONResponse:
+    run_id = pipeline.start()
+    if run_id is None:
+        raise HTTPException(409, detail="Pipeline is already running.")
+    return JSONResponse(
+        status_code=202, content={"run_id": run_id}, headers={"Location": version_1_0.url_path_for("pipeline_runs")}
+    )
+
+
+@version_1_0.get(
+    "/pipeline",
+    description="Reports recent pipeline runs, newest first, with the status and duration of every stage.",
+    responses={200: {"model": PipelineRuns}},
+)
+def pipeline_runs() -> JSONResponse:
+    return JSONResponse(status_code=200, content={"running": pipeline.running, "runs": pipeline.get_runs()})
+
+
 @version_1_0.post(
     "/train",
-    description="Trains model based on scraped data from Azure. Store model locally.",
+    description="Starts a background job training the model on data scraped to Azure and storing it locally. "
+    "If the same model is already waiting for training, the queued job is returned instead of a new one. "
+    "With incremental=true the active model of the same type is updated with listings newer than its data "
+    "watermark instead of refitted, with a full refit every FULL_REBUILD_EVERY updates. "
+    "Poll the returned job for its progress and result.",
+    status_code=202,
     responses={
-        200: {"model": Train},
+        202: {"model": TrainingJob},
         500: {"description": "Something went wrong."},
     },
 )
@@ -74,50 +248,211 @@ def train(
     model: ModelNameEnum | None = Query(
         default=None,
         description=f"Model name to train. Default: {ModelEnum.get_default().name}"
-    )
+    ),
+    incremental: bool = Query(
+        default=False,
+        description="Update the active model with new crawls only (forest: more trees, KNN: appended index)."
+    ),
     # fmt: on
 ) -> JSONResponse:
     try:
-        data = get_data_from_all_blobs()
         if model:
             model_type = ModelEnum.__getitem__(model.value.upper())  # pylint: disable=unnecessary-dunder-call
         else:
             model_type = ModelEnum.get_default()
 
-        trained_model, r2_train = get_trained_model(model_type, data)  # model type could be moved to param
-        _save_model(trained_model)
+        job = submit_training(model_type, incremental)
+        return JSONResponse(
+            status_code=202,
+            content=job,
+            headers={"Location": version_1_0.url_path_for("train_job", job_id=job["job_id"])},
+        )
+    except Exception as ex:
+        raise HTTPException(500, detail=str(ex)) from ex
+
+
+@version_1_0.post(
+    "/train/search",
+    description="Starts a background job cross-validating every model over a grid of hyperparameters in parallel. "
+    "The best candidate is refitted on all data and stored as the current model; the job result contains "
+    "a leaderboard of all candidates with their fit and predict timings. "
+    "The body maps model names to lists of values per parameter; without it a default grid is searched.",
+    status_code=202,
+    responses={
+        202: {"model": TrainingJob},
+        422: {"description": "Unknown model or parameter in the grid."},
+        500: {"description": "Something went wrong."},
+    },
+)
+def train_search(
+    param_grids: ParamGrids | None = Body(default=None, examples=[DEFAULT_PARAM_GRIDS]),
+    cv: int = Query(default=CV_FOLDS, ge=2, le=20, description="Number of cross-validation folds."),
+) -> JSONResponse:
+    try:
+        param_grids = param_grids if param_grids is not None else DEFAULT_PARAM_GRIDS
+        validate_param_grids(param_grids)
+        key = f"SEARCH {cv} {json.dumps(param_grids, sort_keys=True)}"
+        job = training_jobs.submit("SEARCH", partial(search_models, param_grids=param_grids, cv=cv), key)
         return JSONResponse(
-            status_code=200,
-            content={
-                "r2_score_train": r2_train,
-                "model_used": model_type.name,
-                "model_params": trained_model.get_params(),
-            },
+            status_code=202,
+            content=job,
+            headers={"Location": version_1_0.url_path_for("train_job", job_id=job["job_id"])},
         )
+    except ValueError as ex:
+        raise HTTPException(422, detail=str(ex)) from ex
     except Exception as ex:
         raise HTTPException(500, detail=str(ex)) from ex
 
 
+@version_1_0.get(
+    "/train/{job_id}",
+    description="Reports status, progress, stage timings and result (R2 score and model params) of a training job.",
+    responses={
+        200: {"model": TrainingJob},
+        404: {"description": "Training job not found."},
+    },
+)
+def train_job(job_id: str) -> JSONResponse:
+    job = training_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(404, detail="Training job not found.")
+    return JSONResponse(status_code=200, content=job)
+
+
+@version_1_0.get(
+    "/models",
+    description="Lists all stored model versions with their metadata (data snapshot, metrics, size and timings).",
+    responses={200: {"model": ModelVersions}},
+)
+def list_models() -> JSONResponse:
+    return JSONResponse(
+        status_code=200,
+        content={"active_version": model_registry.active_version, "versions": model_registry.list_metadata()},
+    )
+
+
+@version_1_0.get(
+    "/models/{version}",
+    description="Returns metadata of a stored model version.",
+    responses={404: {"description": "Model version not found."}},
+)
+def get_model(version: str) -> JSONResponse:
+    try:
+        return JSONResponse(status_code=200, content=model_registry.get_metadata(version))
+    except FileNotFoundError as ex:
+        raise HTTPException(404, detail=str(ex)) from ex
+
+
+@version_1_0.post(
+    "/models/{version}/activate",
+    description="Makes a stored model version the one served by default, e.g. to roll back without retraining.",
+    responses={404: {"description": "Model version not found."}},
+)
+def activate_model(version: str) -> JSONResponse:
+    try:
+        metadata = model_registry.activate(version)
+        prediction_cache.clear()
+        return JSONResponse(status_code=200, content=metadata)
+    except FileNotFoundError as ex:
+        raise HTTPException(404, detail=str(ex)) from ex
+
+
+def predict_listing(listing: dict[str, Any], model_version: str | None) -> tuple[float, str]:
+    with span("predict.get_model"):
+        model, served_version = model_cache.get(model_version)
+    key = listing_key(listing)
+    result = prediction_cache.get(served_version, key)
+    if result is None:
+        with span("predict.evaluate"):
+            result = float(model.predict([key])[0])  # the features in model order, without building a DataFrame
+        prediction_cache.put(served_version, key, result)
+    return result, served_version
+
+
 @version_1_0.get(
     "/predict",
     description="Predicts full_price in PLN based on area, rooms, floors and year of constuction.",
     responses={
         200: {"model": Prediction},
         404: {"description": "Model not found. Please train model first."},
+        422: {"description": "Invalid listing."},
+        500: {"description": "Something went wrong."},
+    },
+)
+async def predict(house_listing: HouseListing, model_version: str | None = MODEL_VERSION_QUERY) -> JSONResponse:
+    try:
+        with PREDICT_SECONDS.labels("predict").time():
+            # the model is evaluated (or loaded) in the thread pool, so the event loop keeps accepting requests
+            result, served_version = await run_in_threadpool(predict_listing, house_listing.dict(), model_version)
+        return JSONResponse(status_code=200, content={"result": result, "model_version": served_version})
+    except FileNotFoundError as ex:
+        detail = "Model not found. Please train model first." if model_version is None else str(ex)
+        raise HTTPException(404, detail=detail) from ex
+    except InvalidFeaturesError as ex:
+        raise HTTPException(422, detail=str(ex)) from ex
+    except Exception as ex:
+        raise HTTPException(500, detail=str(ex)) from ex
+
+
+@version_1_0.get(
+    "/predict/cache",
+    description="Reports size and hit, miss, eviction and expiration counters of the prediction cache.",
+    responses={200: {"model": PredictionCacheStats}},
+)
+def prediction_cache_stats() -> JSONResponse:
+    return JSONResponse(status_code=200, content=prediction_cache.stats())
+
+
+@version_1_0.post(
+    "/predict/batch",
+    description="Predicts full_price in PLN for many listings at once. Accepts a JSON list of listings, "
+    "a JSON object of columns, NDJSON (application/x-ndjson) or CSV (text/csv) body. "
+    "With stream=true results are streamed back as NDJSON.",
+    responses={
+        200: {"model": BatchPrediction},
+        404: {"description": "Model not found. Please train model first."},
+        422: {"description": "Invalid listings."},
         500: {"description": "Something went wrong."},
     },
 )
-def predict(house_listing: HouseListing) -> JSONResponse:
+async def predict_batch(
+    request: Request,
+    stream: bool = Query(default=False, description="Stream results back as NDJSON."),
+    chunk_size: int = Query(default=10_000, gt=0, description="Number of listings predicted at once when streaming."),
+    model_version: str | None = MODEL_VERSION_QUERY,
+) -> Response:
     try:
-        model = _load_model()
-        x = pd.DataFrame([house_listing.dict()])
-        return JSONResponse(status_code=200, content={"result": model.predict(x)[0]})
+        with PREDICT_SECONDS.labels("predict_batch").time():  # without the streamed predictions
+            model, served_version = await run_in_threadpool(model_cache.get, model_version)
+            with span("predict_batch.parse"):
+                columns = parse_listings(await request.body(), request.headers.get("content-type"))
+                x = listings_to_matrix(columns)
+            if stream:
+                return StreamingResponse(
+                    predict_in_chunks(model, x, chunk_size),
+                    media_type=NDJSON_CONTENT_TYPE,
+                    headers={"X-Model-Version": served_version},
+                )
+
+            with span("predict_batch.evaluate"):
+                results = await run_in_threadpool(model.predict, x)
+        return JSONResponse(status_code=200, content={"results": results.tolist(), "model_version": served_version})
     except FileNotFoundError as ex:
-        raise HTTPException(404, detail="Model not found. Please train model first.") from ex
+        detail = "Model not found. Please train model first." if model_version is None else str(ex)
+        raise HTTPException(404, detail=detail) from ex
+    except (BatchValidationError, InvalidFeaturesError) as ex:
+        raise HTTPException(422, detail=str(ex)) from ex
     except Exception as ex:
         raise HTTPException(500, detail=str(ex)) from ex
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics() -> Response:
+    """Metrics of the API, crawler and training in the Prometheus text format, summed over all workers."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 app.include_router(version_1_0)
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, log_level="debug", reload=True)  # nosec
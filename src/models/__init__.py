@@ -1,35 +1,27 @@
-from typing import Any
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
 
-import numpy as np
 import pandas as pd
 from sklearn.metrics import r2_score
 
-from enums import ModelEnum
-
-FEATURES = ["area", "rooms", "floor", "year"]
-TARGET = "full_price"
-
-
-def process_json_data(data: list[dict]) -> tuple[np.array, np.array]:
-    df = pd.DataFrame(data)
-    df = df[[*FEATURES, TARGET]]
-    df = df.dropna()
+from models.preprocessing import FEATURES, TARGET, FeaturePreprocessor, PreprocessedModel
 
-    features = df[FEATURES]
-    x = np.array(features.apply(pd.to_numeric, errors="coerce"))
-    y = np.array(df[TARGET].astype(float))
+if TYPE_CHECKING:  # enums imports the estimators from this package
+    from enums import ModelEnum
 
-    return x, y
+__all__ = ["FEATURES", "TARGET", "get_trained_model"]
 
 
-def get_trained_model(model_type: ModelEnum, data: list[dict]) -> tuple[Any, float]:
-    model = model_type.value
+def get_trained_model(model_type: ModelEnum, data: list[dict] | pd.DataFrame) -> tuple[Any, float]:
+    model = model_type.create()
 
-    x, y = process_json_data(data)
+    preprocessor = FeaturePreprocessor()
+    x, y = preprocessor.fit_transform(data)
 
     model.fit(x, y)
 
     y_pred_train = model.predict(x)
     r2_train = r2_score(y, y_pred_train).astype(float)
 
-    return model, r2_train
+    return PreprocessedModel(preprocessor, model, len(y)), r2_train
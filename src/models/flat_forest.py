@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from typing import Any, Final
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+from models.preprocessing import PreprocessedModel
+
+_LEAF: Final[int] = -1  # sklearn's TREE_LEAF
+FLAT_MAX_ROWS: Final[int] = 512  # above ~800 rows sklearn's compiled per-tree traversal is faster
+
+
+class FlatForest:
+    """Fitted RandomForestRegressor flattened into contiguous arrays, for fast prediction of single rows and small
+    batches without sklearn's per-call validation and joblib dispatch over trees.
+
+    Nodes of all trees are concatenated and tree `i` starts at node `roots[i]`. All (row, tree) pairs are traversed
+    together, one level per step, dropping pairs which reached a leaf. Features are compared as float32 against float64
+    thresholds and tree predictions are summed in the order of the trees, both exactly like sklearn, so predictions
+    are bit-identical. Arrays are plain numpy arrays, so they can be memory-mapped from an uncompressed joblib file.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        children: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        n_features: int,
+    ) -> None:
+        # np.asarray: memory-mapped arrays are used as plain ndarray views, without np.memmap overhead per operation
+        self.feature = np.asarray(feature)
+        self.threshold = np.asarray(threshold)
+        self.children = np.asarray(children)  # (nodes, 2): left and right child, a leaf points to itself
+        self.is_leaf = self.children[:, 0] == np.arange(len(children))
+        self.value = np.asarray(value)
+        self.roots = np.asarray(roots)
+        self.n_features = n_features
+
+    @classmethod
+    def from_forest(cls, forest: RandomForestRegressor) -> FlatForest:
+        if forest.n_outputs_ != 1:
+            raise ValueError("Only single output forests can be flattened")
+
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+        features, children = [], []
+        for offset, tree in zip(offsets, trees):
+            nodes = np.arange(tree.node_count) + offset
+            is_leaf = tree.children_left == _LEAF
+            features.append(np.where(is_leaf, 0, tree.feature))
+            children.append(
+                np.column_stack(
+                    [
+                        np.where(is_leaf, nodes, tree.children_left + offset),
+                        np.where(is_leaf, nodes, tree.children_right + offset),
+                    ]
+                )
+            )
+
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate([tree.threshold for tree in trees]),
+            children=np.concatenate(children).astype(np.intp),
+            value=np.concatenate([tree.value[:, 0, 0] for tree in trees]),
+            roots=offsets[:-1].astype(np.intp),
+            n_features=forest.n_features_in_,
+        )
+
+    def __getstate__(self) -> dict[str, Any]:
+        state = self.__dict__.copy()
+        del state["is_leaf"]  # derived, keeps the artifact smaller
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__init__(**state)  # type: ignore[misc] # pylint: disable=unnecessary-dunder-call
+
+    def apply(self, x: np.ndarray) -> np.ndarray:
+        """Returns the (global) index of the leaf reached by every row in every tree, shape (rows, trees)."""
+        n_rows, n_trees = len(x), len(self.roots)
+        nodes = np.tile(self.roots, n_rows)  # row-major (row, tree) pairs
+        row_offsets = np.repeat(np.arange(n_rows) * self.n_features, n_trees)
+        flat_x = np.ascontiguousarray(x).ravel()
+        active = np.arange(n_rows * n_trees)
+        while active.size:
+            current = nodes[active]
+            go_right = flat_x[row_offsets[active] + self.feature[current]] > self.threshold[current]
+            current = self.children[current, go_right.view(np.int8)]
+            nodes[active] = current
+            active = active[~self.is_leaf[current]]
+        return nodes.reshape(n_rows, n_trees)
+
+    def predict(self, x: Any) -> np.ndarray:
+        x = np.asarray(x, dtype=np.float32)
+        if x.ndim != 2 or x.shape[1] != self.n_features:
+            raise ValueError(f"Expected 2D array with {self.n_features} features, got shape {x.shape}")
+        if not np.isfinite(x).all():
+            raise ValueError("Input contains NaN or infinity")
+
+        # cumsum adds trees one by one in order (no pairwise summation), exactly like sklearn's accumulation
+        return np.cumsum(self.value[self.apply(x)], axis=1)[:, -1] / len(self.roots)
+
+
+class CompiledForest:
+    """Serves a fitted forest: up to `FLAT_MAX_ROWS` rows with its FlatForest, larger batches with sklearn."""
+
+    def __init__(self, forest: RandomForestRegressor, flat_forest: FlatForest) -> None:
+        self.forest = forest
+        self.flat_forest = flat_forest
+
+    def predict(self, x: Any) -> np.ndarray:
+        if len(x) <= FLAT_MAX_ROWS:
+            return self.flat_forest.predict(x)
+        return self.forest.predict(x)
+
+
+def compile_model(model: Any) -> FlatForest | None:
+    """Returns the flat version of a model (or of the model wrapped with its preprocessor), or None if it has none."""
+    if isinstance(model, PreprocessedModel):
+        model = model.model
+    if isinstance(model, RandomForestRegressor) and model.n_outputs_ == 1:
+        return FlatForest.from_forest(model)
+    return None
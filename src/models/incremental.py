@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import math
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import r2_score
+from sklearn.neighbors import KNeighborsRegressor
+from sklearn.pipeline import Pipeline
+
+from models.preprocessing import PreprocessedModel
+
+
+def supports_update(model: Any) -> bool:
+    if not isinstance(model, PreprocessedModel) or model.n_samples == 0:
+        return False
+    estimator = model.model
+    if isinstance(estimator, Pipeline):
+        estimator = estimator[-1]
+    return isinstance(estimator, (RandomForestRegressor, KNeighborsRegressor))
+
+
+def _add_trees(forest: RandomForestRegressor, x: np.ndarray, y: np.ndarray, n_samples: int) -> None:
+    """Fits additional trees on the new rows only, as many as keep the number of trees per training row."""
+    new_trees = math.ceil(len(forest.estimators_) * len(y) / n_samples)
+    forest.set_params(warm_start=True, n_estimators=len(forest.estimators_) + new_trees)
+    try:
+        forest.fit(x, y)
+    finally:
+        forest.set_params(warm_start=False)
+
+
+def _append_to_index(knn: KNeighborsRegressor, x: np.ndarray, y: np.ndarray) -> None:
+    """Appends the new rows to the stored training set and rebuilds the index, without reloading older data."""
+    fit_x, fit_y = knn._fit_X, knn._y  # pylint: disable=protected-access
+    knn.fit(np.concatenate([fit_x, x.astype(fit_x.dtype)]), np.concatenate([fit_y, y]))
+
+
+def update_model(model: PreprocessedModel, data: list[dict] | pd.DataFrame) -> tuple[PreprocessedModel, float]:
+    """Updates a fitted model with new training data in place of a full refit.
+
+    The new data is cleaned with the model's preprocessor (its outlier bounds stay those of the last full fit).
+    Forests get additional trees fitted on the new rows with `warm_start`; nearest neighbors models append the new
+    rows to their index, keeping the scaler of a pipeline fitted on the older data. Returns the updated model and its
+    R2 score on the new rows.
+    """
+    if not supports_update(model):
+        raise ValueError(f"{type(getattr(model, 'model', model)).__name__} can't be updated incrementally")
+    x, y = model.preprocessor.clean(data)
+    if len(y) == 0:
+        raise ValueError("No valid listings to update the model with")
+
+    estimator = model.model
+    if isinstance(estimator, RandomForestRegressor):
+        _add_trees(estimator, x, y, model.n_samples)
+    elif isinstance(estimator, KNeighborsRegressor):
+        _append_to_index(estimator, x, y)
+    else:
+        _append_to_index(estimator[-1], estimator[:-1].transform(x), y)
+
+    updated = PreprocessedModel(model.preprocessor, estimator, model.n_samples + len(y))
+    return updated, float(r2_score(y, estimator.predict(x)))
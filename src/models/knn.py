@@ -1,3 +1,11 @@
 from sklearn.neighbors import KNeighborsRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
 
 k_neighbors_regressor = KNeighborsRegressor()  # you can specify model's hyperparameters here
+
+# Features are standardized so that no feature dominates the distance by its unit. The KD-tree index is built on fit
+# and stored with the model, so loading a model never rebuilds it and queries don't scan the whole training set.
+scaled_k_neighbors_regressor = Pipeline(
+    [("scaler", StandardScaler()), ("knn", KNeighborsRegressor(algorithm="kd_tree", leaf_size=40))]
+)
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+from typing import Any, Final
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+FEATURE_DTYPES: Final[dict[str, np.dtype]] = {  # as stored in dataset.LISTING_SCHEMA
+    "area": np.dtype(np.float32),
+    "rooms": np.dtype(np.int16),
+    "floor": np.dtype(np.int16),
+    "year": np.dtype(np.int16),
+}
+FEATURES: Final[list[str]] = list(FEATURE_DTYPES)
+TARGET: Final[str] = "full_price"
+
+# valid feature values, the same constraints as HouseListing
+_GREATER_THAN: Final[dict[str, float]] = {"area": 0, "rooms": 0}
+_AT_LEAST: Final[dict[str, float]] = {"floor": 0}
+OUTLIER_QUANTILE: Final[float] = 0.001
+
+
+class InvalidFeaturesError(ValueError):
+    pass
+
+
+def _to_float(data: list[dict] | pd.DataFrame, name: str) -> np.ndarray:
+    """Parses a column to float64 in one vectorized pass; values which can't be parsed become NaN."""
+    if isinstance(data, pd.DataFrame):
+        values: Any = data[name]
+        if pd.api.types.is_numeric_dtype(values):
+            return values.to_numpy(dtype=np.float64, na_value=np.nan)
+    else:
+        values = [row.get(name) for row in data]
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):  # strings or missing values
+        return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(dtype=np.float64)
+
+
+def _get_valid_rows(x: np.ndarray) -> np.ndarray:
+    """Rows of a (rows, FEATURES) matrix whose every value is finite, fits its dtype and meets the constraints."""
+    valid = np.isfinite(x).all(axis=1)
+    for i, (name, dtype) in enumerate(FEATURE_DTYPES.items()):
+        column = x[:, i]
+        if np.issubdtype(dtype, np.integer):
+            info = np.iinfo(dtype)
+            valid &= (np.mod(column, 1) == 0) & (column >= info.min) & (column <= info.max)
+        if name in _GREATER_THAN:
+            valid &= column > _GREATER_THAN[name]
+        if name in _AT_LEAST:
+            valid &= column >= _AT_LEAST[name]
+    return valid
+
+
+def _to_features(x: np.ndarray) -> np.ndarray:
+    """Casts every column to its dtype into one float32 matrix, the input of all models."""
+    features = np.empty(x.shape, dtype=np.float32)
+    for i, dtype in enumerate(FEATURE_DTYPES.values()):
+        features[:, i] = x[:, i].astype(dtype)
+    return features
+
+
+class FeaturePreprocessor:
+    """Turns listings into the feature matrix of the models, the same way for training and prediction.
+
+    Training data (scraped dicts of strings or a DataFrame) is parsed column by column into typed values first and
+    only then filtered, so values which could not be parsed are dropped instead of reaching `fit`. Rows outside of
+    the `outlier_quantile` tails of any column (learned on fit, 0 disables it) are dropped as outliers. Predicted
+    listings are never dropped: an invalid one raises `InvalidFeaturesError`.
+    """
+
+    def __init__(self, outlier_quantile: float = OUTLIER_QUANTILE) -> None:
+        self.outlier_quantile = outlier_quantile
+        self.bounds: dict[str, tuple[float, float]] = {}
+
+    def fit_transform(self, data: list[dict] | pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+        """Returns float32 features and float64 targets of the valid training rows without outliers."""
+        x, y, valid = self._parse(data)
+        self.bounds = {}
+        if valid.any():
+            for name, column in self._columns(x, y).items():
+                # "lower"/"higher": bounds are actual values, so small datasets keep their extremes
+                lower = float(np.quantile(column[valid], self.outlier_quantile, method="lower"))
+                upper = float(np.quantile(column[valid], 1 - self.outlier_quantile, method="higher"))
+                self.bounds[name] = (lower, upper)
+        return self._select(x, y, valid)
+
+    def clean(self, data: list[dict] | pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+        """Like `fit_transform`, but drops outliers by the bounds already learned, e.g. for new training data."""
+        return self._select(*self._parse(data))
+
+    @staticmethod
+    def _parse(data: list[dict] | pd.DataFrame) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        x = np.column_stack([_to_float(data, name) for name in FEATURES])
+        y = _to_float(data, TARGET)
+        return x, y, _get_valid_rows(x) & np.isfinite(y) & (y > 0)
+
+    @staticmethod
+    def _columns(x: np.ndarray, y: np.ndarray) -> dict[str, np.ndarray]:
+        return {**{name: x[:, i] for i, name in enumerate(FEATURES)}, TARGET: y}
+
+    def _select(self, x: np.ndarray, y: np.ndarray, valid: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        inliers = valid.copy()
+        for name, column in self._columns(x, y).items():
+            if name in self.bounds:
+                lower, upper = self.bounds[name]
+                inliers &= (column >= lower) & (column <= upper)
+
+        logger.info(
+            f"Preprocessed {len(y)} rows: dropped {len(y) - valid.sum()} invalid and {valid.sum() - inliers.sum()} "
+            f"outliers"
+        )
+        return _to_features(x[inliers]), y[inliers]
+
+    def transform(self, x: Any) -> np.ndarray:
+        """Validates listings given as a (rows, FEATURES) matrix and returns their float32 features."""
+        x = np.asarray(x, dtype=np.float64)
+        if x.ndim != 2 or x.shape[1] != len(FEATURES):
+            raise InvalidFeaturesError(f"Expected 2D array with features {FEATURES}, got shape {x.shape}")
+        invalid = ~_get_valid_rows(x)
+        if invalid.any():
+            raise InvalidFeaturesError(f"Invalid features in listings: {np.flatnonzero(invalid)[:10].tolist()}")
+        return _to_features(x)
+
+
+class PreprocessedModel:
+    """Fitted model with the preprocessor of its training data, stored together in one artifact.
+
+    Every input is transformed by the preprocessor before predicting, so serving always matches training.
+    `n_samples` counts the training rows the model has been fitted on, including incremental updates.
+    """
+
+    def __init__(self, preprocessor: FeaturePreprocessor, model: Any, n_samples: int = 0) -> None:
+        self.preprocessor = preprocessor
+        self.model = model
+        self.n_samples = n_samples
+
+    def with_model(self, model: Any) -> PreprocessedModel:
+        """Returns the same preprocessing in front of another model, e.g. a compiled or updated version."""
+        return PreprocessedModel(self.preprocessor, model, self.n_samples)
+
+    def predict(self, x: Any) -> np.ndarray:
+        return self.model.predict(self.preprocessor.transform(x))
+
+    def get_params(self, deep: bool = True) -> dict[str, Any]:
+        return self.model.get_params(deep)
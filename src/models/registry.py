@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Final, Iterable
+
+import pandas as pd
+from loguru import logger
+
+from dataset import CRAWL_COLUMN
+from models.flat_forest import FlatForest, compile_model
+from models.serialization import ArtifactFormat, dump_model, load_model
+
+_VERSION_PATTERN: Final[re.Pattern] = re.compile(r"[0-9a-f]{32}")
+
+
+def data_snapshot(data: pd.DataFrame) -> dict[str, Any]:
+    """Identifies the dataset a model was trained on: its size, columns, content hash, newest listing date and
+    newest crawl (the data watermark of incremental training)."""
+    snapshot: dict[str, Any] = {
+        "rows": len(data),
+        "columns": list(data.columns),
+        "sha256": hashlib.sha256(pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes()).hexdigest(),
+    }
+    if "date" in data.columns and data["date"].notna().any():
+        snapshot["newest_date"] = str(data["date"].dropna().max())
+    if CRAWL_COLUMN in data.columns and data[CRAWL_COLUMN].notna().any():
+        snapshot["newest_crawl"] = str(data[CRAWL_COLUMN].dropna().max())
+    return snapshot
+
+
+class ModelRegistry:
+    """Versioned model artifacts with their metadata.
+
+    Every model is stored in `<directory>/<version>/` as `model.sav` (pickle) or `model.joblib` with `metadata.json`
+    next to it, where the version is the md5 of the stored file. Artifacts are never modified; the `active` file holds
+    the version served by default, so promoting or rolling back a model only rewrites that file.
+
+    New models are stored in `artifact_format`. Uncompressed joblib artifacts (`compression="0"`) are loaded with
+    their numpy arrays memory-mapped; compressed ones are smaller on disk but always loaded into private memory.
+    Forests are also exported flat to `compiled.joblib`, which is always memory-mapped and so shared by all workers.
+    Ids of the listings a model was trained on can be stored in `training_ids.json`, so that an incremental update
+    only adds listings the model has not seen.
+    """
+
+    METADATA_FILE: Final[str] = "metadata.json"
+    COMPILED_FILE: Final[str] = "compiled.joblib"
+    TRAINING_IDS_FILE: Final[str] = "training_ids.json"
+    ACTIVE_FILE: Final[str] = "active"
+
+    def __init__(
+        self, directory: str, artifact_format: ArtifactFormat = ArtifactFormat.PICKLE, compression: str = "0"
+    ) -> None:
+        self.directory = directory
+        self.artifact_format = artifact_format
+        self.compression = compression
+        os.makedirs(directory, exist_ok=True)
+
+    def _get_version_dir(self, version: str) -> str:
+        if not _VERSION_PATTERN.fullmatch(version) or not os.path.isdir(path := os.path.join(self.directory, version)):
+            raise FileNotFoundError(f"Model version {version} not found")
+        return path
+
+    def get_model_path(self, version: str) -> str:
+        artifact_format = ArtifactFormat(self.get_metadata(version).get("format", ArtifactFormat.PICKLE))
+        return os.path.join(self._get_version_dir(version), artifact_format.file_name)
+
+    def load_model(self, version: str) -> Any:
+        metadata = self.get_metadata(version)
+        artifact_format = ArtifactFormat(metadata.get("format", ArtifactFormat.PICKLE))
+        path = os.path.join(self._get_version_dir(version), artifact_format.file_name)
+        logger.info(f"Loading model version {version} ({artifact_format.value}, {metadata['size_bytes']} bytes)...")
+        return load_model(path, artifact_format, mmap=metadata.get("compression") == "0")
+
+    def load_compiled(self, version: str) -> FlatForest | None:
+        path = os.path.join(self._get_version_dir(version), self.COMPILED_FILE)
+        return load_model(path, ArtifactFormat.JOBLIB, mmap=True) if os.path.exists(path) else None
+
+    def get_training_ids(self, version: str) -> set[str] | None:
+        """Ids of the listings the model was trained on, None if they were not stored."""
+        try:
+            with open(os.path.join(self._get_version_dir(version), self.TRAINING_IDS_FILE), encoding="utf-8") as f:
+                return set(json.load(f))
+        except FileNotFoundError:
+            return None
+
+    def get_metadata(self, version: str) -> dict[str, Any]:
+        with open(os.path.join(self._get_version_dir(version), self.METADATA_FILE), encoding="utf-8") as f:
+            return json.load(f)
+
+    def list_metadata(self) -> list[dict[str, Any]]:
+        versions = [name for name in os.listdir(self.directory) if _VERSION_PATTERN.fullmatch(name)]
+        return sorted((self.get_metadata(version) for version in versions), key=lambda metadata: metadata["created_at"])
+
+    @property
+    def active_version(self) -> str | None:
+        try:
+            with open(os.path.join(self.directory, self.ACTIVE_FILE), encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def activate(self, version: str) -> dict[str, Any]:
+        metadata = self.get_metadata(version)
+        tmp_path = os.path.join(self.directory, f"{self.ACTIVE_FILE}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(tmp_path, os.path.join(self.directory, self.ACTIVE_FILE))
+        logger.info(f"Activated model version {version}")
+        return metadata
+
+    def register(
+        self, model: Any, metadata: dict[str, Any], training_ids: Iterable[str] | None = None
+    ) -> dict[str, Any]:
+        artifact_format, compression = self.artifact_format, self.compression
+        metadata = {**metadata, "format": artifact_format.value}
+        if artifact_format is ArtifactFormat.JOBLIB:
+            metadata["compression"] = compression
+        flat_forest = compile_model(model)
+        metadata["compiled"] = flat_forest is not None
+
+        def write(path: str) -> None:
+            dump_model(model, path, artifact_format, compression)
+            if flat_forest is not None:
+                compiled_path = os.path.join(os.path.dirname(path), self.COMPILED_FILE)
+                dump_model(flat_forest, compiled_path, ArtifactFormat.JOBLIB)
+            if training_ids is not None:
+                with open(os.path.join(os.path.dirname(path), self.TRAINING_IDS_FILE), "w", encoding="utf-8") as f:
+                    json.dump(sorted(training_ids), f)
+
+        return self._store(write, artifact_format, metadata)
+
+    def register_file(self, path: str, metadata: dict[str, Any]) -> dict[str, Any]:
+        """Registers an existing pickled model file (e.g. pulled with dvc)."""
+        metadata = {**metadata, "format": ArtifactFormat.PICKLE.value}
+        return self._store(lambda target: shutil.copyfile(path, target), ArtifactFormat.PICKLE, metadata)
+
+    def _store(
+        self, write: Callable[[str], Any], artifact_format: ArtifactFormat, metadata: dict[str, Any]
+    ) -> dict[str, Any]:
+        tmp_dir = tempfile.mkdtemp(dir=self.directory, prefix=".tmp-")
+        try:
+            model_path = os.path.join(tmp_dir, artifact_format.file_name)
+            start = time.perf_counter()
+            write(model_path)
+            write_time = time.perf_counter() - start
+            with open(model_path, "rb") as f:
+                version = hashlib.file_digest(f, "md5").hexdigest()  # nosec # same hash as the one tracked by dvc
+
+            metadata = {
+                **metadata,
+                "version": version,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "size_bytes": os.path.getsize(model_path),
+                "write_time": write_time,
+            }
+            with open(os.path.join(tmp_dir, self.METADATA_FILE), "w", encoding="utf-8") as f:
+                json.dump(metadata, f, indent=2, default=str)
+            os.rename(tmp_dir, os.path.join(self.directory, version))  # readers never see a partial artifact
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if "version" not in metadata or not os.path.isdir(os.path.join(self.directory, metadata["version"])):
+                raise
+            return self.get_metadata(metadata["version"])  # the same model was already registered
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        logger.info(f"Registered model version {version} ({metadata['size_bytes']} bytes)")
+        return metadata
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Final
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import r2_score
+from sklearn.model_selection import GridSearchCV, KFold
+
+from enums import ModelEnum
+from models.preprocessing import FeaturePreprocessor, PreprocessedModel
+
+ParamGrids = dict[str, dict[str, list[Any]]]
+
+DEFAULT_PARAM_GRIDS: Final[ParamGrids] = {
+    ModelEnum.KNN.name: {"n_neighbors": [3, 5, 10, 20], "weights": ["uniform", "distance"]},
+    ModelEnum.SCALED_KNN.name: {"knn__n_neighbors": [3, 5, 10, 20], "knn__weights": ["uniform", "distance"]},
+    ModelEnum.RANDOM_FOREST.name: {"n_estimators": [100, 300], "max_depth": [None, 20], "min_samples_leaf": [1, 5]},
+}
+CV_FOLDS: Final[int] = 5
+N_JOBS: Final[int] = int(os.getenv("TRAINING_N_JOBS", "-1"))  # -1: all cores
+
+
+@dataclass
+class LeaderboardEntry:
+    rank: int
+    model_used: str
+    params: dict[str, Any]
+    cv_r2_mean: float
+    cv_r2_std: float
+    fit_time: float  # mean seconds per fold
+    predict_time: float  # mean seconds to predict (and score) a validation fold
+
+
+def validate_param_grids(param_grids: ParamGrids) -> None:
+    """Raises ValueError for unknown models or parameters, before any fitting starts."""
+    if not param_grids:
+        raise ValueError("No models to search")
+    for model_name, grid in param_grids.items():
+        if model_name not in ModelEnum.__members__:
+            raise ValueError(f"Unknown model {model_name}. Expected one of {list(ModelEnum.__members__)}")
+        if unknown := set(grid) - set(ModelEnum[model_name].value.get_params()):
+            raise ValueError(f"Unknown {model_name} parameters: {sorted(unknown)}")
+        if any(not isinstance(values, list) or not values for values in grid.values()):
+            raise ValueError(f"Every {model_name} parameter must have a non-empty list of values")
+
+
+def _get_candidates(model_name: str, results: dict[str, Any]) -> list[dict[str, Any]]:
+    return [
+        {
+            "model_used": model_name,
+            "params": params,
+            "cv_r2_mean": float(results["mean_test_score"][i]),
+            "cv_r2_std": float(results["std_test_score"][i]),
+            "fit_time": float(results["mean_fit_time"][i]),
+            "predict_time": float(results["mean_score_time"][i]),
+        }
+        for i, params in enumerate(results["params"])
+    ]
+
+
+def _cross_validate(
+    x: np.ndarray, y: np.ndarray, param_grids: ParamGrids, folds: KFold, n_jobs: int
+) -> list[dict[str, Any]]:
+    candidates = []
+    for model_name, grid in param_grids.items():
+        model = ModelEnum[model_name].create()
+        search = GridSearchCV(model, grid, scoring="r2", cv=folds, n_jobs=n_jobs, refit=False, error_score="raise")
+        search.fit(x, y)
+        candidates += _get_candidates(model_name, search.cv_results_)
+    return candidates
+
+
+def search_models(
+    data: list[dict] | pd.DataFrame, param_grids: ParamGrids | None = None, cv: int = CV_FOLDS, n_jobs: int = N_JOBS
+) -> tuple[Any, dict[str, Any]]:
+    """Cross-validates every parameter combination of every model and refits the best one on all data.
+
+    Candidates and folds of each model are fitted in parallel by `n_jobs` joblib workers. Every model sees the same
+    folds, so their scores are comparable. Returns the refitted best model and a result with the leaderboard.
+    """
+    param_grids = param_grids if param_grids is not None else DEFAULT_PARAM_GRIDS
+    validate_param_grids(param_grids)
+    preprocessor = FeaturePreprocessor()
+    x, y = preprocessor.fit_transform(data)
+
+    candidates = _cross_validate(x, y, param_grids, KFold(cv, shuffle=True, random_state=0), n_jobs)
+    candidates.sort(key=lambda candidate: candidate["cv_r2_mean"], reverse=True)
+    leaderboard = [LeaderboardEntry(rank, **candidate) for rank, candidate in enumerate(candidates, start=1)]
+
+    best = leaderboard[0]
+    model = ModelEnum[best.model_used].create().set_params(**best.params)
+    start = time.perf_counter()
+    model.fit(x, y)
+    refit_time = time.perf_counter() - start
+
+    return PreprocessedModel(preprocessor, model, len(y)), {
+        "r2_score_train": float(r2_score(y, model.predict(x))),
+        "model_used": best.model_used,
+        "cv_r2": best.cv_r2_mean,
+        "refit_time": refit_time,
+        "leaderboard": [asdict(entry) for entry in leaderboard],
+    }
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import pickle  # nosec
+from enum import Enum
+from typing import Any
+
+import joblib
+
+
+class ArtifactFormat(str, Enum):
+    PICKLE = "pickle"
+    JOBLIB = "joblib"
+
+    @property
+    def file_name(self) -> str:
+        return "model.sav" if self is ArtifactFormat.PICKLE else "model.joblib"
+
+
+def parse_compression(compression: str) -> int | tuple[str, int]:
+    """Parses joblib compression given as a zlib level (`3`) or `method:level` (`lzma:6`); `0` disables it."""
+    method, _, level = compression.rpartition(":")
+    return (method, int(level)) if method else int(level)
+
+
+def dump_model(model: Any, path: str, artifact_format: ArtifactFormat, compression: str = "0") -> None:
+    if artifact_format is ArtifactFormat.PICKLE:
+        with open(path, "wb") as f:
+            pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+    else:
+        joblib.dump(model, path, compress=parse_compression(compression))
+
+
+def load_model(path: str, artifact_format: ArtifactFormat, mmap: bool = False) -> Any:
+    """Loads a model artifact. With `mmap`, numpy arrays of an uncompressed joblib artifact are memory-mapped
+    read-only instead of copied, so processes loading the same file share them through the page cache."""
+    if artifact_format is ArtifactFormat.PICKLE:
+        with open(path, "rb") as f:
+            return pickle.load(f)  # nosec
+    return joblib.load(path, mmap_mode="r" if mmap else None)
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import os
+import time
+from contextlib import nullcontext
+from types import TracebackType
+from typing import ContextManager, Final
+
+from loguru import logger
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+# Metrics of every process go to the default registry. Under gunicorn (PROMETHEUS_MULTIPROC_DIR set, see
+# gunicorn.conf.py) every worker writes them to files in that directory and `/metrics` of any worker reports the sum.
+_BYTES_BUCKETS: Final[tuple[float, ...]] = tuple(float(4**i * 1024) for i in range(1, 11))  # 4 KB .. 1 GB
+_OFFERS_BUCKETS: Final[tuple[float, ...]] = (0, 1, 5, 10, 20, 30, 50, 100, 200, 500)
+
+PREDICT_SECONDS = Histogram("predict_latency_seconds", "Latency of prediction requests.", ["endpoint"])
+MODEL_LOAD_SECONDS = Histogram(
+    "model_load_seconds", "Time to load a model version into the cache.", buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30)
+)
+FETCH_SECONDS = Histogram("scraper_fetch_latency_seconds", "Latency of page requests of the crawler.", ["host"])
+TOO_MANY_REQUESTS = Counter("scraper_too_many_requests", "Responses 429 Too Many Requests to the crawler.", ["host"])
+PARSE_SECONDS = Histogram("scraper_parse_seconds", "Time to parse a listing page.", ["scraper"])
+OFFERS_PER_PAGE = Histogram(
+    "scraper_offers_per_page", "Offers found on a listing page.", ["scraper"], buckets=_OFFERS_BUCKETS
+)
+BLOB_DOWNLOAD_BYTES = Histogram("blob_download_bytes", "Size of downloaded crawl blobs.", buckets=_BYTES_BUCKETS)
+TRAINING_SECONDS = Histogram(
+    "training_duration_seconds",
+    "Duration of the stages of training jobs.",
+    ["stage"],
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600),
+)
+SPAN_SECONDS = Histogram("span_seconds", "Duration of timing spans, recorded only while spans are enabled.", ["span"])
+
+_spans_enabled = os.getenv("TIMING_SPANS", "false").lower() == "true"
+_NO_SPAN: Final[ContextManager[None]] = nullcontext()
+
+
+class _Span:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._start = 0.0
+
+    def __enter__(self) -> None:
+        self._start = time.perf_counter()
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        seconds = time.perf_counter() - self._start
+        SPAN_SECONDS.labels(self.name).observe(seconds)
+        logger.debug("Span {} took {:.6f}s", self.name, seconds)
+
+
+def enable_spans(enabled: bool = True) -> None:
+    global _spans_enabled  # pylint: disable=global-statement
+    _spans_enabled = enabled
+
+
+def span(name: str) -> ContextManager[None]:
+    """Times the block into `span_seconds` when spans are enabled (TIMING_SPANS=true), for profiling hot paths.
+
+    When disabled, a shared no-op context manager is returned, so spans can stay in the code at next to no cost.
+    """
+    return _Span(name) if _spans_enabled else _NO_SPAN
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Returns all metrics in the Prometheus text format and its content type."""
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
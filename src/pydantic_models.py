@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from pydantic import BaseModel, Field
 
 
@@ -8,11 +10,82 @@ class HouseListing(BaseModel):
     year: int = Field(..., description="Year of construction of the house.")
 
 
+class LeaderboardEntry(BaseModel):
+    rank: int = Field(..., description="Rank by mean cross-validated R2 score.")
+    model_used: str = Field(..., description="Model of the candidate.")
+    params: dict = Field(..., description="Hyperparameters of the candidate.")
+    cv_r2_mean: float = Field(..., description="Mean R2 score on validation folds.")
+    cv_r2_std: float = Field(..., description="Standard deviation of R2 scores on validation folds.")
+    fit_time: float = Field(..., description="Mean time in seconds to fit a fold.")
+    predict_time: float = Field(..., description="Mean time in seconds to predict a validation fold.")
+
+
 class Train(BaseModel):
     r2_score_train: float = Field(..., description="R2 score of the trained model on dataset it was trained.")
     model_used: str = Field(..., description="Model used for training.")
     model_params: dict = Field(..., description="Model parameters.")
+    model_version: str = Field(..., description="Version (md5 of the stored file) of the trained model.")
+    cv_r2: float | None = Field(None, description="Mean cross-validated R2 score of the model (search only).")
+    refit_time: float | None = Field(None, description="Time in seconds to refit the best model (search only).")
+    leaderboard: list[LeaderboardEntry] | None = Field(None, description="All searched candidates (search only).")
+
+
+class TrainingJob(BaseModel):
+    job_id: str = Field(..., description="Id of the training job.")
+    status: str = Field(..., description="One of queued, running, succeeded or failed.")
+    stage: str | None = Field(..., description="Currently running stage: loading_data, fitting or saving.")
+    progress: float = Field(..., description="Fraction of finished stages.")
+    model_used: str = Field(..., description="Model being trained.")
+    created_at: datetime = Field(..., description="When the job was queued (UTC).")
+    started_at: datetime | None = Field(..., description="When the job started (UTC).")
+    finished_at: datetime | None = Field(..., description="When the job finished (UTC).")
+    timings: dict[str, float] = Field(..., description="Duration in seconds of every finished stage.")
+    result: Train | None = Field(..., description="Training result, once the job has succeeded.")
+    error: str | None = Field(..., description="Error message, if the job has failed.")
+
+
+class ModelVersions(BaseModel):
+    active_version: str | None = Field(..., description="Version served when no version is requested.")
+    versions: list[dict] = Field(..., description="Metadata of all stored model versions, oldest first.")
 
 
 class Prediction(BaseModel):
     result: float = Field(..., description="Predicted full price in PLN.")
+    model_version: str = Field(..., description="Version of the model which served the prediction.")
+
+
+class BatchPrediction(BaseModel):
+    results: list[float] = Field(..., description="Predicted full prices in PLN, in the order of the listings.")
+    model_version: str = Field(..., description="Version of the model which served the predictions.")
+
+
+class PredictionCacheStats(BaseModel):
+    size: int = Field(..., description="Number of cached predictions.")
+    max_size: int = Field(..., description="Maximal number of cached predictions (0: cache disabled).")
+    ttl: float = Field(..., description="Time in seconds a prediction is cached.")
+    hits: int = Field(..., description="Predictions served from the cache.")
+    misses: int = Field(..., description="Predictions computed by the model.")
+    hit_rate: float = Field(..., description="Fraction of predictions served from the cache.")
+    evictions: int = Field(..., description="Least recently used predictions dropped to stay within max_size.")
+    expirations: int = Field(..., description="Predictions dropped because they were older than ttl.")
+    invalidations: int = Field(..., description="Times the cache was cleared because another model became active.")
+
+
+class PipelineStageRun(BaseModel):
+    status: str = Field(..., description="One of pending, running, succeeded, skipped, failed or upstream_failed.")
+    seconds: float | None = Field(..., description="Duration of the stage in seconds, once it has finished.")
+    error: str | None = Field(None, description="Error message, if the stage has failed.")
+
+
+class PipelineRun(BaseModel):
+    run_id: str = Field(..., description="Id of the pipeline run.")
+    trigger: str = Field(..., description="What started the run: schedule or manual.")
+    status: str = Field(..., description="One of running, succeeded or failed.")
+    started_at: datetime = Field(..., description="When the run started (UTC).")
+    finished_at: datetime | None = Field(..., description="When the run finished (UTC).")
+    stages: dict[str, PipelineStageRun] = Field(..., description="Stages in the order they run.")
+
+
+class PipelineRuns(BaseModel):
+    running: bool = Field(..., description="Whether a run is in progress (in any worker).")
+    runs: list[PipelineRun] = Field(..., description="Recent runs, newest first.")
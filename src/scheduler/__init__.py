@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from enum import Enum
+from graphlib import TopologicalSorter
+from typing import Any, Callable, Final, Iterator
+
+from fastapi_utilities import repeat_at, repeat_every
+from loguru import logger
+
+
+class PipelineRunningError(RuntimeError):
+    pass
+
+
+class StageStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    SKIPPED = "skipped"  # inputs unchanged since the last successful run
+    FAILED = "failed"
+    UPSTREAM_FAILED = "upstream_failed"
+
+
+_FAILED: Final[tuple[str, ...]] = (StageStatus.FAILED.value, StageStatus.UPSTREAM_FAILED.value)
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    run: Callable[[dict[str, Any]], Any]  # gets outputs of `depends_on` by stage name, returns a JSON-able output
+    depends_on: tuple[str, ...] = ()
+    fingerprint: Callable[[], Any] | None = None  # external inputs of the stage, e.g. ETags of blobs it reads
+    on_skip: Callable[[dict[str, Any]], Any] | None = None  # gets the same inputs when the stage is skipped
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _hash(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class Pipeline:
+    """Runs stages as a DAG in dependency order, one run at a time.
+
+    A stage gets the outputs of its dependencies and is skipped, reusing its last output, when they (and its own
+    `fingerprint`) are the same as in its last successful run (calling its `on_skip` instead of `run`); a stage with
+    neither always runs. When a stage fails, stages depending on it don't run and the run fails. The last outputs and
+    recent runs with the status and duration of every stage are kept in `<directory>/state.json`, so skipping survives
+    restarts and every process serving the API reports the same runs. Runs are single-flight across processes too: a
+    run is refused while another process holds `<directory>/pipeline.lock`.
+    """
+
+    STATE_FILE: Final[str] = "state.json"
+    LOCK_FILE: Final[str] = "pipeline.lock"
+
+    def __init__(self, stages: list[Stage], directory: str, history_size: int = 20) -> None:
+        self.stages = {stage.name: stage for stage in stages}
+        self.order = list(TopologicalSorter({stage.name: stage.depends_on for stage in stages}).static_order())
+        unknown = set(self.order) - set(self.stages)
+        if unknown:
+            raise ValueError(f"Unknown stages in dependencies: {sorted(unknown)}")
+        self.directory = directory
+        self.history_size = history_size
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _read_state(self) -> dict[str, Any]:
+        try:
+            with open(os.path.join(self.directory, self.STATE_FILE), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"stages": {}, "runs": []}
+
+    def _write_state(self, state: dict[str, Any]) -> None:
+        tmp_path = os.path.join(self.directory, f"{self.STATE_FILE}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2, default=str)
+        os.replace(tmp_path, os.path.join(self.directory, self.STATE_FILE))
+
+    @contextmanager
+    def _single_flight(self) -> Iterator[None]:
+        if not self._lock.acquire(blocking=False):
+            raise PipelineRunningError("Pipeline is already running")
+        try:
+            with open(os.path.join(self.directory, self.LOCK_FILE), "w", encoding="utf-8") as lock_file:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError as ex:
+                    raise PipelineRunningError("Pipeline is already running in another process") from ex
+                yield  # the lock is released when the file is closed
+        finally:
+            self._lock.release()
+
+    @property
+    def running(self) -> bool:
+        if self._lock.locked():
+            return True
+        with open(os.path.join(self.directory, self.LOCK_FILE), "w", encoding="utf-8") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return True
+        return False
+
+    def get_runs(self) -> list[dict[str, Any]]:
+        """Recent runs, newest first."""
+        return self._read_state()["runs"]
+
+    def run(self, trigger: str = "manual") -> dict[str, Any]:
+        """Runs the pipeline in the calling thread. Raises `PipelineRunningError` if a run is in progress."""
+        with self._single_flight():
+            return self._run(uuid.uuid4().hex, trigger)
+
+    def start(self, trigger: str = "manual") -> str | None:
+        """Starts a run in a background thread and returns its id, or None if a run is already in progress."""
+        run_id = uuid.uuid4().hex
+        started = threading.Event()
+        refused = threading.Event()
+
+        def run() -> None:
+            try:
+                with self._single_flight():
+                    started.set()
+                    self._run(run_id, trigger)
+            except PipelineRunningError:
+                refused.set()
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Pipeline run failed")
+            finally:
+                started.set()
+
+        threading.Thread(target=run, name="pipeline", daemon=True).start()
+        started.wait()
+        if refused.is_set():
+            logger.info("Pipeline is already running, not starting another run")
+            return None
+        return run_id
+
+    def _run(self, run_id: str, trigger: str) -> dict[str, Any]:
+        state = self._read_state()
+        run: dict[str, Any] = {
+            "run_id": run_id,
+            "trigger": trigger,
+            "status": StageStatus.RUNNING.value,
+            "started_at": _now(),
+            "finished_at": None,
+            "stages": {name: {"status": StageStatus.PENDING.value, "seconds": None} for name in self.order},
+        }
+        state["runs"] = [run, *state["runs"]][: self.history_size]
+        logger.info(f"Pipeline run {run['run_id']} ({trigger}) started")
+
+        outputs: dict[str, Any] = {}
+        for name in self.order:
+            stage, stage_run = self.stages[name], run["stages"][name]
+            if any(run["stages"][dependency]["status"] in _FAILED for dependency in stage.depends_on):
+                stage_run["status"] = StageStatus.UPSTREAM_FAILED.value
+                continue
+
+            stage_run["status"] = StageStatus.RUNNING.value
+            self._write_state(state)
+            start = time.perf_counter()
+            try:
+                status = self._run_stage(stage, outputs, state["stages"])
+                stage_run["status"] = status.value
+            except Exception as ex:  # pylint: disable=broad-exception-caught
+                logger.exception(f"Pipeline stage {name} failed")
+                stage_run["status"], stage_run["error"] = StageStatus.FAILED.value, str(ex)
+            stage_run["seconds"] = time.perf_counter() - start
+
+        failed = any(stage_run["status"] in _FAILED for stage_run in run["stages"].values())
+        run["status"] = (StageStatus.FAILED if failed else StageStatus.SUCCEEDED).value
+        run["finished_at"] = _now()
+        self._write_state(state)
+        logger.info(f"Pipeline run {run['run_id']} {run['status']}")
+        return run
+
+    @staticmethod
+    def _run_stage(stage: Stage, outputs: dict[str, Any], last_runs: dict[str, Any]) -> StageStatus:
+        """Runs the stage or reuses its last output, adding it to `outputs` and its successful run to `last_runs`."""
+        inputs = {dependency: outputs[dependency] for dependency in stage.depends_on}
+        fingerprint = None
+        if stage.depends_on or stage.fingerprint is not None:
+            external = stage.fingerprint() if stage.fingerprint is not None else None
+            fingerprint = _hash({"inputs": inputs, "external": external})
+
+        last = last_runs.get(stage.name)
+        if fingerprint is not None and last is not None and last["fingerprint"] == fingerprint:
+            outputs[stage.name] = last["output"]
+            logger.info(f"Pipeline stage {stage.name} skipped, its inputs did not change")
+            if stage.on_skip is not None:
+                stage.on_skip(inputs)
+            return StageStatus.SKIPPED
+
+        outputs[stage.name] = stage.run(inputs)
+        last_runs[stage.name] = {"fingerprint": fingerprint, "output": outputs[stage.name], "finished_at": _now()}
+        return StageStatus.SUCCEEDED
+
+
+async def schedule(start: Callable[[], Any], cron: str | None, interval: float | None) -> None:
+    """Calls `start` as per the `cron` expression or every `interval` seconds (after the first interval).
+
+    Must be awaited in a running event loop, e.g. on startup; does nothing if neither is set.
+    """
+    if cron:
+        repeat_at(cron=cron, logger=logger)(start)()
+        logger.info(f"Pipeline scheduled at {cron}")
+    elif interval:
+        await repeat_every(seconds=interval, wait_first=True, logger=logger)(start)()
+        logger.info(f"Pipeline scheduled every {interval} seconds")
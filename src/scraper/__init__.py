@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import time
 from abc import abstractmethod, ABC
+from dataclasses import dataclass, field
 from typing import Iterator, Type, Final
 
 import requests
@@ -9,6 +10,20 @@ from bs4 import BeautifulSoup, ResultSet, Tag
 from loguru import logger
 
 
+@dataclass(frozen=True)
+class CrawlTarget:
+    """Paginated listing (e.g. one category) which can be fetched by the crawler engine."""
+
+    url: str
+    params: dict[str, str]
+    page_param: str
+    max_pages: int
+    extra_fields: dict[str, str] = field(default_factory=dict)  # added to every offer found under this target
+
+    def get_params(self, page: int) -> dict[str, str]:
+        return {**self.params, self.page_param: str(page)}
+
+
 class Scraper(ABC):
     FLOOR_ENDS_WITH_TEXT: Final[tuple[str, ...]] = (
         "parter",
@@ -22,6 +37,11 @@ class Scraper(ABC):
     def run_crawler() -> Iterator[dict]:
         pass
 
+    @staticmethod
+    @abstractmethod
+    def get_crawl_targets() -> list[CrawlTarget]:
+        pass
+
     @staticmethod
     @abstractmethod
     def get_offers(soup: BeautifulSoup) -> ResultSet[Tag]:
@@ -50,7 +70,7 @@ class Scraper(ABC):
     def get_html(url: str, sleep: int = 10, **kwargs: dict) -> str:
         if sleep > 150:
             raise RuntimeError("Sleep time exceeded 150 seconds")
-        logger.info(f"Fetching {url}... {kwargs}")
+        logger.info("Fetching {}... {}", url, kwargs)  # formatted only if the message is logged
         request = requests.get(url, timeout=10, **kwargs)
         if request.status_code == 200:
             logger.info(f"Success! {request.status_code}")
@@ -0,0 +1,384 @@
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from enum import Enum
+from typing import AsyncIterator, Final, Iterator, Type
+from urllib.parse import urlsplit
+
+import aiohttp
+from loguru import logger
+
+from monitoring import FETCH_SECONDS, OFFERS_PER_PAGE, PARSE_SECONDS, TOO_MANY_REQUESTS
+from scraper import CrawlTarget, Scraper
+from scraper.lxml_extractor import get_extractor
+from scraper.page_cache import CachedPage, PageCache, get_content_hash
+
+
+class TooManyRequestsError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class HostLimits:
+    concurrency: int = 4  # requests in flight at once
+    requests_per_second: float = 2.0  # token bucket refill rate
+    burst: int = 4  # token bucket capacity
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class HostLimiter:
+    """Per-host concurrency and rate limit with 429 backoff shared by every request to the host."""
+
+    INITIAL_BACKOFF: Final[float] = 10
+    MAX_BACKOFF: Final[float] = 150
+
+    def __init__(self, host: str, limits: HostLimits) -> None:
+        self.host = host
+        self._semaphore = asyncio.Semaphore(limits.concurrency)
+        self._bucket = TokenBucket(limits.requests_per_second, limits.burst)
+        self._backoff = self.INITIAL_BACKOFF
+        self._paused_until = 0.0
+
+    async def __aenter__(self) -> HostLimiter:
+        await self._semaphore.acquire()
+        try:
+            while (delay := self._paused_until - time.monotonic()) > 0:
+                await asyncio.sleep(delay)
+            await self._bucket.acquire()
+        except BaseException:
+            self._semaphore.release()
+            raise
+        return self
+
+    async def __aexit__(self, *_: object) -> None:
+        self._semaphore.release()
+
+    def on_success(self) -> None:
+        self._backoff = self.INITIAL_BACKOFF
+
+    def on_too_many_requests(self, retry_after: str | None) -> None:
+        if self._backoff > self.MAX_BACKOFF:
+            raise TooManyRequestsError(f"Backoff for {self.host} exceeded {self.MAX_BACKOFF} seconds")
+
+        delay = float(retry_after) if retry_after is not None and retry_after.isdigit() else self._backoff
+        TOO_MANY_REQUESTS.labels(self.host).inc()
+        logger.warning(f"Too many requests (429) from {self.host}. Pausing host for {delay} seconds")
+        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        self._backoff *= 2
+
+
+@dataclass(frozen=True)
+class FetchedPage:
+    text: str | None  # None if the page was not modified since the version in the conditional request
+    etag: str | None = None
+    last_modified: str | None = None
+
+
+class ParserBackend(Enum):
+    BS4 = "bs4"  # Scraper.process_html
+    LXML = "lxml"  # compiled XPath fast path, see scraper.lxml_extractor
+
+
+def parse_page(scraper: Type[Scraper], html_text: str, backend: ParserBackend = ParserBackend.BS4) -> list[dict]:
+    if backend is ParserBackend.LXML:
+        return get_extractor(scraper).process_html(html_text)
+    return list(scraper.process_html(scraper, html_text) or ())
+
+
+def _parse_page_timed(scraper: Type[Scraper], html_text: str, backend: ParserBackend) -> tuple[list[dict], float]:
+    # timed where it runs, so a page waiting for a free worker process does not count
+    start = time.perf_counter()
+    offers = parse_page(scraper, html_text, backend)
+    return offers, time.perf_counter() - start
+
+
+class ParseStage:
+    """Runs CPU-bound `process_html` in worker processes, so parsing scales with cores and does not block fetching.
+
+    At most `max_pending` pages are queued or being parsed at once; further fetched pages wait for a free slot,
+    which in turn stops their targets from scheduling new fetches (backpressure).
+    """
+
+    def __init__(self, workers: int, max_pending: int, backend: ParserBackend) -> None:
+        self.backend = backend
+        # spawn: the crawler runs in a process with running threads (event loop, thread pools), unsafe to fork
+        self._executor = (
+            ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) if workers > 0 else None
+        )
+        self._pending = asyncio.Semaphore(max_pending)
+
+    async def parse(self, scraper: Type[Scraper], html_text: str) -> list[dict]:
+        async with self._pending:
+            if self._executor is None:
+                offers, seconds = _parse_page_timed(scraper, html_text, self.backend)
+            else:
+                loop = asyncio.get_running_loop()
+                offers, seconds = await loop.run_in_executor(
+                    self._executor, _parse_page_timed, scraper, html_text, self.backend
+                )
+        PARSE_SECONDS.labels(scraper.__name__).observe(seconds)
+        OFFERS_PER_PAGE.labels(scraper.__name__).observe(len(offers))
+        return offers
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class CrawlerEngine:  # pylint: disable=too-many-instance-attributes
+    """Concurrent replacement for the sequential `run_crawler` loops.
+
+    Pages of a target are fetched in parallel (up to `pages_in_flight` ahead of the page being processed) over pooled
+    keep-alive connections. Each fetched page goes straight to the parse stage (`parse_workers` processes, inline
+    when 0). Offers are yielded in page order and a target stops at its first page without offers.
+
+    With a `page_cache`, pages are requested conditionally (If-None-Match / If-Modified-Since) and a page which is
+    not modified or has the same content hash as in the previous crawl is not parsed, so its offers (found before)
+    are not yielded again. With `stop_at_known_offers`, listings are assumed newest first: a target stops at such a
+    page or at a page whose offers were all found by previous crawls. Counters of the crawl are kept in `stats`.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        default_limits: HostLimits = HostLimits(),
+        host_limits: dict[str, HostLimits] | None = None,
+        pages_in_flight: int = 4,
+        timeout: float = 10,
+        buffer_size: int = 1_000,
+        parse_workers: int | None = None,
+        max_pending_parses: int | None = None,
+        parser_backend: ParserBackend = ParserBackend.BS4,
+        page_cache: PageCache | None = None,
+        stop_at_known_offers: bool = True,
+    ) -> None:
+        self.default_limits = default_limits
+        self.host_limits = host_limits or {}
+        self.pages_in_flight = pages_in_flight
+        self.timeout = timeout
+        self.buffer_size = buffer_size
+        self.parse_workers = (os.cpu_count() or 1) if parse_workers is None else parse_workers
+        self.max_pending_parses = max_pending_parses or 2 * max(self.parse_workers, 1)
+        self.parser_backend = parser_backend
+        self.page_cache = page_cache
+        self.stop_at_known_offers = stop_at_known_offers
+        self.stats: Counter[str] = Counter()
+        self._limiters: dict[str, HostLimiter] = {}
+
+    def _get_limiter(self, url: str) -> HostLimiter:
+        host = urlsplit(url).netloc
+        if host not in self._limiters:
+            self._limiters[host] = HostLimiter(host, self.host_limits.get(host, self.default_limits))
+        return self._limiters[host]
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        limits = [self.default_limits, *self.host_limits.values()]
+        connector = aiohttp.TCPConnector(
+            limit=sum(limit.concurrency for limit in limits) * 2,
+            limit_per_host=max(limit.concurrency for limit in limits),
+            keepalive_timeout=30,
+        )
+        return aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+
+    async def fetch(
+        self, session: aiohttp.ClientSession, url: str, params: dict[str, str], headers: dict[str, str] | None = None
+    ) -> FetchedPage:
+        limiter = self._get_limiter(url)
+        while True:
+            async with limiter:
+                logger.debug("Fetching {}... {}", url, params)  # formatted only if debug messages are logged
+                with FETCH_SECONDS.labels(limiter.host).time():  # until the body is read
+                    async with session.get(url, params=params, headers=headers) as response:
+                        if response.status == 304:
+                            limiter.on_success()
+                            self.stats["pages_not_modified"] += 1
+                            return FetchedPage(None)
+                        if response.status == 200:
+                            limiter.on_success()
+                            self.stats["pages_downloaded"] += 1
+                            self.stats["bytes_downloaded"] += len(await response.read())
+                            return FetchedPage(
+                                await response.text(),
+                                response.headers.get("ETag"),
+                                response.headers.get("Last-Modified"),
+                            )
+                        if response.status != 429:
+                            raise RuntimeError(f"Error fetching {url}: status code {response.status}")
+                        limiter.on_too_many_requests(response.headers.get("Retry-After"))
+
+    async def _fetch_and_parse_page(  # pylint: disable=too-many-arguments
+        self,
+        session: aiohttp.ClientSession,
+        parse_stage: ParseStage,
+        scraper: Type[Scraper],
+        target: CrawlTarget,
+        params: dict[str, str],
+    ) -> tuple[list[dict], bool] | None:
+        """Returns offers found on the page and whether they are all known from previous crawls (always for a page
+        which did not change, without its offers), or None if the page could not be fetched or processed."""
+        cached = self.page_cache.get(target.url, params) if self.page_cache is not None else None
+        try:
+            page = await self.fetch(session, target.url, params, cached.get_conditional_headers() if cached else None)
+        except Exception as exception:
+            logger.error(f"Error fetching {target.url}, params: {params}. Error: {exception}")
+            return None
+
+        if page.text is None:
+            return [], True
+        content_hash = get_content_hash(page.text)
+        if cached is not None and cached.sha256 == content_hash:
+            self.stats["pages_unchanged"] += 1
+            cached.etag, cached.last_modified = page.etag, page.last_modified
+            return [], True
+
+        try:
+            offers = await parse_stage.parse(scraper, page.text)
+        except Exception as exception:
+            logger.error(f"Error processing {target.url}, params: {params}. Error: {exception}")
+            return None
+        self.stats["pages_parsed"] += 1
+        if self.page_cache is None:
+            return offers, False
+
+        offer_ids = [offer["id"] for offer in offers if offer.get("id") is not None]
+        self.page_cache.put(target.url, params, CachedPage(content_hash, offer_ids, page.etag, page.last_modified))
+        return offers, bool(offer_ids) and self.page_cache.known_offer_ids.issuperset(offer_ids)
+
+    async def crawl_target(
+        self, session: aiohttp.ClientSession, parse_stage: ParseStage, scraper: Type[Scraper], target: CrawlTarget
+    ) -> AsyncIterator[dict]:
+        pages = iter(range(1, target.max_pages + 1))
+        in_flight: deque[tuple[dict[str, str], asyncio.Task[tuple[list[dict], bool] | None]]] = deque()
+
+        def schedule() -> None:
+            while len(in_flight) < self.pages_in_flight and (page := next(pages, None)) is not None:
+                params = target.get_params(page)
+                task = asyncio.create_task(self._fetch_and_parse_page(session, parse_stage, scraper, target, params))
+                in_flight.append((params, task))
+
+        try:
+            schedule()
+            while in_flight:
+                params, task = in_flight.popleft()
+                page = await task
+                schedule()
+                if page is None:
+                    continue
+
+                offers, known = page
+                if not offers and not known:
+                    break  # no more pages (current page with no offers)
+
+                for offer in offers:
+                    offer.update(target.extra_fields)
+                    yield offer
+                logger.debug("Successfully processed {}, params: {}", target.url, params)
+                if known and self.stop_at_known_offers:
+                    self.stats["targets_stopped_early"] += 1
+                    logger.info(f"Reached offers known from previous crawls at {target.url}, params: {params}")
+                    break
+        finally:
+            for _, task in in_flight:
+                task.cancel()
+
+    async def crawl(self, scrapers: list[Type[Scraper]]) -> AsyncIterator[dict]:
+        targets = [(scraper, target) for scraper in scrapers for target in scraper.get_crawl_targets()]
+        async for offer in self.crawl_targets(targets):
+            yield offer
+
+    async def crawl_targets(self, targets: list[tuple[Type[Scraper], CrawlTarget]]) -> AsyncIterator[dict]:
+        """Crawls the given targets, each processed with its scraper."""
+        offers: asyncio.Queue[dict | None] = asyncio.Queue(maxsize=self.buffer_size)
+        if self.page_cache is not None:
+            self.page_cache.start_crawl()
+
+        parse_stage = ParseStage(self.parse_workers, self.max_pending_parses, self.parser_backend)
+        async with self._create_session() as session:
+
+            async def pump(scraper: Type[Scraper], target: CrawlTarget) -> None:
+                async for offer in self.crawl_target(session, parse_stage, scraper, target):
+                    await offers.put(offer)
+
+            async def pump_all() -> None:
+                try:
+                    async with asyncio.TaskGroup() as task_group:
+                        for scraper, target in targets:
+                            task_group.create_task(pump(scraper, target))
+                finally:
+                    await offers.put(None)
+
+            producer = asyncio.create_task(pump_all())
+            try:
+                while (offer := await offers.get()) is not None:
+                    yield offer
+                await producer  # re-raise errors from pumps
+                logger.info(f"Crawl finished: {dict(self.stats)}")
+            finally:
+                producer.cancel()
+                parse_stage.close()
+
+    def run(self, scrapers: list[Type[Scraper]]) -> Iterator[dict]:
+        """Synchronous bridge: runs the crawl in a background event loop and yields offers as they arrive."""
+        results: queue.Queue[tuple[dict | None, BaseException | None]] = queue.Queue(maxsize=self.buffer_size)
+        stopped = threading.Event()
+
+        async def produce() -> None:
+            async for offer in self.crawl(scrapers):
+                if stopped.is_set():
+                    return
+                try:
+                    results.put_nowait((offer, None))
+                except queue.Full:
+                    await asyncio.to_thread(results.put, (offer, None))
+
+        def run_loop() -> None:
+            error: BaseException | None = None
+            try:
+                asyncio.run(produce())
+            except BaseException as exception:  # pylint: disable=broad-exception-caught
+                error = exception
+            results.put((None, error))
+
+        thread = threading.Thread(target=run_loop, name="crawler-engine", daemon=True)
+        thread.start()
+        try:
+            while True:
+                offer, error = results.get()
+                if error is not None:
+                    raise error
+                if offer is None:
+                    return
+                yield offer
+        finally:
+            stopped.set()
+            while thread.is_alive():  # unblock the producer if it waits on a full queue
+                try:
+                    results.get(timeout=0.1)
+                except queue.Empty:
+                    pass
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from functools import cache
+from typing import Callable, Final, Type
+
+from lxml import etree
+
+from scraper import Scraper
+from scraper.ogloszenia_trojmiasto import OgloszeniaTrojmiasto
+from scraper.tyszkiewicz import Tyszkiewicz
+
+_PARSER: Final[etree.HTMLParser] = etree.HTMLParser(encoding="utf-8")
+_TEXT: Final[etree.XPath] = etree.XPath("string()", smart_strings=False)
+
+
+def _class_predicate(class_: str) -> str:
+    # Same semantics as BeautifulSoup's `class_=` string match: a single name matches any of the element's classes,
+    # a string with spaces must be equal to the whole (whitespace normalized) class attribute.
+    if " " in class_:
+        return f"normalize-space(@class)='{class_}'"
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_} ')"
+
+
+def _descendants(tag: str, class_: str | None = None) -> etree.XPath:
+    predicate = f"[{_class_predicate(class_)}]" if class_ is not None else ""
+    return etree.XPath(f".//{tag}{predicate}")
+
+
+def _first_text(offer: etree._Element, *paths: etree.XPath) -> str | None:
+    """Follows `find` calls chained like `offer.find(...).find(...)` and returns `.text` of the last one."""
+    element = offer
+    for path in paths:
+        found = path(element)
+        if not found:
+            return None
+        element = found[0]
+    return _TEXT(element)
+
+
+class LxmlExtractor(ABC):
+    """Fast-path alternative to `Scraper.process_html`.
+
+    Selectors are compiled once to XPath and evaluated on an lxml tree, skipping BeautifulSoup tree construction.
+    `process_element` must return the same dicts as the scraper's `process_tag`.
+    """
+
+    OFFERS: etree.XPath
+
+    def process_html(self, html_text: str) -> list[dict]:
+        root = etree.fromstring(html_text.encode("utf-8"), _PARSER) if html_text.strip() else None
+        if root is None:
+            return []
+        return [self.process_element(offer) for offer in self.OFFERS(root)]
+
+    @abstractmethod
+    def process_element(self, offer: etree._Element) -> dict[str, str | None]:
+        pass
+
+
+class TyszkiewiczLxmlExtractor(LxmlExtractor):
+    OFFERS = _descendants("div", Tyszkiewicz.OFFERS_CLASS)
+    ID_AND_DATE = _descendants("div", "offer__box--number")
+    TITLE = _descendants("h2", "offer__box--name")
+    TITLE_LINK = _descendants("a")
+    PRICES = _descendants("div", "offer__box--prices")
+    FULL_PRICE = _descendants("div", "offer__box--price")
+    PRICE_PER_M2 = _descendants("div", "offer__box--pricePer")
+    FIELDS = _descendants("div", "offer__box--basicOne bi")
+
+    # pylint: disable=protected-access
+    def process_element(self, offer: etree._Element) -> dict[str, str | None]:
+        result_dict: dict[str, str | None] = {}
+
+        if (id_and_date := _first_text(offer, self.ID_AND_DATE)) is not None:
+            Tyszkiewicz._process_id_and_date(id_and_date, result_dict)
+
+        if (title := _first_text(offer, self.TITLE, self.TITLE_LINK)) is not None:
+            result_dict["title"] = title
+
+        for key, path in (("full_price", self.FULL_PRICE), ("price_per_m2", self.PRICE_PER_M2)):
+            if (price := _first_text(offer, self.PRICES, path)) is not None:
+                try:
+                    result_dict[key] = Tyszkiewicz._process_price(price)
+                except ValueError:
+                    pass
+
+        if fields := [_TEXT(field) for field in self.FIELDS(offer)]:
+            Tyszkiewicz._extract_area_from_fields(fields, result_dict)
+            Tyszkiewicz._extract_rooms_from_fields(fields, result_dict)
+            Tyszkiewicz._extract_floor_from_fields(fields, result_dict)
+            Tyszkiewicz._extract_year_from_fields(fields, result_dict)
+
+        return result_dict
+
+
+class OgloszeniaTrojmiastoLxmlExtractor(LxmlExtractor):
+    OFFERS = _descendants("div", OgloszeniaTrojmiasto.OFFERS_CLASS)
+    TITLE = _descendants("a", "list__item__content__title__name link")
+    ADDRESS = _descendants("p", "list__item__content__subtitle")
+    PRICE = _descendants("div", "list__item__picture__price")
+    PRICE_TEXT = _descendants("p")
+    CONTEXT = _descendants("ul", "list__item__details__icons")
+    DESCRIPTION = _descendants("p", "list__item__details__icons__element__desc")
+    AREA = _descendants("li", "list__item__details__icons__element details--icons--element--powierzchnia")
+    ROOMS = _descendants("li", "list__item__details__icons__element details--icons--element--l_pokoi")
+    FLOOR = _descendants("li", "list__item__details__icons__element details--icons--element--pietro")
+    YEAR = _descendants("li", "list__item__details__icons__element details--icons--element--rok_budowy")
+
+    # pylint: disable=protected-access
+    def process_element(self, offer: etree._Element) -> dict[str, str | None]:
+        result_dict: dict[str, str | None] = {}
+
+        if (_id := offer.get("id")) is not None:
+            result_dict["id"] = _id
+        if (title := _first_text(offer, self.TITLE)) is not None:
+            result_dict["title"] = title
+        if (address := _first_text(offer, self.ADDRESS)) is not None:
+            result_dict["address"] = address
+        if (price := _first_text(offer, self.PRICE, self.PRICE_TEXT)) is not None:
+            result_dict["full_price"] = OgloszeniaTrojmiasto._process_price(price)
+
+        context = self.CONTEXT(offer)
+        if not context:
+            return result_dict
+
+        for key, path in (("area", self.AREA), ("rooms", self.ROOMS)):
+            if (value := _first_text(context[0], path, self.DESCRIPTION)) is not None:
+                result_dict[key] = value.strip()
+        if (floor := _first_text(context[0], self.FLOOR, self.DESCRIPTION)) is not None:
+            OgloszeniaTrojmiasto._process_floor(floor.strip(), result_dict)
+        if (year := _first_text(context[0], self.YEAR, self.DESCRIPTION)) is not None:
+            result_dict["year"] = year.strip()
+
+        return result_dict
+
+
+EXTRACTORS: Final[dict[Type[Scraper], Callable[[], LxmlExtractor]]] = {
+    Tyszkiewicz: TyszkiewiczLxmlExtractor,
+    OgloszeniaTrojmiasto: OgloszeniaTrojmiastoLxmlExtractor,
+}
+
+
+@cache
+def get_extractor(scraper: Type[Scraper]) -> LxmlExtractor:
+    if scraper not in EXTRACTORS:
+        raise ValueError(f"No lxml extractor for {scraper.__name__}")
+    return EXTRACTORS[scraper]()
@@ -5,7 +5,7 @@ from bs4 import BeautifulSoup, ResultSet
 from bs4.element import Tag
 from loguru import logger
 
-from scraper import Scraper
+from scraper import CrawlTarget, Scraper
 
 
 class OgloszeniaTrojmiasto(Scraper):
@@ -49,6 +49,19 @@ class OgloszeniaTrojmiasto(Scraper):
 
                 logger.success(f"Successfully processed {url}, params: {params}")
 
+    @staticmethod
+    def get_crawl_targets() -> list[CrawlTarget]:
+        return [
+            CrawlTarget(
+                url=url,
+                params=OgloszeniaTrojmiasto.default_params.copy(),
+                page_param="strona",
+                max_pages=OgloszeniaTrojmiasto.max_pages,
+                extra_fields={"source": url},
+            )
+            for url in (OgloszeniaTrojmiasto.URL_NEW, OgloszeniaTrojmiasto.URL_SECONDARY)
+        ]
+
     @staticmethod
     def get_offers(soup: BeautifulSoup) -> ResultSet[Tag]:
         offers = soup.find_all("div", class_=OgloszeniaTrojmiasto.OFFERS_CLASS)
@@ -177,8 +190,10 @@ class OgloszeniaTrojmiasto(Scraper):
             logger.warning(f"No floor found {offer_context.text}")
             return
 
-        floor = floor.text.strip()
+        OgloszeniaTrojmiasto._process_floor(floor.text.strip(), result_dict)
 
+    @staticmethod
+    def _process_floor(floor: str, result_dict: dict[str, str | None]) -> None:
         if floor.lower().endswith(OgloszeniaTrojmiasto.FLOOR_ENDS_WITH_TEXT):
             floor = "0"
         elif re.fullmatch(r"\d+", floor):
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import asdict, dataclass
+from urllib.parse import urlencode
+
+from loguru import logger
+
+
+def get_page_key(url: str, params: dict[str, str]) -> str:
+    return f"{url}?{urlencode(sorted(params.items()))}"
+
+
+def get_content_hash(html_text: str) -> str:
+    return hashlib.sha256(html_text.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CachedPage:
+    sha256: str
+    offer_ids: list[str]
+    etag: str | None = None
+    last_modified: str | None = None
+
+    def get_conditional_headers(self) -> dict[str, str]:
+        headers = {}
+        if self.etag is not None:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified is not None:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class PageCache:
+    """Validators (ETag, Last-Modified), content hash and offer ids of every listing page (URL and params) crawled.
+
+    Lets a crawl send conditional requests, skip parsing pages whose content did not change and recognize offers
+    found by previous crawls: `known_offer_ids` are the ids on all cached pages when the cache was loaded (or the
+    last crawl started), so they don't grow with pages of the crawl in progress. Stored as JSON in `path`.
+    """
+
+    def __init__(self, path: str | None = None) -> None:
+        self.path = path
+        self._pages: dict[str, CachedPage] = self._load(path) if path is not None else {}
+        self.known_offer_ids: frozenset[str] = frozenset()
+        self.start_crawl()
+
+    @staticmethod
+    def _load(path: str) -> dict[str, CachedPage]:
+        try:
+            with open(path, encoding="utf-8") as f:
+                return {key: CachedPage(**page) for key, page in json.load(f).items()}
+        except FileNotFoundError:
+            return {}
+        except (ValueError, TypeError) as ex:
+            logger.warning(f"Corrupted page cache, starting with an empty cache: {ex}")
+            return {}
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def start_crawl(self) -> None:
+        self.known_offer_ids = frozenset(offer_id for page in self._pages.values() for offer_id in page.offer_ids)
+
+    def get(self, url: str, params: dict[str, str]) -> CachedPage | None:
+        return self._pages.get(get_page_key(url, params))
+
+    def put(self, url: str, params: dict[str, str], page: CachedPage) -> None:
+        self._pages[get_page_key(url, params)] = page
+
+    def save(self, path: str | None = None) -> None:
+        """Writes the cache to `path` (default: the path it was loaded from)."""
+        path = path if path is not None else self.path
+        if path is None:
+            return
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({key: asdict(page) for key, page in self._pages.items()}, f)
+        os.replace(tmp_path, path)
@@ -6,7 +6,7 @@ from bs4 import BeautifulSoup
 from bs4.element import Tag, ResultSet
 from loguru import logger
 
-from scraper import Scraper
+from scraper import CrawlTarget, Scraper
 
 
 class Tyszkiewicz(Scraper):
@@ -84,6 +84,19 @@ class Tyszkiewicz(Scraper):
 
                 logger.success(f"Successfully processed {Tyszkiewicz.URL}, params: {params}")
 
+    @staticmethod
+    def get_crawl_targets() -> list[CrawlTarget]:
+        return [
+            CrawlTarget(
+                url=Tyszkiewicz.URL,
+                params={**Tyszkiewicz.default_params, "id": category.value},
+                page_param="page",
+                max_pages=Tyszkiewicz.max_pages,
+                extra_fields={"category": category.name, "source": Tyszkiewicz.URL},
+            )
+            for category in Tyszkiewicz.Categories
+        ]
+
     @staticmethod
     def get_offers(soup: BeautifulSoup) -> ResultSet[Tag]:
         offers = soup.find_all("div", class_=Tyszkiewicz.OFFERS_CLASS)
@@ -107,12 +120,16 @@ class Tyszkiewicz(Scraper):
             logger.warning("No date and id found")
             return
 
-        id_and_date_splitted = id_and_date.text.split(" ")
+        Tyszkiewicz._process_id_and_date(id_and_date.text, result_dict)
+
+    @staticmethod
+    def _process_id_and_date(id_and_date: str, result_dict: dict[str, str | None]) -> None:
+        id_and_date_splitted = id_and_date.split(" ")
         if len(id_and_date_splitted) != 3:
-            logger.warning(f"Wrong date and id format: {id_and_date.text}")
+            logger.warning(f"Wrong date and id format: {id_and_date}")
             return
 
-        result_dict["id"], result_dict["date"] = id_and_date.text.split(" ")[1:]
+        result_dict["id"], result_dict["date"] = id_and_date_splitted[1:]
 
     @staticmethod
     def _extract_title(offer: Tag, result_dict: dict[str, str | None]) -> None:
@@ -198,7 +215,7 @@ class Tyszkiewicz(Scraper):
         elif len(area) > 1:
             logger.warning(f"More than one area found: {area}")
         else:
-            logger.info(f"No area found: {fields}")
+            logger.info("No area found: {}", fields)
 
     @staticmethod
     def _extract_rooms_from_fields(fields: list[str], result_dict: dict[str, str | None]) -> None:
@@ -211,7 +228,7 @@ class Tyszkiewicz(Scraper):
         elif len(rooms) > 1:
             logger.warning(f"More than one room found: {rooms}")
         else:
-            logger.info(f"No room found: {fields}")
+            logger.info("No room found: {}", fields)
 
     @staticmethod
     def _extract_floor_from_fields(fields: list[str], result_dict: dict[str, str | None]) -> None:
@@ -228,7 +245,7 @@ class Tyszkiewicz(Scraper):
         elif len(results) > 1:
             logger.warning(f"More than one floor found: {results}")
         else:
-            logger.info(f"No floor found: {fields}")
+            logger.info("No floor found: {}", fields)
 
     @staticmethod
     def _extract_year_from_fields(fields: list[str], result_dict: dict[str, str | None]) -> None:
@@ -241,4 +258,4 @@ class Tyszkiewicz(Scraper):
         elif len(year) > 1:
             logger.warning(f"More than one year found: {year}")
         else:
-            logger.info(f"No year found: {fields}")
+            logger.info("No year found: {}", fields)
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import io
+import json
+from typing import Any, Final, Iterator, Sequence
+
+import numpy as np
+import pandas as pd
+
+from pydantic_models import HouseListing
+
+FEATURES: Final[list[str]] = list(HouseListing.__fields__)
+
+JSON_CONTENT_TYPE: Final[str] = "application/json"
+NDJSON_CONTENT_TYPE: Final[str] = "application/x-ndjson"
+CSV_CONTENT_TYPE: Final[str] = "text/csv"
+
+
+class BatchValidationError(ValueError):
+    pass
+
+
+def _parse_json(body: bytes) -> dict[str, Sequence[Any]]:
+    payload = json.loads(body)
+    if isinstance(payload, dict):  # columnar: {"area": [...], "rooms": [...], ...}
+        return payload
+    if isinstance(payload, list):  # row-wise: [{"area": ..., "rooms": ...}, ...]
+        return _rows_to_columns(payload)
+    raise BatchValidationError("JSON body must be a list of listings or an object of columns")
+
+
+def _parse_ndjson(body: bytes) -> dict[str, Sequence[Any]]:
+    return _rows_to_columns([json.loads(line) for line in body.splitlines() if line.strip()])
+
+
+def _parse_csv(body: bytes) -> dict[str, Sequence[Any]]:
+    try:
+        df = pd.read_csv(io.BytesIO(body), usecols=FEATURES)
+    except ValueError as ex:
+        raise BatchValidationError(str(ex)) from ex
+    return {feature: df[feature].to_numpy() for feature in FEATURES}
+
+
+def _rows_to_columns(rows: list[Any]) -> dict[str, Sequence[Any]]:
+    if not all(isinstance(row, dict) for row in rows):
+        raise BatchValidationError("Every listing must be a JSON object")
+    return {feature: [row.get(feature) for row in rows] for feature in FEATURES}
+
+
+def parse_listings(body: bytes, content_type: str | None) -> dict[str, Sequence[Any]]:
+    media_type = (content_type or JSON_CONTENT_TYPE).split(";")[0].strip().lower()
+    try:
+        if media_type == JSON_CONTENT_TYPE:
+            return _parse_json(body)
+        if media_type == NDJSON_CONTENT_TYPE:
+            return _parse_ndjson(body)
+    except (json.JSONDecodeError, UnicodeDecodeError) as ex:
+        raise BatchValidationError(f"Invalid JSON: {ex}") from ex
+    if media_type == CSV_CONTENT_TYPE:
+        return _parse_csv(body)
+
+    raise BatchValidationError(f"Unsupported content type: {media_type}")
+
+
+def listings_to_matrix(columns: dict[str, Sequence[Any]]) -> np.ndarray:
+    """Validates all listings at once against `HouseListing` constraints and returns one feature matrix."""
+    missing = [feature for feature in FEATURES if feature not in columns]
+    if missing:
+        raise BatchValidationError(f"Missing features: {missing}")
+    not_lists = [feature for feature in FEATURES if not isinstance(columns[feature], (list, np.ndarray))]
+    if not_lists:
+        raise BatchValidationError(f"Feature columns must be lists: {not_lists}")
+
+    lengths = {len(columns[feature]) for feature in FEATURES}
+    if len(lengths) != 1:
+        raise BatchValidationError("All feature columns must have the same length")
+    if lengths == {0}:
+        raise BatchValidationError("No listings provided")
+
+    x = np.empty((lengths.pop(), len(FEATURES)), dtype=np.float64)
+    for i, feature in enumerate(FEATURES):
+        try:
+            x[:, i] = np.asarray(columns[feature], dtype=np.float64)
+        except (TypeError, ValueError) as ex:
+            raise BatchValidationError(f"Feature {feature} must be numeric") from ex
+
+        _validate_column(feature, x[:, i])
+
+    return x
+
+
+def _validate_column(feature: str, column: np.ndarray) -> None:
+    field = HouseListing.__fields__[feature]
+    invalid = ~np.isfinite(column)
+    if issubclass(field.outer_type_, int):
+        invalid |= np.mod(column, 1) != 0
+    if field.field_info.gt is not None:
+        invalid |= column <= field.field_info.gt
+    if field.field_info.ge is not None:
+        invalid |= column < field.field_info.ge
+
+    if invalid.any():
+        rows = np.flatnonzero(invalid)[:10].tolist()
+        raise BatchValidationError(f"Invalid {feature} in listings: {rows}")
+
+
+def predict_in_chunks(model: Any, x: np.ndarray, chunk_size: int) -> Iterator[bytes]:
+    for chunk in np.array_split(x, range(chunk_size, len(x), chunk_size)):
+        results = model.predict(chunk)
+        yield "".join(json.dumps({"result": float(result)}) + "\n" for result in results).encode()
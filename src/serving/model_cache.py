@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Iterable
+
+from models.flat_forest import CompiledForest, compile_model
+from models.preprocessing import PreprocessedModel
+from models.registry import ModelRegistry
+from monitoring import MODEL_LOAD_SECONDS
+
+
+class RegistryModelCache:
+    """Keeps models of a `ModelRegistry` resident: the active version and recently pinned ones.
+
+    Registered artifacts never change, so a loaded version is reused without checking its file again.
+    At most `max_models` versions are held in memory; the least recently requested one is dropped first.
+    With `compiled`, forests predict small batches with their flat export (see `CompiledForest`).
+    """
+
+    def __init__(self, registry: ModelRegistry, max_models: int = 2, compiled: bool = True) -> None:
+        self.registry = registry
+        self.max_models = max_models
+        self.compiled = compiled
+        self._models: OrderedDict[str, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, version: str | None = None) -> tuple[Any, str]:
+        """Returns the model of `version` (the active one by default) and its version."""
+        version = version if version is not None else self.registry.active_version
+        if version is None:
+            raise FileNotFoundError("No active model")
+
+        with self._lock:
+            model = self._models.pop(version) if version in self._models else self._load(version)
+            self._models[version] = model
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+        return model, version
+
+    def _load(self, version: str) -> Any:
+        with MODEL_LOAD_SECONDS.time():
+            return self._load_model(version)
+
+    def _load_model(self, version: str) -> Any:
+        model = self.registry.load_model(version)
+        if not self.compiled:
+            return model
+
+        flat_forest = self.registry.load_compiled(version)
+        if flat_forest is None:  # registered before forests were exported
+            flat_forest = compile_model(model)
+        if flat_forest is None:
+            return model
+        if isinstance(model, PreprocessedModel):
+            return model.with_model(CompiledForest(model.model, flat_forest))
+        return CompiledForest(model, flat_forest)
+
+    def save(self, model: Any, metadata: dict[str, Any], training_ids: Iterable[str] | None = None) -> str:
+        """Registers the model and makes it the active version."""
+        version = self.registry.register(model, metadata, training_ids)["version"]
+        self.registry.activate(version)
+        return version
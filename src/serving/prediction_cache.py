@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+from models import FEATURES
+
+
+def listing_key(listing: dict[str, Any]) -> tuple[float, ...]:
+    """Normalizes a listing to the tuple of its features in model order, so equal listings share an entry."""
+    return tuple(float(listing[feature]) for feature in FEATURES)
+
+
+class PredictionCache:  # pylint: disable=too-many-instance-attributes
+    """Bounded LRU cache of predictions with a time to live, keyed by model version and normalized features.
+
+    Entries of a version are never served for another one, so a new model can't return stale predictions even
+    before `clear` drops the old entries. At most `max_size` entries are kept (0 disables the cache); the least
+    recently used one is evicted first and entries older than `ttl` seconds are dropped when they are looked up.
+    """
+
+    def __init__(
+        self, max_size: int = 10_000, ttl: float = 3600.0, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: OrderedDict[tuple[str, Hashable], tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def get(self, version: str, key: Hashable) -> Any | None:
+        """Returns the cached prediction, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get((version, key))
+            if entry is not None and self.clock() - entry[0] > self.ttl:
+                del self._entries[(version, key)]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((version, key))
+            self.hits += 1
+            return entry[1]
+
+    def put(self, version: str, key: Hashable, prediction: Any) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[(version, key)] = (self.clock(), prediction)
+            self._entries.move_to_end((version, key))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drops all entries, e.g. when another model version becomes active."""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
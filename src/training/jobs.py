@@ -0,0 +1,414 @@
+from __future__ import annotations
+
+import fcntl
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager, suppress
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from enum import Enum
+from functools import partial
+from typing import Any, Callable, Final, Iterator, Protocol, TextIO
+
+import pandas as pd
+from loguru import logger
+
+from enums import ModelEnum
+from models import get_trained_model
+from models.incremental import update_model
+from models.registry import ModelRegistry, data_snapshot
+from monitoring import TRAINING_SECONDS
+
+STAGES: Final[tuple[str, ...]] = ("loading_data", "fitting", "saving")
+
+
+class Fit(Protocol):
+    """Picklable function fitting a model in the training process. Returns the model and its result."""
+
+    def __call__(self, data: pd.DataFrame) -> tuple[Any, dict[str, Any]]:
+        ...
+
+
+def fit_model(model_name: str, data: pd.DataFrame) -> tuple[Any, dict[str, Any]]:
+    # ModelEnum members pickle by value (an estimator), so they are passed to the training process by name
+    model, r2_train = get_trained_model(ModelEnum[model_name], data)
+    return model, {"r2_score_train": r2_train, "model_used": model_name}
+
+
+def fit_update(model_name: str, registry_dir: str, base_version: str, data: pd.DataFrame) -> tuple[Any, dict[str, Any]]:
+    """Updates a registered model with new data; the R2 score is measured on the new data only."""
+    model, r2_new = update_model(ModelRegistry(registry_dir).load_model(base_version), data)
+    return model, {"r2_score_train": r2_new, "model_used": model_name}
+
+
+def load_new_listings(
+    load_data: Callable[[str | None], pd.DataFrame], since_crawl: str, trained_ids: frozenset[str]
+) -> pd.DataFrame:
+    """Loads crawls newer than `since_crawl`, keeping only listings whose ids are not in `trained_ids`.
+
+    Offers stay listed for many crawls, so newer crawls repeat listings the base model was already trained on; those
+    would be added to its index (or its new trees) again. Listings are told apart by id rather than by date, because
+    not every scraper finds the date of a listing.
+    """
+    data = load_data(since_crawl)
+    return data[~data["id"].isin(trained_ids)]
+
+
+def get_model_params(model: Any) -> dict[str, Any]:
+    """Params of the model which can be stored as JSON.
+
+    Nested estimators (e.g. the steps of a pipeline) are left out, their own params are listed with their prefix;
+    other values which are not JSON serializable are stored as strings.
+    """
+    params = {}
+    for key, value in model.get_params().items():
+        if hasattr(value, "get_params"):
+            continue
+        try:
+            json.dumps(value)
+            params[key] = value
+        except (TypeError, ValueError):
+            params[key] = str(value)
+    return params
+
+
+@dataclass(frozen=True)
+class TrainingPlan:
+    """What a job trains on and how, decided when the job starts rather than when it is submitted."""
+
+    load_data: Callable[[], pd.DataFrame]
+    fit: Fit
+    training: dict[str, Any] = field(default_factory=lambda: {"mode": "full", "updates": 0})  # stored in metadata
+    trained_ids: frozenset[str] = frozenset()  # listings the base model of an update was trained on
+    fallback: TrainingPlan | None = None  # used instead when `load_data` finds nothing to train on
+
+    def get_training_ids(self, data: pd.DataFrame) -> set[str] | None:
+        """Ids of the listings the trained model has seen, stored with it for its next update."""
+        return set(self.trained_ids).union(data["id"].dropna()) if "id" in data.columns else None
+
+
+def plan_training(  # pylint: disable=too-many-arguments
+    registry: ModelRegistry,
+    model_name: str,
+    load_data: Callable[[str | None], pd.DataFrame],
+    incremental: bool,
+    full_rebuild_every: int,
+) -> TrainingPlan:
+    """Plans an incremental update of the active model on listings newer than its data watermark.
+
+    Falls back to a full fit on all crawls when there is nothing to update (no active model of the same type trained
+    with a watermark, whose training ids were stored), when the newer crawls have no new listings and after
+    `full_rebuild_every` consecutive updates, which rebuilds the model from the deduplicated history and resets the
+    outlier bounds of its preprocessor.
+    """
+    full = TrainingPlan(partial(load_data, None), partial(fit_model, model_name))
+    if not incremental:
+        return full
+
+    base_version = registry.active_version
+    metadata = registry.get_metadata(base_version) if base_version is not None else {}
+    watermark = metadata.get("data", {}).get("newest_crawl")
+    updates = metadata.get("training", {}).get("updates")
+    if base_version is None or metadata.get("model_used") != model_name or watermark is None or updates is None:
+        logger.info(f"No {model_name} model with a data watermark to update, training it on all data")
+        return full
+    if updates >= full_rebuild_every:
+        logger.info(f"Rebuilding {model_name} model on all data after {updates} incremental updates")
+        return full
+    stored_ids = registry.get_training_ids(base_version)
+    if stored_ids is None:
+        logger.info(f"Ids of listings of {model_name} model {base_version} were not stored, training it on all data")
+        return full
+
+    trained_ids = frozenset(stored_ids)
+    return TrainingPlan(
+        partial(load_new_listings, load_data, watermark, trained_ids),
+        partial(fit_update, model_name, registry.directory, base_version),
+        {"mode": "incremental", "updates": updates + 1, "base_version": base_version, "since_crawl": watermark},
+        trained_ids,
+        full,
+    )
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+@dataclass
+class TrainingJob:  # pylint: disable=too-many-instance-attributes
+    model_used: str
+    plan: Callable[[], TrainingPlan]
+    key: str
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: JobStatus = JobStatus.QUEUED
+    stage: str | None = None
+    created_at: datetime = field(default_factory=_now)
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    timings: dict[str, float] = field(default_factory=dict)
+    result: dict[str, Any] | None = None
+    error: str | None = None
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def progress(self) -> float:
+        return len(self.timings) / len(STAGES)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "status": self.status.value,
+            "stage": self.stage,
+            "progress": self.progress,
+            "model_used": self.model_used,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at is not None else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at is not None else None,
+            "timings": dict(self.timings),
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+def _is_locked(path: str) -> bool:
+    try:
+        with open(path, encoding="utf-8") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_SH | fcntl.LOCK_NB)
+    except FileNotFoundError:
+        return False
+    except BlockingIOError:
+        return True
+    return False
+
+
+def _public(record: dict[str, Any]) -> dict[str, Any]:
+    return {key: value for key, value in record.items() if key not in ("key", "owner")}
+
+
+class TrainingJobManager:  # pylint: disable=too-many-instance-attributes
+    """Runs training jobs one at a time across all processes serving the API.
+
+    Jobs are stored in `<directory>/jobs.json`, so every worker reports the same jobs, and a request with the same
+    `key` as a job queued by any worker is coalesced into that job. A job runs in a background thread of the worker
+    which queued it once that thread holds `<directory>/training.lock`, so jobs of different workers don't train in
+    parallel. Data is loaded and the model saved (with its metadata) in that thread, while fitting runs in a separate
+    (spawned) process, so a long fit holds neither the GIL of the serving process nor a request thread. Jobs left
+    queued or running by a worker which exited are reported as failed: every worker holds an flock on its own file in
+    `<directory>/owners/` (rather than being identified by its pid, which is reused after a restart), released by the
+    OS when the worker exits. Up to `history_size` most recent jobs are kept.
+    """
+
+    JOBS_FILE: Final[str] = "jobs.json"
+    LOCK_FILE: Final[str] = "jobs.lock"
+    TRAINING_LOCK_FILE: Final[str] = "training.lock"
+    OWNERS_DIR: Final[str] = "owners"
+    POLL_INTERVAL: Final[float] = 0.5  # seconds between checks of a job of another worker being waited for
+
+    def __init__(
+        self,
+        load_data: Callable[[], pd.DataFrame],
+        save_model: Callable[[Any, dict[str, Any], set[str] | None], str],
+        directory: str,
+        history_size: int = 100,
+    ) -> None:
+        self.load_data = load_data
+        self.save_model = save_model
+        self.directory = directory
+        self.history_size = history_size
+        self._jobs: dict[str, TrainingJob] = {}  # queued or running in this process
+        self._queue: queue.Queue[TrainingJob | None] = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker: threading.Thread | None = None
+        self._executor: ProcessPoolExecutor | None = None
+        self._owner_lock = threading.Lock()
+        self._owner: tuple[int, str, TextIO] | None = None  # pid, token and locked file of the process
+        os.makedirs(os.path.join(directory, self.OWNERS_DIR), exist_ok=True)
+
+    def _get_owner_path(self, owner: str) -> str:
+        return os.path.join(self.directory, self.OWNERS_DIR, f"{owner}.lock")
+
+    def _get_owner(self) -> str:
+        """Token of this process, whose owner file stays locked while the process lives.
+
+        Created on first use in every process, as workers forked from the gunicorn master must not share it.
+        """
+        with self._owner_lock:
+            if self._owner is None or self._owner[0] != os.getpid():
+                owner = uuid.uuid4().hex
+                lock_file = open(  # pylint: disable=consider-using-with # kept open while the process lives
+                    self._get_owner_path(owner), "w", encoding="utf-8"
+                )
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                self._owner = (os.getpid(), owner, lock_file)
+            return self._owner[1]
+
+    def _read_jobs(self) -> list[dict[str, Any]]:
+        try:
+            with open(os.path.join(self.directory, self.JOBS_FILE), encoding="utf-8") as f:
+                jobs: list[dict[str, Any]] = json.load(f)
+        except FileNotFoundError:
+            return []
+        for record in jobs:
+            if record["status"] in (JobStatus.QUEUED, JobStatus.RUNNING) and not (
+                "owner" in record and _is_locked(self._get_owner_path(record["owner"]))
+            ):
+                record["status"], record["error"] = JobStatus.FAILED.value, "Worker process exited before the job ended"
+                if "owner" in record:
+                    with suppress(FileNotFoundError):
+                        os.remove(self._get_owner_path(record["owner"]))
+        return jobs
+
+    @contextmanager
+    def _locked_jobs(self) -> Iterator[list[dict[str, Any]]]:
+        """Stored jobs, oldest first, to be changed in place while no other thread or process changes them."""
+        with self._lock, open(os.path.join(self.directory, self.LOCK_FILE), "w", encoding="utf-8") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)  # released when the file is closed
+            jobs = self._read_jobs()
+            yield jobs
+            while len(jobs) > self.history_size:
+                jobs.pop(0)
+            tmp_path = os.path.join(self.directory, f"{self.JOBS_FILE}.{os.getpid()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(jobs, f)
+            os.replace(tmp_path, os.path.join(self.directory, self.JOBS_FILE))
+
+    def _save(self, job: TrainingJob) -> None:
+        with self._locked_jobs() as jobs:
+            for i, record in enumerate(jobs):
+                if record["job_id"] == job.job_id:
+                    jobs[i] = {**record, **job.to_dict()}
+
+    def submit(self, model_used: str, fit: Fit, key: str | None = None) -> dict[str, Any]:
+        """Queues a job fitting the model on all data from `load_data`."""
+        return self.submit_plan(model_used, lambda: TrainingPlan(self.load_data, fit), key)
+
+    def submit_plan(self, model_used: str, plan: Callable[[], TrainingPlan], key: str | None = None) -> dict[str, Any]:
+        """Queues a job whose data and fit are planned by `plan` when it starts (in the worker thread)."""
+        key = key if key is not None else model_used
+        owner = self._get_owner()
+        with self._locked_jobs() as jobs:
+            for record in jobs:
+                if record["status"] == JobStatus.QUEUED and record["key"] == key:
+                    return _public(record)
+
+            job = TrainingJob(model_used, plan, key)
+            jobs.append({**job.to_dict(), "key": key, "owner": owner})
+            self._jobs[job.job_id] = job
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._work, name="training-jobs", daemon=True)
+                self._worker.start()
+            self._queue.put(job)
+        logger.info(f"Queued training job {job.job_id} ({model_used})")
+        return job.to_dict()
+
+    def get(self, job_id: str) -> dict[str, Any] | None:
+        for record in self._read_jobs():
+            if record["job_id"] == job_id:
+                return _public(record)
+        return None
+
+    def wait(self, job_id: str, timeout: float | None = None) -> dict[str, Any] | None:
+        """Blocks until the job has finished (or `timeout` seconds passed) and returns it."""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            job.done.wait(timeout)
+            return self.get(job_id)
+
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while (record := self.get(job_id)) is not None and record["status"] in (JobStatus.QUEUED, JobStatus.RUNNING):
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            time.sleep(self.POLL_INTERVAL)
+        return record
+
+    def shutdown(self) -> None:
+        with self._lock:
+            worker, self._worker = self._worker, None
+        if worker is not None:
+            self._queue.put(None)
+            worker.join()
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+        with self._owner_lock:
+            if self._owner is not None and self._owner[0] == os.getpid():
+                with suppress(FileNotFoundError):
+                    os.remove(self._get_owner_path(self._owner[1]))
+                self._owner[2].close()
+            self._owner = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # spawn: forking a process with running threads (event loop, thread pool) is not safe
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def _work(self) -> None:
+        while (job := self._queue.get()) is not None:
+            training_lock_path = os.path.join(self.directory, self.TRAINING_LOCK_FILE)
+            with open(training_lock_path, "w", encoding="utf-8") as training_lock:
+                fcntl.flock(training_lock, fcntl.LOCK_EX)  # waits for a job of another worker to finish
+                self._run(job)
+
+    @contextmanager
+    def _stage(self, job: TrainingJob, stage: str) -> Iterator[None]:
+        job.stage = stage
+        self._save(job)
+        start = time.perf_counter()
+        yield
+        job.timings[stage] = time.perf_counter() - start
+        TRAINING_SECONDS.labels(stage).observe(job.timings[stage])
+
+    def _run(self, job: TrainingJob) -> None:
+        job.status, job.started_at = JobStatus.RUNNING, _now()
+        try:
+            with self._stage(job, "loading_data"):
+                plan = job.plan()
+                data = plan.load_data()
+                if len(data) == 0 and plan.fallback is not None:
+                    logger.info(f"No new listings for training job {job.job_id}, training on all data")
+                    plan = plan.fallback
+                    data = plan.load_data()
+            with self._stage(job, "fitting"):
+                model, result = self._get_executor().submit(plan.fit, data).result()
+            result = {**result, "model_params": get_model_params(model)}
+            with self._stage(job, "saving"):
+                metadata = {
+                    "job_id": job.job_id,
+                    "model_used": result["model_used"],
+                    "model_params": result["model_params"],
+                    "metrics": {
+                        key: value for key, value in result.items() if key not in ("model_used", "model_params")
+                    },
+                    "timings": dict(job.timings),
+                    "data": data_snapshot(data),
+                    "training": plan.training,
+                }
+                result["model_version"] = self.save_model(model, metadata, plan.get_training_ids(data))
+
+            job.status, job.stage, job.result = JobStatus.SUCCEEDED, None, result
+            logger.info(f"Training job {job.job_id} finished in {sum(job.timings.values()):.1f}s")
+        except Exception as ex:
+            if isinstance(ex, BrokenProcessPool):
+                self._executor = None
+            logger.exception(f"Training job {job.job_id} failed")
+            job.status, job.error = JobStatus.FAILED, str(ex)
+        finally:
+            job.finished_at = _now()
+            self._save(job)
+            job.done.set()
+            self._jobs.pop(job.job_id, None)
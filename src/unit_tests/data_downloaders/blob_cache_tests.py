@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+
+from loguru import logger
+
+from data_downloaders.blob_cache import BlobCache
+
+
+class BlobCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        logger.remove()
+        self.tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.cache = BlobCache(self.tmp_dir.name, max_bytes=10)
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def _add(self, blob_name: str, etag: str, content: bytes = b"offers", cache: BlobCache | None = None) -> str:
+        cache = cache or self.cache
+        temp_path = cache.get_temp_path(blob_name)
+        with open(temp_path, "wb") as f:
+            f.write(content)
+        return cache.commit(blob_name, etag, temp_path)
+
+    def test_blobs_are_cached_by_etag(self) -> None:
+        path = self._add("a.ndjson", "etag-1")
+
+        self.assertEqual(self.cache.get("a.ndjson", "etag-1"), path)
+        self.assertIsNone(self.cache.get("a.ndjson", "etag-2"))
+        self.assertIsNone(self.cache.get("b.ndjson", "etag-1"))
+        os.remove(path)
+        self.assertIsNone(self.cache.get("a.ndjson", "etag-1"))
+
+    def test_least_recently_used_blobs_are_evicted(self) -> None:
+        first = self._add("a.ndjson", "etag")
+        second = self._add("b.ndjson", "etag")
+        self.cache.get("a.ndjson", "etag")
+
+        self.cache.prune({"a.ndjson", "b.ndjson"})
+
+        self.assertTrue(os.path.exists(first))
+        self.assertFalse(os.path.exists(second))
+        self.assertIsNone(self.cache.get("b.ndjson", "etag"))
+
+    def test_prune_removes_deleted_blobs(self) -> None:
+        path = self._add("a.ndjson", "etag", b"a")
+
+        self.cache.prune(set())
+
+        self.assertFalse(os.path.exists(path))
+        self.assertIsNone(self.cache.get("a.ndjson", "etag"))
+
+    def test_manifest_is_shared_by_processes(self) -> None:
+        other_worker = BlobCache(self.tmp_dir.name, max_bytes=10)
+        path = self._add("a.ndjson", "etag", b"a")
+        self.assertEqual(other_worker.get("a.ndjson", "etag"), path)
+
+        other_path = self._add("b.ndjson", "etag", b"b", BlobCache(self.tmp_dir.name, max_bytes=10))
+        other_worker.prune({"a.ndjson", "b.ndjson"})
+
+        self.assertEqual(self.cache.get("a.ndjson", "etag"), path)
+        self.assertEqual(self.cache.get("b.ndjson", "etag"), other_path)
+
+    def test_nothing_is_removed_while_cache_is_read(self) -> None:
+        path = self._add("a.ndjson", "etag")
+
+        with BlobCache(self.tmp_dir.name, max_bytes=10).reading():
+            self.cache.prune(set())
+            self.assertTrue(os.path.exists(path))
+
+        self.cache.prune(set())
+        self.assertFalse(os.path.exists(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import json
+import unittest
+from typing import Any
+
+from data_loaders import BlockBlobWriter
+
+
+class FakeBlobClient:
+    blob_name = "crawl.ndjson"
+
+    def __init__(self) -> None:
+        self.blocks: dict[str, bytes] = {}
+        self.committed: list[list[bytes]] = []
+
+    def stage_block(self, block_id: str, data: bytes) -> None:
+        self.blocks[block_id] = data
+
+    def commit_block_list(self, blocks: list[Any]) -> None:
+        self.committed.append([self.blocks[block.id] for block in blocks])
+
+
+class BlockBlobWriterTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.blob_client = FakeBlobClient()
+
+    def test_offers_are_committed_on_close(self) -> None:
+        with BlockBlobWriter(self.blob_client, block_size=30) as writer:  # type: ignore[arg-type]
+            for i in range(3):
+                writer.write({"id": str(i), "title": "Mieszkanie"})
+
+        self.assertEqual(writer.offers_written, 3)
+        lines = b"".join(self.blob_client.committed[-1]).decode().splitlines()
+        self.assertEqual([json.loads(line)["id"] for line in lines], ["0", "1", "2"])
+
+    def test_blob_is_not_created_without_offers(self) -> None:
+        with BlockBlobWriter(self.blob_client) as writer:  # type: ignore[arg-type]
+            pass
+
+        self.assertEqual(writer.offers_written, 0)
+        self.assertEqual(self.blob_client.committed, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
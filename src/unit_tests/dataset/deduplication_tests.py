@@ -0,0 +1,55 @@
+import tempfile
+import unittest
+
+from dataset import normalize_listings
+from dataset.deduplication import Deduplicator
+
+
+class DeduplicatorTests(unittest.TestCase):
+    CRAWLS = {
+        "2023-09-12": [
+            {"id": "TY1", "date": "2023-09-10", "full_price": "110"},
+            {"id": "ogl-1", "full_price": "210"},
+        ],
+        "2023-09-10": [
+            {"id": "TY1", "date": "2023-09-10", "full_price": "100"},
+            {"id": "TY2", "date": "2023-09-09", "full_price": "300"},
+            {"id": "ogl-1", "full_price": "200"},
+            {"full_price": "999"},
+        ],
+        "2023-09-11": [
+            {"id": "TY2", "date": "2023-09-11", "full_price": "310"},
+        ],
+    }
+    EXPECTED = {"TY1": 110.0, "TY2": 310.0, "ogl-1": 210.0}
+
+    def _deduplicate(self, deduplicator: Deduplicator) -> dict[str, float]:
+        for crawl, offers in self.CRAWLS.items():  # added out of chronological order
+            deduplicator.add(crawl, normalize_listings(offers))
+        table = deduplicator.finish()
+        self.assertIsNotNone(table)
+        return dict(zip(table["id"].to_pylist(), table["full_price"].to_pylist()))  # type: ignore[index]
+
+    def test_keeps_newest_offer_in_memory(self) -> None:
+        self.assertEqual(self._deduplicate(Deduplicator(compact_rows=2)), self.EXPECTED)
+
+    def test_keeps_newest_offer_with_spilling(self) -> None:
+        with tempfile.TemporaryDirectory() as spill_dir:
+            self.assertEqual(self._deduplicate(Deduplicator(spill_dir, partitions=3)), self.EXPECTED)
+
+    def test_keeps_crawl_of_offers(self) -> None:
+        deduplicator = Deduplicator()
+        for crawl, offers in self.CRAWLS.items():
+            deduplicator.add(crawl, normalize_listings(offers))
+        table = deduplicator.finish(crawl_column="crawl")
+
+        self.assertIsNotNone(table)
+        crawls = dict(zip(table["id"].to_pylist(), table["crawl"].to_pylist()))  # type: ignore[index]
+        self.assertEqual(crawls, {"TY1": "2023-09-12", "TY2": "2023-09-11", "ogl-1": "2023-09-12"})
+
+    def test_nothing_added(self) -> None:
+        self.assertIsNone(Deduplicator().finish())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import datetime
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from dataset import LISTING_SCHEMA, ListingsWriter, normalize_listings, read_listings
+from dataset.convert import write_parquet
+
+OFFERS = [{"id": str(i), "date": "2023-09-10", "full_price": str(100_000 + i), "area": "50.5"} for i in range(5)]
+
+
+class ListingsWriterTests(unittest.TestCase):
+    def test_offers_are_written_in_batches(self) -> None:
+        sink = io.BytesIO()
+
+        with ListingsWriter(sink, batch_size=2) as writer:
+            for offer in OFFERS:
+                writer.write(offer)
+
+        self.assertEqual(writer.rows, len(OFFERS))
+        self.assertEqual(pq.ParquetFile(io.BytesIO(sink.getvalue())).num_row_groups, 3)
+        table = read_listings(io.BytesIO(sink.getvalue()))
+        self.assertEqual(table.column("id").to_pylist(), [offer["id"] for offer in OFFERS])
+        self.assertEqual(table.column("full_price").to_pylist(), [100_000.0 + i for i in range(5)])
+
+
+class NormalizeListingsTests(unittest.TestCase):
+    def test_values_are_typed(self) -> None:
+        table = normalize_listings(
+            [
+                {
+                    "id": "1",
+                    "date": "2023-09-10",
+                    "full_price": "350000.5",
+                    "area": "48.2",
+                    "rooms": "2",
+                    "floor": "0",
+                    "year": "1985",
+                    "category": "flat",
+                    "source": "tyszkiewicz",
+                    "address": "Gdańsk",
+                    "title": "not stored",
+                }
+            ]
+        )
+
+        self.assertEqual(table.schema, LISTING_SCHEMA)
+        row = table.to_pylist()[0]
+        self.assertEqual(row["date"], datetime.date(2023, 9, 10))
+        self.assertEqual((row["full_price"], row["rooms"], row["floor"], row["year"]), (350000.5, 2, 0, 1985))
+        self.assertAlmostEqual(row["area"], 48.2, places=5)
+        self.assertEqual((row["category"], row["source"], row["address"]), ("flat", "tyszkiewicz", "Gdańsk"))
+
+    def test_invalid_values_become_nulls(self) -> None:
+        table = normalize_listings(
+            [
+                {"id": "1", "date": "10.09.2023", "full_price": "n/a", "rooms": "2.5", "floor": "40000"},
+                {"id": "2", "year": "1985"},
+            ]
+        )
+
+        rows = table.to_pylist()
+        for column in ("date", "full_price", "rooms", "floor", "area", "category"):
+            self.assertIsNone(rows[0][column], column)
+        self.assertEqual((rows[1]["year"], rows[1]["full_price"]), (1985, None))
+
+    def test_empty_crawl(self) -> None:
+        self.assertEqual(normalize_listings([]).num_rows, 0)
+
+
+class ConvertTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def _convert(self, blob_name: str, content: str) -> pa.Table:
+        path = os.path.join(self.tmp_dir.name, blob_name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+        parquet_path, rows = write_parquet(blob_name, path)
+        try:
+            self.assertEqual(rows, len(OFFERS))
+            return read_listings(parquet_path)
+        finally:
+            os.remove(parquet_path)
+
+    def test_streamed_crawls_are_converted(self) -> None:
+        table = self._convert("crawl.ndjson", "".join(json.dumps(offer) + "\n" for offer in OFFERS))
+
+        self.assertEqual(table.column("id").to_pylist(), [offer["id"] for offer in OFFERS])
+
+    def test_json_crawls_are_converted(self) -> None:
+        table = self._convert("crawl.json", json.dumps(OFFERS))
+
+        self.assertEqual(table.column("id").to_pylist(), [offer["id"] for offer in OFFERS])
+        self.assertEqual(table.column("date").to_pylist(), [datetime.date(2023, 9, 10)] * len(OFFERS))
+
+
+if __name__ == "__main__":
+    unittest.main()
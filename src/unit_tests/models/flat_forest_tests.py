@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.neighbors import KNeighborsRegressor
+
+from models.flat_forest import FLAT_MAX_ROWS, CompiledForest, FlatForest, compile_model
+
+
+class FlatForestTests(unittest.TestCase):
+    x: np.ndarray
+    x_test: np.ndarray
+    forest: RandomForestRegressor
+    flat_forest: FlatForest
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        rng = np.random.default_rng(0)
+        cls.x = np.column_stack(
+            [
+                rng.uniform(20, 150, 2000),
+                rng.integers(1, 6, 2000),
+                rng.integers(0, 15, 2000),
+                rng.integers(1900, 2024, 2000),
+            ]
+        )
+        y = cls.x[:, 0] * 10_000 + rng.normal(0, 50_000, 2000)
+        cls.forest = RandomForestRegressor(n_estimators=20, random_state=0).fit(cls.x, y)
+        cls.flat_forest = FlatForest.from_forest(cls.forest)
+        cls.x_test = cls.x[:500] + rng.normal(0, 3, (500, 4))
+
+    def test_predictions_are_bit_identical(self) -> None:
+        for rows in (1, 7, 500):
+            with self.subTest(rows=rows):
+                x = self.x_test[:rows]
+                np.testing.assert_array_equal(self.flat_forest.predict(x), self.forest.predict(x))
+
+    def test_apply_matches_sklearn_leaves(self) -> None:
+        offsets = self.flat_forest.roots
+        np.testing.assert_array_equal(
+            self.flat_forest.apply(self.x_test.astype(np.float32)) - offsets, self.forest.apply(self.x_test)
+        )
+
+    def test_memory_mapped_artifact(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "compiled.joblib")
+            joblib.dump(self.flat_forest, path)
+            loaded = joblib.load(path, mmap_mode="r")
+            np.testing.assert_array_equal(loaded.predict(self.x_test), self.forest.predict(self.x_test))
+
+    def test_invalid_input(self) -> None:
+        self.assertRaises(ValueError, self.flat_forest.predict, self.x_test[:, :3])
+        self.assertRaises(ValueError, self.flat_forest.predict, np.array([[np.nan, 1, 1, 2000]]))
+
+    def test_compiled_forest(self) -> None:
+        flat_forest = compile_model(self.forest)
+        assert flat_forest is not None
+        compiled = CompiledForest(self.forest, flat_forest)
+        x = np.tile(self.x_test, (2, 1))[: FLAT_MAX_ROWS + 1]
+        np.testing.assert_array_equal(compiled.predict(x), self.forest.predict(x))
+        np.testing.assert_array_equal(compiled.predict(x[:1]), self.forest.predict(x[:1]))
+        self.assertIsNone(compile_model(KNeighborsRegressor().fit(self.x, self.x[:, 0])))
+
+
+if __name__ == "__main__":
+    unittest.main()
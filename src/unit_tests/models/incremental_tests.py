@@ -0,0 +1,70 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KNeighborsRegressor
+
+from enums import ModelEnum
+from models import get_trained_model
+from models.incremental import supports_update, update_model
+
+
+def create_data(count: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    area = rng.uniform(20, 150, count)
+    return pd.DataFrame(
+        {
+            "area": area,
+            "rooms": rng.integers(1, 6, count),
+            "floor": rng.integers(0, 10, count),
+            "year": rng.integers(1900, 2024, count),
+            "full_price": area * 10_000 + rng.normal(0, 50_000, count),
+        }
+    )
+
+
+class UpdateModelTests(unittest.TestCase):
+    def test_forest_gets_trees_for_new_rows(self) -> None:
+        model, _ = get_trained_model(ModelEnum.RANDOM_FOREST, create_data(400, 0))
+        trees = len(model.model.estimators_)
+
+        updated, r2_new = update_model(model, create_data(100, 1))
+
+        self.assertEqual(len(updated.model.estimators_), trees + trees // 4)
+        self.assertEqual(updated.n_samples, 500)
+        self.assertFalse(updated.model.warm_start)
+        self.assertGreater(r2_new, 0.5)
+
+    def test_knn_appends_new_rows_to_index(self) -> None:
+        old, new = create_data(300, 0), create_data(50, 1)
+        model, _ = get_trained_model(ModelEnum.KNN, old)
+
+        updated, _ = update_model(model, new)
+
+        refitted = KNeighborsRegressor().fit(*model.preprocessor.clean(pd.concat([old, new])))
+        rows = create_data(20, 2).drop(columns="full_price").to_numpy()
+        self.assertEqual(updated.model.n_samples_fit_, 350)
+        np.testing.assert_allclose(updated.predict(rows), refitted.predict(model.preprocessor.transform(rows)))
+
+    def test_scaled_knn_keeps_scaler(self) -> None:
+        model, _ = get_trained_model(ModelEnum.SCALED_KNN, create_data(300, 0))
+        mean = model.model["scaler"].mean_.copy()
+
+        updated, _ = update_model(model, create_data(50, 1))
+
+        np.testing.assert_array_equal(updated.model["scaler"].mean_, mean)
+        self.assertEqual(updated.model["knn"].n_samples_fit_, 350)
+        self.assertEqual(updated.model["knn"]._fit_method, "kd_tree")  # pylint: disable=protected-access
+
+    def test_rejects_models_without_preprocessing(self) -> None:
+        model, _ = get_trained_model(ModelEnum.RANDOM_FOREST, create_data(50, 0))
+
+        self.assertFalse(supports_update(model.model))
+        with self.assertRaises(ValueError):
+            update_model(model.model, create_data(10, 1))
+        with self.assertRaises(ValueError):
+            update_model(model, create_data(10, 1).assign(area="unknown"))
+
+
+if __name__ == "__main__":
+    unittest.main()
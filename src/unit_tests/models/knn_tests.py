@@ -0,0 +1,42 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+from enums import ModelEnum
+from models.registry import ModelRegistry
+from models.serialization import ArtifactFormat
+
+
+class ScaledKnnTests(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(0)
+        self.x = np.column_stack([rng.uniform(20, 150, 500), rng.integers(1, 6, 500), rng.integers(1900, 2024, 500)])
+        self.y = self.x[:, 0] * 10_000 + rng.normal(0, 50_000, 500)
+
+    def test_index_is_built_on_fit(self) -> None:
+        model = ModelEnum.SCALED_KNN.create().fit(self.x, self.y)
+
+        self.assertEqual(model["knn"]._fit_method, "kd_tree")  # pylint: disable=protected-access
+        self.assertEqual(model.predict(self.x[:10]).shape, (10,))
+
+    def test_predictions_do_not_depend_on_feature_units(self) -> None:
+        x_cm = self.x * [100, 1, 1]  # area in a different unit
+
+        predictions = ModelEnum.SCALED_KNN.create().fit(self.x, self.y).predict(self.x[:50])
+        predictions_cm = ModelEnum.SCALED_KNN.create().fit(x_cm, self.y).predict(x_cm[:50])
+
+        np.testing.assert_allclose(predictions, predictions_cm)
+
+    def test_index_is_stored_with_the_model(self) -> None:
+        model = ModelEnum.SCALED_KNN.create().fit(self.x, self.y)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            registry = ModelRegistry(tmp_dir, ArtifactFormat.JOBLIB)
+            loaded = registry.load_model(registry.register(model, {"model_used": "SCALED_KNN"})["version"])
+
+            self.assertIsNotNone(loaded["knn"]._tree)  # pylint: disable=protected-access
+            np.testing.assert_array_equal(loaded.predict(self.x[:20]), model.predict(self.x[:20]))
+
+
+if __name__ == "__main__":
+    unittest.main()
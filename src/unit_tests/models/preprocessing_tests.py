@@ -0,0 +1,126 @@
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+from enums import ModelEnum
+from models import get_trained_model
+from models.flat_forest import CompiledForest
+from models.preprocessing import FeaturePreprocessor, InvalidFeaturesError, PreprocessedModel
+from models.registry import ModelRegistry
+from models.serialization import ArtifactFormat
+from serving.model_cache import RegistryModelCache
+
+
+def create_listings(count: int) -> list[dict]:
+    rng = np.random.default_rng(0)
+    return [
+        {
+            "area": str(round(rng.uniform(20, 150), 2)),
+            "rooms": str(rng.integers(1, 6)),
+            "floor": str(rng.integers(0, 10)),
+            "year": str(rng.integers(1900, 2024)),
+            "full_price": str(round(rng.uniform(200_000, 1_500_000))),
+        }
+        for _ in range(count)
+    ]
+
+
+class FeaturePreprocessorTests(unittest.TestCase):
+    def test_parses_typed_features(self) -> None:
+        listings = create_listings(10)
+
+        x, y = FeaturePreprocessor().fit_transform(listings)
+
+        self.assertEqual(x.dtype, np.float32)
+        self.assertEqual(y.dtype, np.float64)
+        self.assertEqual(x.shape, (10, 4))
+        np.testing.assert_array_equal(x[:, 1], [int(listing["rooms"]) for listing in listings])
+
+    def test_drops_rows_invalid_after_parsing(self) -> None:
+        listings = create_listings(10)
+        listings[0]["area"] = "unknown"  # could not be parsed, used to reach fit as NaN
+        listings[1]["rooms"] = None
+        listings[2]["floor"] = "2.5"
+        listings[3]["year"] = "40000"  # does not fit int16
+        listings[4]["rooms"] = "0"
+        listings[5]["full_price"] = "-1"
+        del listings[6]["area"]
+
+        x, y = FeaturePreprocessor().fit_transform(listings)
+
+        self.assertEqual(len(x), 3)
+        self.assertEqual(len(y), 3)
+        self.assertTrue(np.isfinite(x).all())
+
+    def test_drops_outliers(self) -> None:
+        listings = create_listings(2_000)
+        listings[0]["area"] = "5000"
+
+        preprocessor = FeaturePreprocessor()
+        x, _ = preprocessor.fit_transform(listings)
+
+        self.assertLess(x[:, 0].max(), 150)
+        self.assertGreater(len(x), 1_950)
+        self.assertEqual(len(FeaturePreprocessor(outlier_quantile=0).fit_transform(listings)[0]), 2_000)
+
+    def test_keeps_extremes_of_small_datasets(self) -> None:
+        x, _ = FeaturePreprocessor().fit_transform(create_listings(6))
+
+        self.assertEqual(len(x), 6)
+
+    def test_accepts_dataframes(self) -> None:
+        listings = create_listings(20)
+        df = pd.DataFrame(listings).astype({"area": "float32", "rooms": "Int16", "full_price": "float64"})
+        df.loc[0, "rooms"] = pd.NA
+
+        x, y = FeaturePreprocessor().fit_transform(df)
+        expected_x, expected_y = FeaturePreprocessor().fit_transform(listings[1:])
+
+        np.testing.assert_array_equal(x, expected_x)
+        np.testing.assert_array_equal(y, expected_y)
+
+    def test_transform_matches_training(self) -> None:
+        listings = create_listings(10)
+        preprocessor = FeaturePreprocessor()
+        x, _ = preprocessor.fit_transform(listings)
+
+        rows = [[float(listing[name]) for name in ("area", "rooms", "floor", "year")] for listing in listings]
+
+        np.testing.assert_array_equal(preprocessor.transform(rows), x)
+
+    def test_transform_rejects_invalid_listings(self) -> None:
+        preprocessor = FeaturePreprocessor()
+
+        with self.assertRaises(InvalidFeaturesError):
+            preprocessor.transform([[50.0, 2, 1, 40_000]])
+        with self.assertRaises(InvalidFeaturesError):
+            preprocessor.transform([[50.0, 2, 1]])
+
+
+class PreprocessedModelTests(unittest.TestCase):
+    def test_trained_model_predicts_raw_listings(self) -> None:
+        model, _ = get_trained_model(ModelEnum.RANDOM_FOREST, create_listings(50))
+
+        self.assertIsInstance(model, PreprocessedModel)
+        self.assertIsInstance(model.model, RandomForestRegressor)
+        self.assertEqual(model.get_params(), model.model.get_params())
+        self.assertEqual(model.predict([(50.0, 2.0, 1.0, 2000.0)]).shape, (1,))
+
+    def test_cache_serves_compiled_forest_with_preprocessor(self) -> None:
+        model, _ = get_trained_model(ModelEnum.RANDOM_FOREST, create_listings(50))
+        rows = np.array([[50.0, 2, 1, 2000], [120.5, 4, 0, 1950]])
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = RegistryModelCache(ModelRegistry(tmp_dir, ArtifactFormat.JOBLIB), compiled=True)
+            served, _ = cache.get(cache.save(model, {"model_used": "RANDOM_FOREST"}))
+
+        self.assertIsInstance(served, PreprocessedModel)
+        self.assertIsInstance(served.model, CompiledForest)
+        np.testing.assert_allclose(served.predict(rows), model.predict(rows))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+from models.registry import ModelRegistry, data_snapshot
+from models.serialization import ArtifactFormat
+
+
+class ModelRegistryTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.registry = ModelRegistry(self.tmp_dir.name)
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_register_stores_artifact_with_metadata(self) -> None:
+        metadata = self.registry.register({"model": 1}, {"model_used": "KNN", "metrics": {"r2_score_train": 0.5}})
+
+        version = metadata["version"]
+        self.assertEqual(self.registry.get_metadata(version), metadata)
+        self.assertEqual(metadata["metrics"], {"r2_score_train": 0.5})
+        self.assertEqual(metadata["size_bytes"], os.path.getsize(self.registry.get_model_path(version)))
+        self.assertIsNone(self.registry.active_version)
+
+    def test_register_same_model_twice(self) -> None:
+        first = self.registry.register({"model": 1}, {})
+        self.assertEqual(self.registry.register({"model": 1}, {}), first)
+        self.assertEqual(len(self.registry.list_metadata()), 1)
+
+    def test_activate_and_roll_back(self) -> None:
+        first = self.registry.register({"model": 1}, {})["version"]
+        second = self.registry.register({"model": 2}, {})["version"]
+
+        self.registry.activate(second)
+        self.assertEqual(self.registry.active_version, second)
+        self.registry.activate(first)
+        self.assertEqual(self.registry.active_version, first)
+        self.assertEqual([metadata["version"] for metadata in self.registry.list_metadata()], [first, second])
+
+    def test_unknown_versions(self) -> None:
+        for version in ("0" * 32, "../..", self.tmp_dir.name):
+            with self.subTest(version=version):
+                self.assertRaises(FileNotFoundError, self.registry.activate, version)
+                self.assertRaises(FileNotFoundError, self.registry.get_model_path, version)
+
+    def test_joblib_artifacts(self) -> None:
+        model = {"weights": np.arange(1000, dtype=np.float64)}
+        for compression in ("0", "3", "zlib:3"):
+            with self.subTest(compression=compression):
+                self.registry.compression = compression
+                self.registry.artifact_format = ArtifactFormat.JOBLIB
+                version = self.registry.register(model, {})["version"]
+
+                loaded = self.registry.load_model(version)
+                np.testing.assert_array_equal(loaded["weights"], model["weights"])
+                self.assertEqual(isinstance(loaded["weights"], np.memmap), compression == "0")
+                self.assertTrue(self.registry.get_model_path(version).endswith("model.joblib"))
+
+    def test_register_file_keeps_pickle(self) -> None:
+        version = self.registry.register({"model": 1}, {})["version"]
+        self.registry.artifact_format = ArtifactFormat.JOBLIB
+
+        metadata = self.registry.register_file(self.registry.get_model_path(version), {"source": "dvc"})
+        self.assertEqual(metadata["version"], version)
+        self.assertEqual(self.registry.load_model(version), {"model": 1})
+
+    def test_forests_are_exported_flat(self) -> None:
+        x = np.arange(40, dtype=np.float64).reshape(10, 4)
+        forest = RandomForestRegressor(n_estimators=3, random_state=0).fit(x, x[:, 0])
+
+        metadata = self.registry.register(forest, {})
+        flat_forest = self.registry.load_compiled(metadata["version"])
+        self.assertTrue(metadata["compiled"])
+        self.assertIsNotNone(flat_forest)
+        np.testing.assert_array_equal(flat_forest.predict(x), forest.predict(x))  # type: ignore[union-attr]
+        self.assertIsNone(self.registry.load_compiled(self.registry.register({"model": 1}, {})["version"]))
+
+    def test_training_ids(self) -> None:
+        version = self.registry.register({"model": 1}, {}, ["b", "a"])["version"]
+
+        self.assertEqual(self.registry.get_training_ids(version), {"a", "b"})
+        self.assertIsNone(self.registry.get_training_ids(self.registry.register({"model": 2}, {})["version"]))
+
+    def test_data_snapshot(self) -> None:
+        data = pd.DataFrame({"id": ["a", "b"], "date": ["2023-09-10", None], "full_price": [1.0, 2.0]})
+
+        snapshot = data_snapshot(data)
+        self.assertEqual(snapshot["rows"], 2)
+        self.assertEqual(snapshot["newest_date"], "2023-09-10")
+        self.assertEqual(snapshot, json.loads(json.dumps(snapshot)))
+        self.assertNotEqual(snapshot["sha256"], data_snapshot(data.assign(full_price=[1.0, 3.0]))["sha256"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from models.search import search_models, validate_param_grids
+
+
+class SearchModelsTests(unittest.TestCase):
+    rng = np.random.default_rng(0)
+    DATA = pd.DataFrame(
+        {
+            "area": rng.uniform(20, 120, 60),
+            "rooms": rng.integers(1, 5, 60),
+            "floor": rng.integers(0, 10, 60),
+            "year": rng.integers(1950, 2023, 60),
+        }
+    ).assign(full_price=lambda df: df["area"] * 10_000)
+
+    def test_leaderboard_is_ranked_and_best_model_refitted(self) -> None:
+        param_grids = {"KNN": {"n_neighbors": [1, 20]}, "RANDOM_FOREST": {"n_estimators": [5], "max_depth": [1]}}
+        model, result = search_models(self.DATA, param_grids, cv=3, n_jobs=1)
+
+        leaderboard = result["leaderboard"]
+        self.assertEqual([entry["rank"] for entry in leaderboard], [1, 2, 3])
+        scores = [entry["cv_r2_mean"] for entry in leaderboard]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertTrue(all(entry["fit_time"] >= 0 and entry["predict_time"] >= 0 for entry in leaderboard))
+
+        best = leaderboard[0]
+        self.assertEqual(result["model_used"], best["model_used"])
+        self.assertEqual(result["cv_r2"], best["cv_r2_mean"])
+        self.assertEqual({key: model.get_params()[key] for key in best["params"]}, best["params"])
+
+    def test_invalid_grids(self) -> None:
+        for param_grids in ({}, {"SVM": {"C": [1]}}, {"KNN": {"bogus": [1]}}, {"KNN": {"n_neighbors": []}}):
+            with self.subTest(param_grids=param_grids):
+                self.assertRaises(ValueError, validate_param_grids, param_grids)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import asyncio
+import unittest
+
+from loguru import logger
+from prometheus_client import REGISTRY
+
+from benchmarks.synthetic_pages import tyszkiewicz_page
+from monitoring import enable_spans, render_metrics, span
+from scraper.engine import ParserBackend, ParseStage
+from scraper.tyszkiewicz import Tyszkiewicz
+
+
+def get_sample(name: str, **labels: str) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class SpanTests(unittest.TestCase):
+    def tearDown(self) -> None:
+        enable_spans(False)
+
+    def test_disabled_spans_record_nothing(self) -> None:
+        before = get_sample("span_seconds_count", span="test.disabled")
+
+        with span("test.disabled"):
+            pass
+
+        self.assertEqual(get_sample("span_seconds_count", span="test.disabled"), before)
+
+    def test_enabled_spans_are_timed(self) -> None:
+        enable_spans()
+        before = get_sample("span_seconds_count", span="test.enabled")
+
+        with span("test.enabled"):
+            pass
+
+        self.assertEqual(get_sample("span_seconds_count", span="test.enabled"), before + 1)
+
+
+class MetricsTests(unittest.TestCase):
+    def test_parsed_pages_are_measured(self) -> None:
+        logger.remove()
+        labels = {"scraper": Tyszkiewicz.__name__}
+        pages_before = get_sample("scraper_parse_seconds_count", **labels)
+        offers_before = get_sample("scraper_offers_per_page_sum", **labels)
+
+        async def parse() -> list[dict]:
+            parse_stage = ParseStage(0, 1, ParserBackend.LXML)
+            try:
+                return await parse_stage.parse(Tyszkiewicz, tyszkiewicz_page(5))
+            finally:
+                parse_stage.close()
+
+        self.assertEqual(len(asyncio.run(parse())), 5)
+        self.assertEqual(get_sample("scraper_parse_seconds_count", **labels), pages_before + 1)
+        self.assertEqual(get_sample("scraper_offers_per_page_sum", **labels), offers_before + 5)
+
+    def test_metrics_are_rendered_in_text_format(self) -> None:
+        body, content_type = render_metrics()
+
+        self.assertTrue(content_type.startswith("text/plain"))
+        for name in ("predict_latency_seconds", "scraper_fetch_latency_seconds", "training_duration_seconds"):
+            self.assertIn(f"# TYPE {name} histogram", body.decode())
+        self.assertIn("# HELP scraper_too_many_requests_total", body.decode())
+
+
+if __name__ == "__main__":
+    unittest.main()
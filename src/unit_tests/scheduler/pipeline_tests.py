@@ -0,0 +1,129 @@
+import tempfile
+import threading
+import unittest
+from typing import Any
+
+from scheduler import Pipeline, PipelineRunningError, Stage, StageStatus
+
+
+class PipelineTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.calls: list[str] = []
+        self.crawled = {"offers": 10}
+        self.etags = {"crawl-1": "etag-1"}
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def _create_pipeline(self, **stages: Any) -> Pipeline:
+        def record(name: str, output: Any) -> Any:
+            def run(inputs: dict[str, Any]) -> Any:
+                self.calls.append(name)
+                return output(inputs) if callable(output) else output
+
+            return run
+
+        def upload(inputs: dict[str, Any]) -> Any:
+            blob = f"crawl-{inputs['crawl']['offers']}"
+            self.etags[blob] = "etag"
+            return {"blob": blob}
+
+        return Pipeline(
+            [
+                Stage("crawl", record("crawl", stages.get("crawl", lambda _: dict(self.crawled)))),
+                Stage(
+                    "upload",
+                    record("upload", stages.get("upload", upload)),
+                    ("crawl",),
+                    on_skip=lambda inputs: self.calls.append(f"skipped upload of {inputs['crawl']['offers']}"),
+                ),
+                Stage("sync", record("sync", lambda _: dict(self.etags)), ("upload",), fingerprint=lambda: self.etags),
+                Stage("train", record("train", stages.get("train", {"model_version": "v1"})), ("sync",)),
+            ],
+            self.tmp_dir.name,
+        )
+
+    def test_runs_stages_in_dependency_order(self) -> None:
+        run = self._create_pipeline().run()
+
+        self.assertEqual(self.calls, ["crawl", "upload", "sync", "train"])
+        self.assertEqual(run["status"], StageStatus.SUCCEEDED)
+        self.assertEqual(list(run["stages"]), ["crawl", "upload", "sync", "train"])
+        for stage_run in run["stages"].values():
+            self.assertEqual(stage_run["status"], StageStatus.SUCCEEDED)
+            self.assertGreaterEqual(stage_run["seconds"], 0)
+
+    def test_skips_stages_with_unchanged_inputs(self) -> None:
+        self._create_pipeline().run()
+        self.calls.clear()
+
+        run = self._create_pipeline().run()  # a new instance, e.g. after a restart
+
+        self.assertEqual(self.calls, ["crawl", "skipped upload of 10"])
+        statuses = [stage_run["status"] for stage_run in run["stages"].values()]
+        self.assertEqual(statuses, ["succeeded", "skipped", "skipped", "skipped"])
+
+    def test_runs_stages_after_changed_input(self) -> None:
+        pipeline = self._create_pipeline()
+        pipeline.run()
+        self.calls.clear()
+
+        self.etags["crawl-2"] = "etag-2"  # e.g. uploaded by hand
+        pipeline.run()
+        self.assertEqual(self.calls, ["crawl", "skipped upload of 10", "sync", "train"])
+
+        self.calls.clear()
+        self.crawled["offers"] = 11
+        pipeline.run()
+        self.assertEqual(self.calls, ["crawl", "upload", "sync", "train"])
+
+    def test_failed_stage_stops_dependent_stages(self) -> None:
+        def fail(_: dict[str, Any]) -> Any:
+            raise RuntimeError("Storage unavailable")
+
+        run = self._create_pipeline(upload=fail).run()
+
+        self.assertEqual(run["status"], StageStatus.FAILED)
+        self.assertEqual(run["stages"]["upload"]["error"], "Storage unavailable")
+        self.assertEqual(run["stages"]["sync"]["status"], StageStatus.UPSTREAM_FAILED)
+        self.assertEqual(self.calls, ["crawl", "upload"])
+
+        self.calls.clear()
+        self._create_pipeline().run()
+        self.assertEqual(self.calls, ["crawl", "upload", "sync", "train"])  # failed stages are not skipped
+
+    def test_single_flight(self) -> None:
+        training = threading.Event()
+        finish = threading.Event()
+
+        def train(_: dict[str, Any]) -> Any:
+            training.set()
+            finish.wait(timeout=10)
+            return {}
+
+        pipeline = self._create_pipeline(train=train)
+        run_id = pipeline.start()
+        self.assertIsNotNone(run_id)
+        training.wait(timeout=10)
+
+        self.assertTrue(pipeline.running)
+        self.assertTrue(self._create_pipeline().running)  # the lock is visible to other processes
+        self.assertIsNone(pipeline.start())
+        with self.assertRaises(PipelineRunningError):
+            self._create_pipeline().run()
+        self.assertEqual(pipeline.get_runs()[0]["stages"]["train"]["status"], StageStatus.RUNNING)
+
+        finish.set()
+        while pipeline.running:
+            finish.wait(0.01)
+        self.assertEqual(pipeline.get_runs()[0]["run_id"], run_id)
+        self.assertEqual(pipeline.get_runs()[0]["status"], StageStatus.SUCCEEDED)
+
+    def test_unknown_dependency(self) -> None:
+        with self.assertRaises(ValueError):
+            Pipeline([Stage("train", lambda _: None, ("sync",))], self.tmp_dir.name)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,185 @@
+import asyncio
+import os
+import time
+import unittest
+from types import TracebackType
+from typing import Any, Iterator
+
+from loguru import logger
+
+from scraper.engine import (
+    CrawlerEngine,
+    HostLimiter,
+    HostLimits,
+    ParserBackend,
+    ParseStage,
+    TokenBucket,
+    TooManyRequestsError,
+)
+from scraper.tyszkiewicz import Tyszkiewicz
+
+STATE = {"marker": "imported"}  # changed by the tests, which a forked (but not a spawned) worker would inherit
+
+
+class ProcessScraper(Tyszkiewicz):
+    @staticmethod
+    def process_html(self_type: type, html_text: str) -> Iterator[dict]:  # pylint: disable=unused-argument
+        yield {"id": html_text, "pid": os.getpid(), "marker": STATE["marker"]}
+
+
+class FakeResponse:
+    def __init__(self, status: int, body: str = "", headers: dict[str, str] | None = None) -> None:
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+
+    async def __aenter__(self) -> "FakeResponse":
+        return self
+
+    async def __aexit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        pass
+
+    async def read(self) -> bytes:
+        return self.body.encode()
+
+    async def text(self) -> str:
+        return self.body
+
+
+class FakeSession:
+    """Answers requests with the given responses in order, recording when each request was made."""
+
+    def __init__(self, *responses: FakeResponse) -> None:
+        self.responses = list(responses)
+        self.requested_at: list[float] = []
+
+    def get(self, *_: Any, **__: Any) -> FakeResponse:
+        self.requested_at.append(time.monotonic())
+        return self.responses.pop(0)
+
+
+class TokenBucketTests(unittest.TestCase):
+    def test_requests_over_burst_are_paced(self) -> None:
+        bucket = TokenBucket(rate=50, capacity=2)
+
+        async def acquire(times: int) -> list[float]:
+            acquired_at = []
+            for _ in range(times):
+                await bucket.acquire()
+                acquired_at.append(time.monotonic())
+            return acquired_at
+
+        start = time.monotonic()
+        acquired_at = asyncio.run(acquire(5))
+
+        self.assertLess(acquired_at[1] - start, 0.01)  # the burst is not delayed
+        self.assertGreaterEqual(acquired_at[-1] - start, 3 / 50 * 0.9)
+
+
+class HostLimiterTests(unittest.TestCase):
+    def setUp(self) -> None:
+        logger.remove()
+
+    def test_requests_in_flight_are_limited(self) -> None:
+        limiter = HostLimiter("host", HostLimits(concurrency=2, requests_per_second=1000, burst=100))
+        in_flight, max_in_flight = 0, 0
+
+        async def request() -> None:
+            nonlocal in_flight, max_in_flight
+            async with limiter:
+                in_flight += 1
+                max_in_flight = max(max_in_flight, in_flight)
+                await asyncio.sleep(0.01)
+                in_flight -= 1
+
+        async def requests() -> None:
+            await asyncio.gather(*(request() for _ in range(6)))
+
+        asyncio.run(requests())
+
+        self.assertEqual(max_in_flight, 2)
+
+    def test_too_many_requests_pause_the_host(self) -> None:
+        limiter = HostLimiter("host", HostLimits())
+
+        async def enter() -> None:
+            async with limiter:
+                pass
+
+        limiter.on_too_many_requests("0")
+        asyncio.run(asyncio.wait_for(enter(), 1))
+        limiter.on_too_many_requests(None)  # paused for the initial backoff
+        with self.assertRaises(TimeoutError):
+            asyncio.run(asyncio.wait_for(enter(), 0.05))
+
+    def test_backoff_doubles_until_its_limit(self) -> None:
+        limiter = HostLimiter("host", HostLimits())
+
+        for _ in range(4):  # 10, 20, 40 and 80 seconds
+            limiter.on_too_many_requests(None)
+        with self.assertRaises(TooManyRequestsError):
+            limiter.on_too_many_requests(None)
+        limiter.on_success()
+        limiter.on_too_many_requests(None)
+
+
+class FetchTests(unittest.TestCase):
+    def setUp(self) -> None:
+        logger.remove()
+        self.engine = CrawlerEngine(HostLimits(requests_per_second=1000, burst=100), parse_workers=0)
+
+    def _fetch(self, session: FakeSession) -> Any:
+        return asyncio.run(self.engine.fetch(session, "http://host/list", {}))  # type: ignore[arg-type]
+
+    def test_request_is_retried_after_retry_after(self) -> None:
+        session = FakeSession(
+            FakeResponse(429, headers={"Retry-After": "1"}), FakeResponse(200, "page", {"ETag": '"v1"'})
+        )
+
+        page = self._fetch(session)
+
+        self.assertEqual((page.text, page.etag), ("page", '"v1"'))
+        self.assertGreaterEqual(session.requested_at[1] - session.requested_at[0], 0.9)
+        self.assertEqual(self.engine.stats["pages_downloaded"], 1)
+
+    def test_other_errors_are_not_retried(self) -> None:
+        session = FakeSession(FakeResponse(500), FakeResponse(200, "page"))
+
+        with self.assertRaises(RuntimeError):
+            self._fetch(session)
+        self.assertEqual(len(session.requested_at), 1)
+
+
+class ParseStageTests(unittest.TestCase):
+    def setUp(self) -> None:
+        STATE["marker"] = "changed"
+
+    def tearDown(self) -> None:
+        STATE["marker"] = "imported"
+
+    def _parse(self, workers: int, pages: list[str]) -> list[list[dict]]:
+        async def parse() -> list[list[dict]]:
+            parse_stage = ParseStage(workers, 2, ParserBackend.BS4)
+            try:
+                return await asyncio.gather(*(parse_stage.parse(ProcessScraper, page) for page in pages))
+            finally:
+                parse_stage.close()
+
+        return asyncio.run(parse())
+
+    def test_pages_are_parsed_inline_without_workers(self) -> None:
+        self.assertEqual(self._parse(0, ["1"]), [[{"id": "1", "pid": os.getpid(), "marker": "changed"}]])
+
+    def test_pages_are_parsed_in_spawned_workers(self) -> None:
+        parsed = self._parse(1, ["1", "2", "3"])
+
+        self.assertEqual([offers[0]["id"] for offers in parsed], ["1", "2", "3"])
+        for offers in parsed:
+            self.assertNotEqual(offers[0]["pid"], os.getpid())
+            self.assertEqual(offers[0]["marker"], "imported")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+
+from loguru import logger
+
+from benchmarks.synthetic_pages import ogloszenia_trojmiasto_page, tyszkiewicz_page
+from scraper import Scraper
+from scraper.engine import ParserBackend, parse_page
+from scraper.lxml_extractor import get_extractor
+from scraper.ogloszenia_trojmiasto import OgloszeniaTrojmiasto
+from scraper.tyszkiewicz import Tyszkiewicz
+
+
+class LxmlExtractorTests(unittest.TestCase):
+    TYSZKIEWICZ_INCOMPLETE_OFFER = (
+        '<html><body><div class="offer__box bi wow fadeInUp promote-">'
+        '<div class="offer__box--number">NR:TY1</div>'
+        '<div class="offer__box--prices"><div class="offer__box--price">zł</div></div>'
+        '<div class="offer__box--basicOne bi">2 piętro</div><div class="offer__box--basicOne bi">parter</div>'
+        "</div></body></html>"
+    )
+    OGLOSZENIA_INCOMPLETE_OFFER = (
+        '<html><body><div class="list__item list--item--withPrice" id="ogl-1">'
+        '<ul class="list__item__details__icons">'
+        '<li class="list__item__details__icons__element details--icons--element--pietro">'
+        '<p class="list__item__details__icons__element__desc">wysoki</p></li>'
+        "</ul></div></body></html>"
+    )
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        logger.disable("scraper")
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        logger.enable("scraper")
+
+    def assertSameOffers(self, scraper: type[Scraper], html_text: str) -> None:  # pylint: disable=invalid-name
+        expected = parse_page(scraper, html_text, ParserBackend.BS4)
+        self.assertEqual(get_extractor(scraper).process_html(html_text), expected)
+
+    def test_tyszkiewicz_same_offers_as_process_tag(self) -> None:
+        for seed in range(5):
+            self.assertSameOffers(Tyszkiewicz, tyszkiewicz_page(20, seed))
+
+    def test_ogloszenia_trojmiasto_same_offers_as_process_tag(self) -> None:
+        for seed in range(5):
+            self.assertSameOffers(OgloszeniaTrojmiasto, ogloszenia_trojmiasto_page(30, seed))
+
+    def test_incomplete_offers(self) -> None:
+        self.assertSameOffers(Tyszkiewicz, self.TYSZKIEWICZ_INCOMPLETE_OFFER)
+        self.assertSameOffers(OgloszeniaTrojmiasto, self.OGLOSZENIA_INCOMPLETE_OFFER)
+
+    def test_page_without_offers(self) -> None:
+        self.assertEqual(get_extractor(Tyszkiewicz).process_html("<html><body></body></html>"), [])
+        self.assertEqual(get_extractor(OgloszeniaTrojmiasto).process_html(""), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
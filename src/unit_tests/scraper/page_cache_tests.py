@@ -0,0 +1,134 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from loguru import logger
+
+from benchmarks.page_corpus import PageCorpus, serve_corpus
+from benchmarks.synthetic_pages import tyszkiewicz_page
+from scraper.engine import CrawlerEngine, HostLimits
+from scraper.page_cache import CachedPage, PageCache
+from scraper.tyszkiewicz import Tyszkiewicz
+
+
+class PageCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.path = os.path.join(self.tmp_dir.name, "page_cache.json")
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_cache_is_reloaded(self) -> None:
+        page_cache = PageCache(self.path)
+        page_cache.put("http://host/list", {"page": "1", "city": "a"}, CachedPage("abc", ["1", "2"], '"abc"'))
+        page_cache.save()
+
+        reloaded = PageCache(self.path)
+
+        page = reloaded.get("http://host/list", {"city": "a", "page": "1"})
+        self.assertEqual(page, CachedPage("abc", ["1", "2"], '"abc"'))
+        self.assertEqual(
+            CachedPage("abc", [], '"abc"', "date").get_conditional_headers(),
+            {
+                "If-None-Match": '"abc"',
+                "If-Modified-Since": "date",
+            },
+        )
+        self.assertEqual(reloaded.known_offer_ids, {"1", "2"})
+
+    def test_known_offers_are_fixed_during_crawl(self) -> None:
+        page_cache = PageCache()
+        page_cache.put("http://host/list", {}, CachedPage("abc", ["1"]))
+
+        self.assertEqual(page_cache.known_offer_ids, set())
+        page_cache.start_crawl()
+        self.assertEqual(page_cache.known_offer_ids, {"1"})
+
+    def test_corrupted_cache_is_ignored(self) -> None:
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("{")
+
+        self.assertEqual(len(PageCache(self.path)), 0)
+
+
+class ConditionalCrawlTests(unittest.TestCase):
+    def setUp(self) -> None:
+        logger.remove()
+        self.tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.corpus = PageCorpus(self.tmp_dir.name)
+        self.target = Tyszkiewicz.get_crawl_targets()[0]
+        self.corpus.add(Tyszkiewicz, self.target.url, self.target.get_params(1), tyszkiewicz_page(5, 1))
+        self.corpus.add(Tyszkiewicz, self.target.url, self.target.get_params(2), tyszkiewicz_page(5, 2))
+        self.page_cache = PageCache()
+        self.port = 0  # the first crawl picks a port, recrawls reuse it to keep the cached urls
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def crawl(self, stop_at_known_offers: bool = True) -> tuple[list[dict], CrawlerEngine]:
+        engine = CrawlerEngine(
+            HostLimits(requests_per_second=1000, burst=100),
+            parse_workers=0,
+            page_cache=self.page_cache,
+            stop_at_known_offers=stop_at_known_offers,
+        )
+
+        async def crawl(server_url: str) -> list[dict]:
+            return [offer async for offer in engine.crawl_targets(self.corpus.get_targets(server_url))]
+
+        with serve_corpus(self.corpus, self.port) as server_url:
+            self.port = int(server_url.rsplit(":", 1)[1])
+            return asyncio.run(crawl(server_url)), engine
+
+    def test_recrawl_of_unchanged_pages_stops_at_first_page(self) -> None:
+        offers, engine = self.crawl()
+        self.assertEqual(len(offers), 10)
+        self.assertEqual(engine.stats["pages_parsed"], 2)
+
+        offers, engine = self.crawl()
+
+        self.assertEqual(offers, [])
+        self.assertEqual(engine.stats["pages_downloaded"], 0)
+        self.assertEqual(engine.stats["pages_parsed"], 0)
+        self.assertEqual(engine.stats["targets_stopped_early"], 1)
+
+    def test_unchanged_pages_are_not_parsed(self) -> None:
+        self.crawl()
+
+        offers, engine = self.crawl(stop_at_known_offers=False)
+
+        self.assertEqual(offers, [])
+        self.assertEqual(engine.stats["pages_not_modified"], 2)
+        self.assertEqual(engine.stats["pages_parsed"], 0)
+
+    def test_unchanged_content_without_validators_is_not_parsed(self) -> None:
+        self.crawl()
+        url = self.corpus.get_targets(f"http://127.0.0.1:{self.port}")[0][1].url
+        for page in (1, 2):
+            cached = self.page_cache.get(url, self.target.get_params(page))
+            assert cached is not None
+            cached.etag = None
+
+        offers, engine = self.crawl(stop_at_known_offers=False)
+
+        self.assertEqual(offers, [])
+        self.assertEqual(engine.stats["pages_unchanged"], 2)
+        self.assertEqual(engine.stats["pages_parsed"], 0)
+
+    def test_recrawl_yields_new_offers_until_known_ones(self) -> None:
+        self.crawl()
+        new_page = tyszkiewicz_page(5, 3)
+        self.corpus.add(Tyszkiewicz, self.target.url, self.target.get_params(1), new_page)
+
+        offers, engine = self.crawl()
+
+        self.assertEqual(len(offers), 5)
+        self.assertEqual(engine.stats["pages_parsed"], 1)
+        self.assertEqual(engine.stats["pages_not_modified"], 1)
+        self.assertEqual(engine.stats["targets_stopped_early"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
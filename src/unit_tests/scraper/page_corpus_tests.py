@@ -0,0 +1,54 @@
+import asyncio
+import tempfile
+import unittest
+
+from loguru import logger
+
+from benchmarks.page_corpus import PageCorpus, serve_corpus
+from benchmarks.synthetic_pages import tyszkiewicz_page
+from scraper.engine import CrawlerEngine, HostLimits
+from scraper.tyszkiewicz import Tyszkiewicz
+
+
+class PageCorpusTests(unittest.TestCase):
+    def setUp(self) -> None:
+        logger.remove()
+        self.tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.corpus = PageCorpus(self.tmp_dir.name)
+        self.target = Tyszkiewicz.get_crawl_targets()[0]
+        for page in (1, 2):
+            self.corpus.add(Tyszkiewicz, self.target.url, self.target.get_params(page), tyszkiewicz_page(5, page))
+        self.corpus.save()
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_manifest_is_reloaded(self) -> None:
+        corpus = PageCorpus(self.tmp_dir.name)
+
+        self.assertEqual(corpus.pages, self.corpus.pages)
+        self.assertEqual(corpus.read(corpus.pages[1]), tyszkiewicz_page(5, 2))
+
+    def test_targets_cover_recorded_pages(self) -> None:
+        targets = self.corpus.get_targets("http://127.0.0.1:1")
+
+        self.assertEqual(len(targets), 1)
+        scraper, target = targets[0]
+        self.assertIs(scraper, Tyszkiewicz)
+        self.assertEqual(target.url, "http://127.0.0.1:1/index.php")
+        self.assertEqual(target.max_pages, 2)
+
+    def test_engine_crawls_replayed_pages(self) -> None:
+        async def crawl(server_url: str) -> list[dict]:
+            engine = CrawlerEngine(HostLimits(requests_per_second=1000, burst=100), parse_workers=0)
+            return [offer async for offer in engine.crawl_targets(self.corpus.get_targets(server_url))]
+
+        with serve_corpus(self.corpus) as server_url:
+            offers = asyncio.run(crawl(server_url))
+
+        self.assertEqual(len(offers), 10)
+        self.assertTrue(all(offer["source"] == self.target.url for offer in offers))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+
+import numpy as np
+
+from serving.batch import BatchValidationError, listings_to_matrix, parse_listings, predict_in_chunks
+
+
+class _SumModel:
+    @staticmethod
+    def predict(x: np.ndarray) -> np.ndarray:
+        return x.sum(axis=1)
+
+
+class BatchTests(unittest.TestCase):
+    ROWS = b'[{"area": 50.5, "rooms": 2, "floor": 0, "year": 2000}, {"area": 70, "rooms": 3, "floor": 4, "year": 1990}]'
+    EXPECTED = np.array([[50.5, 2, 0, 2000], [70, 3, 4, 1990]])
+
+    def test_json_rows(self) -> None:
+        x = listings_to_matrix(parse_listings(self.ROWS, "application/json"))
+        np.testing.assert_array_equal(x, self.EXPECTED)
+
+    def test_json_columns(self) -> None:
+        body = b'{"area": [50.5, 70], "rooms": [2, 3], "floor": [0, 4], "year": [2000, 1990]}'
+        x = listings_to_matrix(parse_listings(body, "application/json; charset=utf-8"))
+        np.testing.assert_array_equal(x, self.EXPECTED)
+
+    def test_ndjson(self) -> None:
+        body = b"\n".join(
+            [
+                b'{"area": 50.5, "rooms": 2, "floor": 0, "year": 2000}',
+                b'{"area": 70, "rooms": 3, "floor": 4, "year": 1990}',
+            ]
+        )
+        x = listings_to_matrix(parse_listings(body, "application/x-ndjson"))
+        np.testing.assert_array_equal(x, self.EXPECTED)
+
+    def test_csv(self) -> None:
+        body = b"year,area,rooms,floor\n2000,50.5,2,0\n1990,70,3,4\n"
+        x = listings_to_matrix(parse_listings(body, "text/csv"))
+        np.testing.assert_array_equal(x, self.EXPECTED)
+
+    def test_invalid_listings(self) -> None:
+        invalid_bodies = [
+            b'[{"area": 0, "rooms": 2, "floor": 0, "year": 2000}]',
+            b'[{"area": 50, "rooms": 2.5, "floor": 0, "year": 2000}]',
+            b'[{"area": 50, "rooms": 2, "floor": -1, "year": 2000}]',
+            b'[{"area": 50, "rooms": 2, "floor": 0}]',
+            b'[{"area": "big", "rooms": 2, "floor": 0, "year": 2000}]',
+            b"[]",
+            b'{"area": 50, "rooms": 2, "floor": 0, "year": 2000}',  # a single listing instead of columns
+            b'[{"area": 50, "rooms": 2, "floor": 0, "year": 2000, "city": "\xff"}]',  # not UTF-8
+        ]
+        for body in invalid_bodies:
+            with self.subTest(body=body):
+                self.assertRaises(BatchValidationError, lambda b=body: listings_to_matrix(parse_listings(b, None)))
+
+    def test_unsupported_content_type(self) -> None:
+        self.assertRaises(BatchValidationError, parse_listings, self.ROWS, "application/xml")
+
+    def test_predict_in_chunks(self) -> None:
+        chunks = list(predict_in_chunks(_SumModel(), np.ones((5, 4)), chunk_size=2))
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(b"".join(chunks).count(b'{"result": 4.0}\n'), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import tempfile
+import unittest
+
+from models.registry import ModelRegistry
+from serving.model_cache import RegistryModelCache
+
+
+class RegistryModelCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.cache = RegistryModelCache(ModelRegistry(self.tmp_dir.name), max_models=1)
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_get_without_model(self) -> None:
+        self.assertRaises(FileNotFoundError, self.cache.get)
+
+    def test_save_activates_new_version(self) -> None:
+        first_version = self.cache.save({"model": 1}, {})
+        second_version = self.cache.save({"model": 2}, {})
+
+        self.assertEqual(self.cache.get(), ({"model": 2}, second_version))
+        self.assertEqual(self.cache.get(first_version), ({"model": 1}, first_version))
+
+    def test_get_pinned_and_rolled_back_versions(self) -> None:
+        first_version = self.cache.save({"model": 1}, {})
+        second_version = self.cache.save({"model": 2}, {})
+
+        self.assertEqual(self.cache.get(first_version)[1], first_version)
+        self.cache.registry.activate(first_version)
+        self.assertEqual(self.cache.get(), ({"model": 1}, first_version))
+        self.assertEqual(self.cache.get(second_version), ({"model": 2}, second_version))
+        self.assertRaises(FileNotFoundError, self.cache.get, "0" * 32)
+
+
+if __name__ == "__main__":
+    unittest.main()
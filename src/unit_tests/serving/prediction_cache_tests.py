@@ -0,0 +1,68 @@
+import unittest
+
+from serving.prediction_cache import PredictionCache, listing_key
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class PredictionCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        self.cache = PredictionCache(max_size=2, ttl=60, clock=self.clock)
+
+    def test_listing_key_is_normalized(self) -> None:
+        listing = {"area": 50, "rooms": 2, "floor": 1, "year": 2000}
+
+        self.assertEqual(listing_key(listing), listing_key({**listing, "area": 50.0}))
+        self.assertEqual(listing_key(listing), listing_key(dict(reversed(listing.items()))))
+
+    def test_hit_and_miss(self) -> None:
+        self.assertIsNone(self.cache.get("v1", (50.0,)))
+        self.cache.put("v1", (50.0,), 100.0)
+
+        self.assertEqual(self.cache.get("v1", (50.0,)), 100.0)
+        self.assertIsNone(self.cache.get("v2", (50.0,)))  # another model version
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(self.cache.stats()["misses"], 2)
+
+    def test_least_recently_used_is_evicted(self) -> None:
+        self.cache.put("v1", (1.0,), 1.0)
+        self.cache.put("v1", (2.0,), 2.0)
+        self.cache.get("v1", (1.0,))
+        self.cache.put("v1", (3.0,), 3.0)
+
+        self.assertIsNone(self.cache.get("v1", (2.0,)))
+        self.assertEqual(self.cache.get("v1", (1.0,)), 1.0)
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+        self.assertEqual(self.cache.stats()["size"], 2)
+
+    def test_entries_expire(self) -> None:
+        self.cache.put("v1", (1.0,), 1.0)
+        self.clock.now = 61
+
+        self.assertIsNone(self.cache.get("v1", (1.0,)))
+        self.assertEqual(self.cache.stats()["expirations"], 1)
+        self.assertEqual(self.cache.stats()["size"], 0)
+
+    def test_clear_invalidates_all_entries(self) -> None:
+        self.cache.put("v1", (1.0,), 1.0)
+        self.cache.clear()
+
+        self.assertIsNone(self.cache.get("v1", (1.0,)))
+        self.assertEqual(self.cache.stats()["invalidations"], 1)
+
+    def test_zero_size_disables_cache(self) -> None:
+        cache = PredictionCache(max_size=0)
+        cache.put("v1", (1.0,), 1.0)
+
+        self.assertIsNone(cache.get("v1", (1.0,)))
+
+
+if __name__ == "__main__":
+    unittest.main()
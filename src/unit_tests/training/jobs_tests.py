@@ -0,0 +1,277 @@
+import json
+import os
+import subprocess  # nosec
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from datetime import date
+from functools import partial
+from typing import Any
+
+import pandas as pd
+
+from models.registry import ModelRegistry, data_snapshot
+from training.jobs import STAGES, JobStatus, TrainingJobManager, fit_model, plan_training
+
+
+class TrainingJobManagerTests(unittest.TestCase):
+    DATA = pd.DataFrame(
+        {
+            "area": [30.0, 45.5, 60.0, 72.0, 88.0, 100.0],
+            "rooms": [1, 2, 2, 3, 4, 4],
+            "floor": [0, 1, 3, 2, 5, 1],
+            "year": [1970, 1985, 2001, 2010, 2015, 2022],
+            "full_price": [300_000.0, 420_000.0, 600_000.0, 700_000.0, 900_000.0, 1_100_000.0],
+        }
+    )
+
+    def setUp(self) -> None:
+        self.loading = threading.Event()
+        self.saved: list[Any] = []
+        self.tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.manager = TrainingJobManager(self._load_data, self._save_model, self.tmp_dir.name)
+
+    def tearDown(self) -> None:
+        self.loading.set()
+        self.manager.shutdown()
+        self.tmp_dir.cleanup()
+
+    def _load_data(self) -> pd.DataFrame:
+        self.loading.wait(timeout=10)
+        return self.DATA
+
+    def _save_model(self, model: Any, metadata: dict[str, Any], training_ids: set[str] | None) -> str:
+        self.saved.append((model, metadata, training_ids))
+        return f"v{len(self.saved)}"
+
+    def _submit(self, model_name: str) -> dict[str, Any]:
+        return self.manager.submit(model_name, partial(fit_model, model_name))
+
+    def _wait(self, job_id: str) -> dict[str, Any]:
+        for _ in range(600):
+            job = self.manager.get(job_id)
+            assert job is not None
+            if job["status"] in (JobStatus.SUCCEEDED, JobStatus.FAILED):
+                return job
+            time.sleep(0.1)
+        self.fail("Training job did not finish")
+
+    def test_job_reports_result_and_timings(self) -> None:
+        job = self._submit("KNN")
+        self.assertEqual(job["progress"], 0)
+        self.loading.set()
+
+        job = self._wait(job["job_id"])
+        self.assertEqual(job["status"], JobStatus.SUCCEEDED, job["error"])
+        self.assertEqual(job["progress"], 1)
+        self.assertEqual(list(job["timings"]), list(STAGES))
+        self.assertEqual(job["result"]["model_used"], "KNN")
+        self.assertEqual(job["result"]["model_version"], "v1")
+        self.assertLessEqual(job["result"]["r2_score_train"], 1)
+        self.assertEqual(len(self.saved), 1)
+        metadata = self.saved[0][1]
+        self.assertEqual(metadata["job_id"], job["job_id"])
+        self.assertEqual(metadata["metrics"]["r2_score_train"], job["result"]["r2_score_train"])
+        self.assertEqual(metadata["data"]["rows"], len(self.DATA))
+        self.assertEqual(list(metadata["timings"]), ["loading_data", "fitting"])
+
+    def test_queued_requests_are_coalesced(self) -> None:
+        running = self._submit("KNN")
+        while self.manager.get(running["job_id"])["status"] == JobStatus.QUEUED:  # type: ignore[index]
+            time.sleep(0.01)  # then blocked while loading data
+        queued = self._submit("KNN")
+        self.assertNotEqual(queued["job_id"], running["job_id"])
+        self.assertEqual(self._submit("KNN")["job_id"], queued["job_id"])
+        self.assertNotEqual(self._submit("RANDOM_FOREST")["job_id"], queued["job_id"])
+
+    def test_pipeline_params_are_json(self) -> None:
+        self.loading.set()
+
+        job = self._wait(self._submit("SCALED_KNN")["job_id"])
+
+        self.assertEqual(job["status"], JobStatus.SUCCEEDED, job["error"])
+        params = json.loads(json.dumps(job["result"]["model_params"]))
+        self.assertEqual(params["knn__algorithm"], "kd_tree")
+        self.assertNotIn("scaler", params)
+
+    def test_failed_job_reports_error(self) -> None:
+        self.manager.load_data = lambda: pd.DataFrame({"area": []})
+        job = self._wait(self._submit("KNN")["job_id"])
+        self.assertEqual(job["status"], JobStatus.FAILED)
+        self.assertIsNotNone(job["error"])
+        self.assertIsNotNone(job["finished_at"])
+
+    def test_wait_for_job(self) -> None:
+        job = self._submit("KNN")
+        unfinished = self.manager.wait(job["job_id"], timeout=0.01)
+        self.assertIn(unfinished["status"], (JobStatus.QUEUED, JobStatus.RUNNING))  # type: ignore[index]
+        self.loading.set()
+
+        job = self.manager.wait(job["job_id"])  # type: ignore[assignment]
+
+        self.assertEqual(job["status"], JobStatus.SUCCEEDED)
+        self.assertIsNone(self.manager.wait("unknown"))
+
+    def test_unknown_job(self) -> None:
+        self.assertIsNone(self.manager.get("unknown"))
+
+    def test_jobs_are_shared_by_workers(self) -> None:
+        other_worker = TrainingJobManager(self._load_data, self._save_model, self.tmp_dir.name)
+        self.addCleanup(other_worker.shutdown)
+        running = self._submit("KNN")
+        while self.manager.get(running["job_id"])["status"] == JobStatus.QUEUED:  # type: ignore[index]
+            time.sleep(0.01)  # then blocked while loading data
+        queued = self._submit("KNN")
+
+        self.assertEqual(other_worker.get(running["job_id"])["status"], JobStatus.RUNNING)  # type: ignore[index]
+        self.assertEqual(other_worker.submit("KNN", partial(fit_model, "KNN"))["job_id"], queued["job_id"])
+        self.loading.set()
+        job = other_worker.wait(queued["job_id"], timeout=60)
+
+        self.assertEqual(job["status"], JobStatus.SUCCEEDED)  # type: ignore[index]
+        self.assertEqual(len(self.saved), 2)
+
+    def test_training_is_serialized_across_workers(self) -> None:
+        other_worker = TrainingJobManager(self._load_data, self._save_model, self.tmp_dir.name)
+        self.addCleanup(other_worker.shutdown)
+        running = self._submit("KNN")
+        while self.manager.get(running["job_id"])["status"] == JobStatus.QUEUED:  # type: ignore[index]
+            time.sleep(0.01)  # then blocked while loading data
+
+        other = other_worker.submit("RANDOM_FOREST", partial(fit_model, "RANDOM_FOREST"))
+        time.sleep(0.2)
+        self.assertEqual(self.manager.get(other["job_id"])["status"], JobStatus.QUEUED)  # type: ignore[index]
+        self.loading.set()
+
+        self.assertEqual(other_worker.wait(other["job_id"])["status"], JobStatus.SUCCEEDED)  # type: ignore[index]
+        self.assertEqual(self.manager.wait(running["job_id"])["status"], JobStatus.SUCCEEDED)  # type: ignore[index]
+
+    def test_jobs_of_exited_worker_fail(self) -> None:
+        owner_path = os.path.join(self.tmp_dir.name, TrainingJobManager.OWNERS_DIR, "exited.lock")
+        subprocess.run(  # nosec # locks the owner file of the job until it exits
+            [sys.executable, "-c", f"import fcntl; fcntl.flock(open({owner_path!r}, 'w'), fcntl.LOCK_EX)"], check=True
+        )
+        with open(os.path.join(self.tmp_dir.name, TrainingJobManager.JOBS_FILE), "w", encoding="utf-8") as f:
+            # a job of a worker from before a restart, whose pid is now used by this process
+            jobs = [
+                {"job_id": "lost", "status": "running", "key": "KNN", "owner": "exited"},
+                {"job_id": "legacy", "status": "running", "key": "KNN", "pid": os.getpid()},
+            ]
+            json.dump(jobs, f)
+
+        self.assertEqual(self.manager.get("legacy")["status"], JobStatus.FAILED)  # type: ignore[index]
+        self.assertEqual(self.manager.get("lost")["status"], JobStatus.FAILED)  # type: ignore[index]
+        self.assertNotEqual(self._submit("KNN")["job_id"], "lost")
+        self.assertFalse(os.path.exists(owner_path))
+
+
+class PlanTrainingTests(unittest.TestCase):
+    DATA = TrainingJobManagerTests.DATA.assign(
+        id=[f"old-{i}" for i in range(6)], date=date(2023, 9, 9), crawl="2023-09-10-00-00-00"
+    )
+    # OgloszeniaTrojmiasto does not find dates of listings
+    NEW_LISTINGS = TrainingJobManagerTests.DATA.assign(
+        full_price=lambda df: df["full_price"].to_numpy()[::-1],
+        id=[f"new-{i}" for i in range(6)],
+        date=[None, None, None, date(2023, 9, 11), date(2023, 9, 11), date(2023, 9, 11)],
+        crawl="2023-09-11-00-00-00",
+    )
+    # the new crawl still lists the offers of the older one
+    NEW_DATA = pd.concat([DATA.assign(crawl="2023-09-11-00-00-00"), NEW_LISTINGS], ignore_index=True)
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.registry = ModelRegistry(self.tmp_dir.name)
+        self.loaded: list[str | None] = []
+        self.new_data = self.NEW_DATA
+        self.all_data = self.DATA
+        self.data = pd.DataFrame()
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def _load_data(self, newer_than: str | None) -> pd.DataFrame:
+        self.loaded.append(newer_than)
+        return self.new_data if newer_than is not None else self.all_data
+
+    def _register(self, model_name: str, updates: int, store_ids: bool = True) -> str:
+        model, _ = fit_model(model_name, self.DATA)
+        metadata = {"model_used": model_name, "data": data_snapshot(self.DATA), "training": {"updates": updates}}
+        version = self.registry.register(model, metadata, self.DATA["id"] if store_ids else None)["version"]
+        self.registry.activate(version)
+        return version
+
+    def _save_model(self, model: Any, metadata: dict[str, Any], training_ids: set[str] | None) -> str:
+        return self.registry.register(model, metadata, training_ids)["version"]
+
+    def _plan(self, model_name: str, incremental: bool = True, full_rebuild_every: int = 3) -> Any:
+        plan = plan_training(self.registry, model_name, self._load_data, incremental, full_rebuild_every)
+        self.data = plan.load_data()
+        return plan
+
+    def test_updates_active_model_with_new_crawls(self) -> None:
+        version = self._register("KNN", updates=1)
+
+        plan = self._plan("KNN")
+        model, result = plan.fit(self.data)
+
+        self.assertEqual(self.loaded, ["2023-09-10-00-00-00"])
+        self.assertEqual(plan.training["mode"], "incremental")
+        self.assertEqual(plan.training["updates"], 2)
+        self.assertEqual(plan.training["base_version"], version)
+        self.assertEqual(result["model_used"], "KNN")
+        self.assertEqual(model.n_samples, len(self.DATA) + len(self.NEW_LISTINGS))
+        self.assertEqual(plan.get_training_ids(self.data), set(self.NEW_DATA["id"]))
+
+    def test_update_skips_listings_of_overlapping_crawls(self) -> None:
+        self._register("RANDOM_FOREST", updates=0)
+
+        plan = self._plan("RANDOM_FOREST")
+        model, _ = plan.fit(self.data)
+
+        pd.testing.assert_frame_equal(self.data.reset_index(drop=True), self.NEW_LISTINGS)
+        self.assertEqual(model.n_samples, len(self.DATA) + len(self.NEW_LISTINGS))
+
+    def test_update_without_new_listings_trains_on_all_data(self) -> None:
+        self._register("KNN", updates=1)
+        # the new crawl only finds new prices of known offers
+        self.new_data = self.DATA.assign(full_price=lambda df: df["full_price"] * 1.1, crawl="2023-09-11-00-00-00")
+        self.all_data = self.new_data
+        manager = TrainingJobManager(
+            partial(self._load_data, None), self._save_model, os.path.join(self.tmp_dir.name, "jobs")
+        )
+        self.addCleanup(manager.shutdown)
+        plan = partial(plan_training, self.registry, "KNN", self._load_data, True, 3)
+
+        job = manager.wait(manager.submit_plan("KNN", plan, "KNN incremental")["job_id"])
+
+        assert job is not None
+        self.assertEqual(job["status"], JobStatus.SUCCEEDED, job["error"])
+        self.assertEqual(self.loaded, ["2023-09-10-00-00-00", None])
+        metadata = self.registry.get_metadata(job["result"]["model_version"])
+        self.assertEqual(metadata["training"], {"mode": "full", "updates": 0})
+        self.assertEqual(self.registry.get_training_ids(job["result"]["model_version"]), set(self.DATA["id"]))
+
+    def test_full_fit_without_model_to_update(self) -> None:
+        self._plan("KNN")
+        self._register("RANDOM_FOREST", updates=0)
+        self._plan("KNN")
+        self._plan("RANDOM_FOREST", incremental=False)
+        self._register("KNN", updates=0, store_ids=False)
+        self._plan("KNN")
+
+        self.assertEqual(self.loaded, [None, None, None, None])
+
+    def test_periodic_full_rebuild(self) -> None:
+        self._register("KNN", updates=3)
+
+        plan = self._plan("KNN")
+
+        self.assertEqual(self.loaded, [None])
+        self.assertEqual(plan.training, {"mode": "full", "updates": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()